@@ -0,0 +1,145 @@
+"""Кэш решений о доступе для ``AccessCheckMiddleware``.
+
+Раньше каждое сообщение открывало сессию БД и делало SELECT по ``users``,
+хотя решение меняется только в двух случаях: наступил ``access_until`` или
+администратор продлил доступ. Поэтому решение кэшируется в памяти процесса:
+
+- положительное — ровно до ``access_until`` пользователя;
+- отрицательное (доступ истёк / пользователя нет) — на
+  ``ACCESS_NEGATIVE_TTL`` секунд, чтобы продление подхватилось даже без
+  уведомления;
+- не больше ``ACCESS_CACHE_SIZE`` записей (LRU).
+
+Инвалидация: ``manage_access.py`` после продления делает
+``pg_notify('access_changed', '<id>[,<id>...]')``, бот слушает канал через
+отдельное asyncpg-соединение (``start_listener``). На SQLite уведомлений нет —
+там остаётся только ``ACCESS_NEGATIVE_TTL``. ``/start`` сбрасывает запись
+пользователя напрямую.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+ACCESS_CACHE_SIZE = int(os.getenv("ACCESS_CACHE_SIZE", "50000"))
+ACCESS_NEGATIVE_TTL = float(os.getenv("ACCESS_NEGATIVE_TTL", "60"))
+# Канал PostgreSQL LISTEN/NOTIFY; payload — telegram_id через запятую
+ACCESS_CHANNEL = "access_changed"
+LISTENER_RECONNECT_DELAY = 5.0
+
+
+class AccessCache:
+    """LRU-кэш ``telegram_id -> (has_access, access_until)`` со сроком жизни записи."""
+
+    def __init__(self, max_size: int = ACCESS_CACHE_SIZE, negative_ttl: float = ACCESS_NEGATIVE_TTL):
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        # telegram_id -> (истекает_в (unix time), has_access, access_until)
+        self._entries: OrderedDict[int, tuple[float, bool, datetime | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int) -> tuple[bool, datetime | None] | None:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, has_access, access_until = entry
+        if time.time() >= expires_at:
+            del self._entries[telegram_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return has_access, access_until
+
+    def set(self, telegram_id: int, has_access: bool, access_until: datetime | None) -> None:
+        if has_access and access_until is not None:
+            expires_at = access_until.timestamp()
+        else:
+            expires_at = time.time() + self.negative_ttl
+
+        self._entries[telegram_id] = (expires_at, has_access, access_until)
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._entries.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+cache = AccessCache()
+
+
+# ==================== Уведомления об изменении доступа ====================
+
+
+def _on_notify(connection, pid, channel: str, payload: str) -> None:
+    for part in payload.split(","):
+        part = part.strip()
+        if part.lstrip("-").isdigit():
+            cache.invalidate(int(part))
+    logger.debug(f"Access cache: инвалидация по уведомлению ({payload})")
+
+
+async def _listen(dsn: str) -> None:
+    import asyncpg
+
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(ACCESS_CHANNEL, _on_notify)
+            # Пока соединения не было, уведомления могли потеряться
+            cache.clear()
+            logger.info(f"Access cache: слушаем канал {ACCESS_CHANNEL}")
+            while not connection.is_closed():
+                await asyncio.sleep(LISTENER_RECONNECT_DELAY)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Access cache: LISTEN недоступен ({e}), переподключение")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(LISTENER_RECONNECT_DELAY)
+
+
+_listener: asyncio.Task | None = None
+
+
+def start_listener(database_url: str) -> None:
+    """Подписаться на ``access_changed`` (только PostgreSQL)."""
+    global _listener
+    url = make_url(database_url)
+    if url.get_backend_name() != "postgresql":
+        logger.info("Access cache: БД не PostgreSQL, инвалидация только по TTL")
+        return
+    # asyncpg принимает обычный libpq DSN (включая sslmode)
+    dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    _listener = asyncio.create_task(_listen(dsn))
+
+
+async def stop_listener() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.cancel()
+    try:
+        await _listener
+    except asyncio.CancelledError:
+        pass
+    _listener = None
@@ -0,0 +1,126 @@
+"""Кэш ответов n8n с TTL, LRU-вытеснением и склейкой одинаковых запросов.
+
+Используется для вопросов, ответ на которые не зависит от пользователя
+(например, кнопки-подсказки Company RAG): пока ответ свежий, он берётся
+из памяти, а одновременные одинаковые вопросы ждут один общий вызов n8n.
+
+Ошибки не кэшируются — исключение получают все ожидающие, следующий
+запрос снова пойдёт в n8n.
+"""
+
+import re
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+_SPACES_RE = re.compile(r"\s+")
+# Эмодзи и знаки препинания по краям: "🌴 Оформление отпуска?" == "оформление отпуска"
+_EDGE_RE = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def normalize_query(text: str) -> str:
+    """Ключ кэша: регистр, пробелы, эмодзи и пунктуация по краям не важны."""
+    text = _SPACES_RE.sub(" ", text.lower().replace("ё", "е")).strip()
+    return _EDGE_RE.sub("", text)
+
+
+class AnswerCache:
+    """TTL + LRU кэш строковых ответов с in-flight коалесингом."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(
+        self,
+        query: str,
+        fetch: Callable[[str], Awaitable[str]],
+    ) -> str:
+        """Вернуть ответ из кэша или получить его через ``fetch(query)``.
+
+        Одинаковые (после нормализации) запросы, пришедшие пока первый
+        ещё выполняется, ждут тот же вызов вместо собственного.
+        """
+        key = normalize_query(query)
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch_and_store(key, query, fetch))
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+
+        # shield: отмена одного ожидающего не должна отменять общий вызов
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        query: str,
+        fetch: Callable[[str], Awaitable[str]],
+    ) -> str:
+        try:
+            value = await fetch(query)
+            self.set(key, value)
+            return value
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def warm_up(
+        self,
+        queries: list[str],
+        fetch: Callable[[str], Awaitable[str]],
+    ) -> int:
+        """Заполнить кэш ответами на заранее известные вопросы.
+
+        Returns:
+            Количество успешно прогретых вопросов
+        """
+        results = await asyncio.gather(
+            *(self.get_or_fetch(q, fetch) for q in queries),
+            return_exceptions=True,
+        )
+        warmed = 0
+        for query, result in zip(queries, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Прогрев кэша: '{query}' не удалось: {result}")
+            else:
+                warmed += 1
+        return warmed
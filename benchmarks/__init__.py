@@ -0,0 +1 @@
+"""Бенчмарки и локальные заглушки (fake n8n / fake Telegram) для нагрузочных замеров."""
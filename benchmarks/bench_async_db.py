@@ -0,0 +1,132 @@
+"""Бенчмарк: синхронная сессия SQLAlchemy внутри event loop vs AsyncSession.
+
+Каждый "пользователь" — корутина, которая ``--queries`` раз проверяет доступ
+(как ``AccessCheckMiddleware`` на каждое сообщение). Задержка сети до
+PostgreSQL имитируется на SQLite: trace-callback драйвера спит ``--latency``
+секунд на каждый SQL-запрос — в том потоке, где драйвер выполняет запрос.
+
+- sync: ``Session`` + ``session.execute`` прямо в корутине (как было) —
+  ожидание БД блокирует весь event loop;
+- async: ``models.check_user_access`` на ``AsyncSession`` (aiosqlite) —
+  loop продолжает обслуживать других пользователей.
+
+Параллельно работает "тикер" — он показывает, насколько loop был занят:
+максимальное опоздание тика и сколько тиков успело пройти.
+
+    python -m benchmarks.bench_async_db --users 50 --queries 5 --latency 0.01
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine, event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from models import Base, User, check_user_access, compute_access  # noqa: E402
+
+TICK = 0.005
+
+
+def _sleeper(latency: float):
+    def trace(statement: str) -> None:
+        time.sleep(latency)
+    return trace
+
+
+def _prepare(path: str, users: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all(User(telegram_id=1000 + i) for i in range(users))
+        session.commit()
+    engine.dispose()
+
+
+async def _ticker(stop: asyncio.Event, stats: dict) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        stats["ticks"] += 1
+        stats["max_lag"] = max(stats["max_lag"], time.perf_counter() - expected)
+
+
+async def _measure(users: int, user_coro) -> tuple[float, dict]:
+    stats = {"ticks": 0, "max_lag": 0.0}
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(stop, stats))
+    started = time.perf_counter()
+    await asyncio.gather(*(user_coro(1000 + i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return elapsed, stats
+
+
+async def _run_sync(path: str, users: int, queries: int, latency: float) -> tuple[float, dict]:
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", lambda conn, _: conn.set_trace_callback(_sleeper(latency)))
+    Session = sessionmaker(bind=engine)
+
+    async def user(telegram_id: int) -> None:
+        for _ in range(queries):
+            with Session() as session:
+                row = session.execute(select(User).where(User.telegram_id == telegram_id)).scalar_one_or_none()
+                compute_access(row.started_at if row else None)
+            await asyncio.sleep(0)  # обработчик отдаёт управление, как после ответа в Telegram
+
+    try:
+        return await _measure(users, user)
+    finally:
+        engine.dispose()
+
+
+async def _run_async(path: str, users: int, queries: int, latency: float) -> tuple[float, dict]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=users, max_overflow=0)
+    event.listen(
+        engine.sync_engine,
+        "connect",
+        lambda conn, _: conn.run_async(lambda c: c.set_trace_callback(_sleeper(latency))),
+    )
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def user(telegram_id: int) -> None:
+        for _ in range(queries):
+            async with Session() as session:
+                await check_user_access(session, telegram_id)
+            await asyncio.sleep(0)
+
+    try:
+        return await _measure(users, user)
+    finally:
+        await engine.dispose()
+
+
+async def main(users: int, queries: int, latency: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        _prepare(path, users)
+        total = users * queries
+        print(f"{users} пользователей × {queries} запросов, задержка БД {latency * 1000:.0f} мс")
+        for name, run in (("sync", _run_sync), ("async", _run_async)):
+            elapsed, stats = await run(path, users, queries, latency)
+            print(
+                f"{name:<6} время={elapsed:7.2f} с  "
+                f"запросов/с={total / elapsed:8.1f}  "
+                f"тиков loop={stats['ticks']:6d}  "
+                f"макс. блокировка loop={stats['max_lag'] * 1000:8.1f} мс"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="одновременных пользователей")
+    parser.add_argument("--queries", type=int, default=5, help="проверок доступа на пользователя")
+    parser.add_argument("--latency", type=float, default=0.01, help="задержка на SQL-запрос, сек")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.queries, args.latency))
@@ -0,0 +1,131 @@
+"""Бенчмарк: перебор фильтров aiogram vs индекс кнопок ``button_dispatch``.
+
+Синтетическое дерево: ``--routers`` роутеров по ``--buttons`` кнопок
+(``F.text == "..."``) и одному обработчику состояния FSM в каждом. Для каждого
+размера — полный проход сообщения до пустого обработчика:
+
+- stock: ``Dispatcher.propagate_event`` — обычный линейный поиск;
+- index: ``ButtonDispatch`` перед ним (как после ``button_dispatch.install``).
+
+Сообщения: кнопка первого роутера, кнопка последнего и свободный текст, который
+не совпал ни с чем. Время — медиана мкс
+на сообщение.
+
+Перед замером на настоящем дереве бота проверяется, что индекс выбирает тот же
+обработчик, что и aiogram, — для каждой кнопки в каждом состоянии FSM.
+
+    python -m benchmarks.bench_button_dispatch --routers 1,5,20 --buttons 10,50
+"""
+
+import argparse
+import asyncio
+import tempfile
+from itertools import product
+
+from benchmarks.bench_hot_paths import _configure_env, _find_handler, _measure_async, _message
+
+FREE_TEXT = "Подскажите, пожалуйста, как оформить отпуск?"
+
+
+def _build_tree(routers: int, buttons: int):
+    from aiogram import Dispatcher, F, Router
+    from aiogram.fsm.state import State, StatesGroup
+
+    async def noop(message):
+        return None
+
+    dp = Dispatcher()
+    for r in range(routers):
+        router = Router(name=f"bench_{r}")
+        waiting = type(f"BenchState{r}", (StatesGroup,), {"waiting": State()}).waiting
+        for b in range(buttons):
+            router.message(F.text == f"r{r} b{b}")(noop)
+        router.message(waiting)(noop)
+        dp.include_router(router)
+    return dp
+
+
+async def _bench_tree(routers: int, buttons: int, args) -> list[tuple[str, float, float]]:
+    import button_dispatch
+
+    dp = _build_tree(routers, buttons)
+    dispatch = button_dispatch.ButtonDispatch(dp)
+
+    async def stock(event, data):
+        return await dp.propagate_event("message", event, **data)
+
+    rows = []
+    for label, text in (
+        ("first", "r0 b0"),
+        ("last", f"r{routers - 1} b{buttons - 1}"),
+        ("miss", FREE_TEXT),
+    ):
+        message = _message(text)
+        data = {"raw_state": None}
+        stock_ns = await _measure_async(lambda: stock(message, data), args.number, args.repeat, args.budget)
+        index_ns = await _measure_async(lambda: dispatch(stock, message, data), args.number, args.repeat, args.budget)
+        rows.append((label, stock_ns / 1000, index_ns / 1000))
+    return rows
+
+
+async def _outcome(coro):
+    """Выбранный обработчик или тип исключения фильтра (ошибка тоже должна совпасть)."""
+    try:
+        handler = await coro
+    except Exception as e:
+        return type(e)
+    return handler and handler.callback.__name__
+
+
+async def _check_bot_tree() -> int:
+    """Индекс и aiogram выбирают один и тот же обработчик; возвращает число проверок."""
+    import button_dispatch
+    import main
+
+    main.register_routers(main.dp)
+    dispatch = button_dispatch.ButtonDispatch(main.dp)
+    states = [None, *sorted(s for s in dispatch._by_state if s is not None)]
+    checked = 0
+    for text, raw_state in product([*dispatch._by_text, FREE_TEXT, "/start"], states):
+        message = _message(text)
+        kwargs = {"bot": main.bot, "raw_state": raw_state}
+        expected = await _outcome(_find_handler(main.dp, message, kwargs))
+        actual = await _outcome(dispatch.match(message, kwargs))
+        if actual != expected:
+            raise RuntimeError(f"{text!r} в состоянии {raw_state}: индекс — {actual}, aiogram — {expected}")
+        checked += 1
+    await main.bot.session.close()
+    return checked
+
+
+async def run(args) -> None:
+    if not args.skip_check:
+        checked = await _check_bot_tree()
+        print(f"дерево бота: индекс совпал с aiogram в {checked} случаях (кнопка × состояние)\n")
+
+    print(f"{'роутеры':>7} {'кнопки':>6} {'сообщение':>9}  {'stock мкс':>10} {'index мкс':>10} {'ускорение':>9}")
+    for routers, buttons in product(args.routers, args.buttons):
+        for label, stock_us, index_us in await _bench_tree(routers, buttons, args):
+            print(f"{routers:7d} {buttons:6d} {label:>9}  {stock_us:10.1f} {index_us:10.1f} {stock_us / index_us:8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routers", type=lambda s: [int(x) for x in s.split(",")], default=[1, 5, 20],
+                        help="числа роутеров через запятую")
+    parser.add_argument("--buttons", type=lambda s: [int(x) for x in s.split(",")], default=[10, 50],
+                        help="числа кнопок в роутере через запятую")
+    parser.add_argument("--number", type=int, default=2000, help="сообщений в одном прогоне")
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов (берётся медиана)")
+    parser.add_argument("--budget", type=float, default=0.2,
+                        help="примерная длительность одного прогона, сек (медленные кейсы — меньше сообщений)")
+    parser.add_argument("--skip-check", action="store_true", help="не сверять индекс с aiogram на дереве бота")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_buttons_") as workdir:
+        _configure_env(workdir)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
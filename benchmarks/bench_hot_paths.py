@@ -0,0 +1,296 @@
+"""Микробенчмарки кода, который выполняется на каждое сообщение.
+
+Без сети и без Telegram: только CPU-стоимость одного апдейта по частям.
+
+- access — ``AccessCheckMiddleware`` с решением из ``access_cache``
+  (обычный путь) и пропуск ``/start``;
+- fsm — ``get_state``/``set_state``/``update_data`` через ``FSMContext`` на
+  ``MemoryStorage`` и на ``DBStorage`` (попадание в кэш, запись отложена);
+- reply — тело запроса ``sendMessage`` с каждой клавиатурой из реестра
+  ``keyboards`` так, как его собирает сессия бота перед отправкой;
+- match — поиск обработчика по фильтрам роутеров (``F.text == "..."``,
+  состояния) в том же порядке, что и ``Router.propagate_event``, но без вызова
+  обработчика: кнопка главного роутера, кнопка последнего отдела и свободный
+  текст, который не совпал ни с одной кнопкой;
+- button — тот же поиск через индекс ``button_dispatch`` (кнопки по словарю).
+
+Результат — медиана нс/операцию по ``--repeat`` прогонам. ``--save-baseline``
+сохраняет JSON, ``--baseline`` сравнивает с ним (код выхода 1 при регрессии).
+
+    python -m benchmarks.bench_hot_paths --number 2000 --repeat 5 --save-baseline hot_paths.json
+    python -m benchmarks.bench_hot_paths --baseline hot_paths.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+# Кнопки для поиска обработчика: первая проверяется в самом Dispatcher,
+# вторая — в последнем подключённом отделе, третья не совпадает ни с чем
+MATCH_TEXTS = {
+    "match:main_button": "🔄 Проверить доступ",
+    "match:last_department": "💰 Расчет стоимости",
+    "match:free_text": "Подскажите, пожалуйста, как оформить отпуск?",
+}
+
+CHAT_ID = 100500
+
+
+def _configure_env(workdir: str) -> None:
+    """Окружение бота — до импорта main (модули читают его при импорте)."""
+    os.environ.setdefault("BOT_TOKEN", "42:BENCH")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["SEMANTIC_CACHE_DIR"] = os.path.join(workdir, "semantic_cache")
+    os.environ["INTERVIEW_JOURNAL_PATH"] = os.path.join(workdir, "interview_journal.jsonl")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FORMAT", "text")
+
+
+# ==================== Замер ====================
+
+
+def _calibrate(first_ns: int, number: int, budget: float) -> int:
+    """Сколько операций в прогоне: не больше ``number`` и не дольше ``budget`` секунд."""
+    return max(1, min(number, int(budget * 1e9 / max(first_ns, 1))))
+
+
+def _measure_sync(fn: Callable[[], Any], number: int, repeat: int, budget: float) -> float:
+    started = time.perf_counter_ns()
+    fn()  # прогрев
+    number = _calibrate(time.perf_counter_ns() - started, number, budget)
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter_ns() - started) / number)
+    return statistics.median(runs)
+
+
+async def _measure_async(fn: Callable[[], Awaitable[Any]], number: int, repeat: int, budget: float) -> float:
+    started = time.perf_counter_ns()
+    await fn()  # прогрев
+    number = _calibrate(time.perf_counter_ns() - started, number, budget)
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            await fn()
+        runs.append((time.perf_counter_ns() - started) / number)
+    return statistics.median(runs)
+
+
+# ==================== Объекты апдейта ====================
+
+
+def _message(text: str, user_id: int = CHAT_ID):
+    from aiogram.types import Chat, Message, User
+
+    return Message(
+        message_id=1,
+        date=datetime.now(timezone.utc),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="Bench"),
+        text=text,
+    )
+
+
+def _update(message):
+    from aiogram.types import Update
+
+    return Update(update_id=1, message=message)
+
+
+# ==================== Кейсы ====================
+
+
+def _find_handler(router, event, kwargs: dict[str, Any]):
+    """Первый обработчик сообщения, чьи фильтры прошли (как ``propagate_event``)."""
+    async def walk(router):
+        observer = router.message
+        result, data = await observer.check_root_filters(event, **kwargs)
+        if not result:
+            return None
+        for handler in observer.handlers:
+            result, _ = await handler.check(event, **{**kwargs, **data, "handler": handler})
+            if result:
+                return handler
+        for sub_router in router.sub_routers:
+            found = await walk(sub_router)
+            if found is not None:
+                return found
+        return None
+
+    return walk(router)
+
+
+async def run(args) -> dict[str, float]:
+    from aiogram.fsm.context import FSMContext
+    from aiogram.fsm.storage.base import StorageKey
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.methods import SendMessage
+
+    import access_cache
+    import button_dispatch
+    import fsm_storage
+    import keyboards
+    import main
+    import models
+
+    await models.init_db()
+    main.register_routers(main.dp)
+    bot = main.bot
+    results: dict[str, float] = {}
+    selected = args.cases
+
+    def wanted(name: str) -> bool:
+        return not selected or any(name.startswith(prefix) for prefix in selected)
+
+    # ---------- access ----------
+    middleware = main.AccessCheckMiddleware()
+
+    async def noop(event, data):
+        return None
+
+    access_cache.cache.set(CHAT_ID, True, datetime.now(timezone.utc) + timedelta(days=1))
+    for name, text in (("access:cached", "📚 База знаний"), ("access:start", "/start")):
+        if not wanted(name):
+            continue
+        message = _message(text)
+        data = {"event_update": _update(message)}
+        results[name] = await _measure_async(
+            lambda: middleware(noop, message, data), args.number, args.repeat, args.budget
+        )
+
+    # ---------- fsm ----------
+    key = StorageKey(bot_id=bot.id, chat_id=CHAT_ID, user_id=CHAT_ID)
+    db_storage = fsm_storage.DBStorage(write_delay=3600)  # запись в БД — вне замера
+    for label, storage in (("memory", MemoryStorage()), ("db", db_storage)):
+        context = FSMContext(storage=storage, key=key)
+        await context.set_state("InterviewState:waiting_for_answer")
+        await context.update_data(position="Менеджер", answers=["Опыт 3 года"])
+        cases = {
+            f"fsm:{label}:get_state": context.get_state,
+            f"fsm:{label}:set_state": lambda c=context: c.set_state("InterviewState:waiting_for_answer"),
+            f"fsm:{label}:update_data": lambda c=context: c.update_data(question_index=1),
+        }
+        for name, fn in cases.items():
+            if wanted(name):
+                results[name] = await _measure_async(fn, args.number, args.repeat, args.budget)
+    await db_storage.close()
+
+    # ---------- reply ----------
+    for name, markup in keyboards.KEYBOARDS.items():
+        if wanted(f"reply:{name}"):
+            method = SendMessage(chat_id=CHAT_ID, text="Выберите действие:", reply_markup=markup)
+            results[f"reply:{name}"] = _measure_sync(
+                lambda m=method: bot.session.build_form_data(bot, m), args.number, args.repeat, args.budget
+            )
+
+    # ---------- match ----------
+    await main.storage.set_state(key, None)
+    dispatch = button_dispatch.ButtonDispatch(main.dp)
+    for name, text in MATCH_TEXTS.items():
+        if not wanted(name) and not wanted(name.replace("match:", "button:", 1)):
+            continue
+        message = _message(text)
+        kwargs = {
+            "bot": bot,
+            "event_update": _update(message),
+            "event_from_user": message.from_user,
+            "event_chat": message.chat,
+            "state": FSMContext(storage=main.storage, key=key),
+            "raw_state": None,
+        }
+        found = await _find_handler(main.dp, message, kwargs)
+        if (found is None) != (name == "match:free_text"):
+            raise RuntimeError(f"{name}: неожиданный результат поиска обработчика для {text!r}")
+        if wanted(name):
+            results[name] = await _measure_async(
+                lambda m=message, k=kwargs: _find_handler(main.dp, m, k), args.number, args.repeat, args.budget
+            )
+        indexed = name.replace("match:", "button:", 1)
+        if wanted(indexed):
+            if await dispatch.match(message, kwargs) is not found:
+                raise RuntimeError(f"{indexed}: индекс выбрал другой обработчик для {text!r}")
+            results[indexed] = await _measure_async(
+                lambda m=message, k=kwargs: dispatch.match(m, k), args.number, args.repeat, args.budget
+            )
+
+    if isinstance(main.storage, fsm_storage.DBStorage):
+        await main.storage.close()
+    await bot.session.close()
+    return results
+
+
+# ==================== Отчёт и baseline ====================
+
+
+def _print_results(results: dict[str, float]) -> None:
+    width = max(len(name) for name in results)
+    for name, ns in results.items():
+        print(f"{name:<{width}}  {ns / 1000:10.2f} мкс/оп")
+
+
+def _compare(results: dict[str, float], baseline: dict[str, Any], tolerance: float, min_delta: float) -> list[str]:
+    problems = []
+    for name, base in baseline["cases"].items():
+        current = results.get(name)
+        if current is None:
+            continue  # кейс отфильтрован --cases или фабрику удалили
+        if current > base * (1 + tolerance) and current - base > min_delta:
+            problems.append(f"{name}: {base / 1000:.2f} → {current / 1000:.2f} мкс/оп (+{current / base - 1:.0%})")
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="операций в одном прогоне")
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов на кейс (берётся медиана)")
+    parser.add_argument("--budget", type=float, default=0.2,
+                        help="примерная длительность одного прогона, сек (медленные кейсы — меньше операций)")
+    parser.add_argument("--cases", type=lambda s: s.split(","), default=[],
+                        help="префиксы кейсов через запятую (access,fsm,reply,match)")
+    parser.add_argument("--save-baseline", help="сохранить результат как baseline (JSON)")
+    parser.add_argument("--baseline", help="сравнить с baseline; код выхода 1 при регрессии")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост времени операции")
+    parser.add_argument("--min-delta", type=float, default=500.0, help="рост меньше стольких нс не считается")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-hot-") as workdir:
+        _configure_env(workdir)
+        results = asyncio.run(run(args))
+
+    _print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": {"number": args.number, "repeat": args.repeat, "budget": args.budget, "python": sys.version.split()[0]},
+                "cases": results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"baseline сохранён в {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = _compare(results, baseline, args.tolerance, args.min_delta)
+        if problems:
+            print("\n❌ Регрессия относительно baseline:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print("\n✅ В пределах baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
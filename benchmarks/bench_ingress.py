@@ -0,0 +1,125 @@
+"""Бенчмарк: long polling vs webhook — задержка от обновления до ответа и updates/сек.
+
+Поднимается ``FakeTelegram`` с односторонней сетевой задержкой ``--latency``.
+Бот — настоящий ``Dispatcher`` с обработчиком, который "думает"
+``--work`` секунд и отвечает ``sendMessage``. В каждом режиме в заглушку
+подаются ``--updates`` сообщений от ``--chats`` пользователей со скоростью
+``--rate`` в секунду (0 — всё сразу); время считается от появления
+обновления в "Telegram" до прихода ответа.
+
+- polling: ``dp.start_polling`` (один потребитель getUpdates);
+- webhook: ``webhook_server.start_webhook`` — заглушка пушит обновления
+  на локальный сервер бота.
+
+    python -m benchmarks.bench_ingress --updates 2000 --rate 200 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import time
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCH")
+
+from aiogram import Bot, Dispatcher, F, types  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+
+import webhook_server  # noqa: E402
+from benchmarks.fake_telegram import FakeTelegram  # noqa: E402
+
+
+def _make_dispatcher(work: float) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message(F.text)
+    async def echo(message: types.Message) -> None:
+        if work:
+            await asyncio.sleep(work)  # n8n/БД
+        await message.answer(f"pong {message.text}")
+
+    return dp
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _feed(server: FakeTelegram, updates: int, chats: int, rate: float) -> None:
+    started = time.perf_counter()
+    for i in range(updates):
+        if rate:
+            # по расписанию, а не sleep(1/rate): погрешность sleep не накапливается
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        server.inject("ping #{id}", chat_id=10_000 + i % chats)
+
+
+async def _run(mode: str, server: FakeTelegram, args) -> tuple[list[float], float]:
+    session = AiohttpSession(api=TelegramAPIServer.from_base(server.base_url))
+    bot = Bot(os.environ["BOT_TOKEN"], session=session)
+    dp = _make_dispatcher(args.work)
+    server.reset()
+
+    if mode == "polling":
+        runner = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=10))
+    else:
+        webhook_server.WEBHOOK_HOST = "127.0.0.1"
+        webhook_server.WEBHOOK_PORT = _free_port()
+        webhook_server.WEBHOOK_BASE_URL = f"http://127.0.0.1:{webhook_server.WEBHOOK_PORT}"
+        await webhook_server.start_webhook(dp, bot)
+    await asyncio.sleep(0.3)  # бот подключился
+
+    started = time.perf_counter()
+    await _feed(server, args.updates, args.chats, args.rate)
+    await server.wait_replies(timeout=120)
+    elapsed = time.perf_counter() - started
+    # ответы на последние sendMessage еще "летят" обратно к боту
+    await asyncio.sleep(args.latency * 2 + 0.1)
+
+    if mode == "polling":
+        await dp.stop_polling()
+        await runner
+    else:
+        await bot.delete_webhook()
+        await webhook_server.stop_webhook()
+    await bot.session.close()
+
+    latencies = [server.replied_at[u] - server.injected_at[u] for u in server.replied_at]
+    return latencies, elapsed
+
+
+async def main(args) -> None:
+    server = FakeTelegram(latency=args.latency)
+    await server.start()
+    try:
+        print(
+            f"{args.updates} обновлений, {args.chats} чатов, rate={args.rate or 'burst'}/с, "
+            f"сеть {args.latency * 1000:.0f} мс в одну сторону, обработка {args.work * 1000:.0f} мс"
+        )
+        for mode in ("polling", "webhook"):
+            latencies, elapsed = await _run(mode, server, args)
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(
+                f"{mode:<8} p50={statistics.median(latencies) * 1000:7.1f} мс  "
+                f"p95={p95 * 1000:7.1f} мс  "
+                f"updates/сек={len(latencies) / elapsed:8.1f}"
+            )
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=200, help="обновлений в секунду, 0 — всё сразу")
+    parser.add_argument("--latency", type=float, default=0.02, help="сетевая задержка до Telegram, сек")
+    parser.add_argument("--work", type=float, default=0.05, help="время обработки одного обновления, сек")
+    asyncio.run(main(parser.parse_args()))
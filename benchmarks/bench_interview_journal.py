@@ -0,0 +1,127 @@
+"""Бенчмарк: запись ответа собеседования на пути ответа кандидату.
+
+``--candidates`` кандидатов одновременно проходят собеседование (старт и три
+ответа). Задержка сети до PostgreSQL имитируется на SQLite: trace-callback
+драйвера спит ``--latency`` секунд на каждый SQL-запрос.
+
+- inline: обработчик сам ждёт ``save_answer_*`` перед следующим вопросом;
+- journal: обработчик вызывает ``interview_journal.record`` (строка в
+  spool-файл), запись в БД — в фоне пачками.
+
+Время — сколько обработчик ждал сохранения (p50/p99 на ответ); для journal
+отдельно — за сколько фон дописал всё в БД. В конце проверяется, что у всех
+кандидатов в ``interview_sessions`` полная расшифровка.
+
+    python -m benchmarks.bench_interview_journal --candidates 200 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+import models  # noqa: E402
+from interview_journal import InterviewJournal  # noqa: E402
+from models import Base, InterviewSession  # noqa: E402
+
+# (событие, поля) — как их записывает handlers/hr_handlers/interview.py
+STEPS = [
+    ("start", {"question": "Вопрос 1"}),
+    ("answer", {"stage": 1, "answer": "Ответ 1", "question": "Вопрос 2", "voice_file_id": "voice-1"}),
+    ("answer", {"stage": 2, "answer": "Ответ 2", "question": "Вопрос 3", "voice_file_id": None}),
+    ("complete", {"answer": "Ответ 3", "hr_recommendation": {"score": 7, "verdict": "Рекомендован"}}),
+]
+
+
+async def _inline(Session, telegram_id: int, op: str, fields: dict) -> None:
+    async with Session() as session:
+        if op == "start":
+            await models.start_interview(session, telegram_id, fields["question"])
+        elif op == "answer":
+            save = models.save_answer_1 if fields["stage"] == 1 else models.save_answer_2
+            await save(session, telegram_id, fields["answer"], fields["question"], fields["voice_file_id"])
+        else:
+            await models.save_answer_3_and_complete(
+                session, telegram_id, fields["answer"], fields["hr_recommendation"]
+            )
+
+
+async def _run(variant: str, tmp: str, args) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db", pool_size=args.pool, max_overflow=0)
+
+    def on_connect(conn, _):
+        def trace(statement: str) -> None:
+            time.sleep(args.latency)
+        conn.run_async(lambda c: c.set_trace_callback(trace))
+
+    event.listen(engine.sync_engine, "connect", on_connect)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    journal = InterviewJournal(path=f"{tmp}/spool.jsonl", session_factory=Session)
+    journal.start()
+    waits: list[float] = []
+
+    async def candidate(telegram_id: int) -> None:
+        for op, fields in STEPS:
+            begin = time.perf_counter()
+            if variant == "inline":
+                await _inline(Session, telegram_id, op, fields)
+            else:
+                journal.record(op, telegram_id, **fields)
+            waits.append(time.perf_counter() - begin)
+            await asyncio.sleep(args.think)  # кандидат читает вопрос и отвечает
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(candidate(1000 + i) for i in range(args.candidates)))
+    replies = time.perf_counter() - begin
+    await journal.close()
+    drained = time.perf_counter() - begin
+
+    async with Session() as session:
+        complete = len((await session.execute(
+            select(InterviewSession.id)
+            .where(InterviewSession.stage == 3)
+            .where(InterviewSession.a1.is_not(None) & InterviewSession.a2.is_not(None))
+        )).all())
+    await engine.dispose()
+
+    waits.sort()
+    return {
+        "p50": statistics.median(waits),
+        "p99": waits[int(len(waits) * 0.99) - 1],
+        "replies": replies,
+        "drained": drained,
+        "complete": complete,
+    }
+
+
+async def main(args) -> None:
+    print(
+        f"{args.candidates} кандидатов, задержка БД {args.latency * 1000:.1f} мс, "
+        f"пауза на ответ {args.think * 1000:.0f} мс, пул {args.pool}"
+    )
+    for variant in ("inline", "journal"):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = await _run(variant, tmp, args)
+        print(
+            f"{variant:<8} ожидание записи p50={result['p50'] * 1000:8.2f} мс  p99={result['p99'] * 1000:8.2f} мс  "
+            f"все ответы за {result['replies']:6.2f} с  в БД за {result['drained']:6.2f} с  "
+            f"полных расшифровок {result['complete']}/{args.candidates}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=200, help="одновременных кандидатов")
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка на SQL-запрос, сек")
+    parser.add_argument("--think", type=float, default=0.05, help="пауза между ответами кандидата, сек")
+    parser.add_argument("--pool", type=int, default=10, help="соединений в пуле")
+    asyncio.run(main(parser.parse_args()))
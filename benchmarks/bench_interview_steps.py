@@ -0,0 +1,150 @@
+"""Бенчмарк: SQL-запросы и время на шаг собеседования.
+
+Полное собеседование (старт, три ответа) ``--interviews`` кандидатов подряд.
+Задержка сети до PostgreSQL имитируется на SQLite: trace-callback драйвера
+спит ``--latency`` секунд на каждый SQL-запрос.
+
+- read-modify-write: как было — поиск активной сессии, изменение объекта,
+  commit и refresh на каждый ответ; старт — UPDATE, SELECT пользователя,
+  INSERT, refresh;
+- returning: функции ``models`` — один ``UPDATE ... RETURNING`` с условием на
+  ожидаемый этап; старт — UPDATE и INSERT с подзапросом user_id.
+
+    python -m benchmarks.bench_interview_steps --interviews 200 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import event, func, select, update  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+import models  # noqa: E402
+from models import Base, InterviewSession, User  # noqa: E402
+
+STEPS = ("start", "answer_1", "answer_2", "answer_3")
+
+
+# ---------- как было ----------
+
+
+async def _legacy_active(session, telegram_id: int):
+    return (
+        await session.execute(
+            select(InterviewSession)
+            .where(InterviewSession.telegram_id == telegram_id)
+            .where(InterviewSession.completed_at.is_(None))
+            .where(InterviewSession.stage >= 0)
+            .order_by(InterviewSession.started_at.desc())
+        )
+    ).scalar_one_or_none()
+
+
+async def _legacy_start(session, telegram_id: int, question: str) -> None:
+    await session.execute(
+        update(InterviewSession)
+        .where(InterviewSession.telegram_id == telegram_id)
+        .where(InterviewSession.completed_at.is_(None))
+        .values(completed_at=func.now(), stage=-1)
+    )
+    user = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
+    interview = InterviewSession(user_id=user.id if user else None, telegram_id=telegram_id, stage=0, q1=question)
+    session.add(interview)
+    await session.commit()
+    await session.refresh(interview)
+
+
+async def _legacy_answer(session, telegram_id: int, step: int) -> None:
+    interview = await _legacy_active(session, telegram_id)
+    if step == 1:
+        interview.a1, interview.q2, interview.stage = "Ответ 1", "Вопрос 2", 1
+    elif step == 2:
+        interview.a2, interview.q3, interview.stage = "Ответ 2", "Вопрос 3", 2
+    else:
+        interview.a3, interview.hr_recommendation, interview.stage = "Ответ 3", {"score": 7}, 3
+        interview.completed_at = datetime.now()
+    await session.commit()
+    await session.refresh(interview)
+
+
+LEGACY = {
+    "start": lambda s, tid: _legacy_start(s, tid, "Вопрос 1"),
+    "answer_1": lambda s, tid: _legacy_answer(s, tid, 1),
+    "answer_2": lambda s, tid: _legacy_answer(s, tid, 2),
+    "answer_3": lambda s, tid: _legacy_answer(s, tid, 3),
+}
+
+RETURNING = {
+    "start": lambda s, tid: models.start_interview(s, tid, "Вопрос 1"),
+    "answer_1": lambda s, tid: models.save_answer_1(s, tid, "Ответ 1", "Вопрос 2"),
+    "answer_2": lambda s, tid: models.save_answer_2(s, tid, "Ответ 2", "Вопрос 3"),
+    "answer_3": lambda s, tid: models.save_answer_3_and_complete(s, tid, "Ответ 3", {"score": 7}),
+}
+
+
+async def _run(steps: dict, path: str, args) -> dict[str, tuple[float, float]]:
+    """Шаг -> (SQL-запросов на шаг, мс на шаг)."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    statements = 0
+
+    def on_connect(conn, _):
+        def trace(statement: str) -> None:
+            time.sleep(args.latency)
+        conn.run_async(lambda c: c.set_trace_callback(trace))
+
+    def on_execute(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "connect", on_connect)
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    async with Session() as session:
+        session.add_all(User(telegram_id=1000 + i) for i in range(args.interviews))
+        # у каждого кандидата уже есть история завершённых собеседований
+        session.add_all(
+            InterviewSession(telegram_id=1000 + i, stage=3, completed_at=func.now())
+            for i in range(args.interviews) for _ in range(args.history)
+        )
+        await session.commit()
+
+    totals = {step: [0, 0.0] for step in STEPS}
+    for i in range(args.interviews):
+        for step in STEPS:
+            statements = 0
+            begin = time.perf_counter()
+            async with Session() as session:
+                await steps[step](session, 1000 + i)
+            totals[step][0] += statements
+            totals[step][1] += time.perf_counter() - begin
+    await engine.dispose()
+    return {step: (n / args.interviews, t / args.interviews * 1000) for step, (n, t) in totals.items()}
+
+
+async def main(args) -> None:
+    print(f"{args.interviews} собеседований, история {args.history} на кандидата, задержка БД {args.latency * 1000:.1f} мс")
+    results = {}
+    for name, steps in (("read-modify-write", LEGACY), ("returning", RETURNING)):
+        with tempfile.TemporaryDirectory() as tmp:
+            results[name] = await _run(steps, os.path.join(tmp, "bench.db"), args)
+    print(f"{'шаг':<10} {'SQL было':>9} {'SQL стало':>10} {'мс было':>9} {'мс стало':>9}")
+    for step in STEPS:
+        old_n, old_ms = results["read-modify-write"][step]
+        new_n, new_ms = results["returning"][step]
+        print(f"{step:<10} {old_n:9.1f} {new_n:10.1f} {old_ms:9.2f} {new_ms:9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interviews", type=int, default=200, help="собеседований подряд")
+    parser.add_argument("--history", type=int, default=5, help="завершённых собеседований у кандидата заранее")
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка на SQL-запрос, сек")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+"""Бенчмарк: клавиатура на каждый ответ vs реестр ``keyboards``.
+
+Для каждой клавиатуры реестра сравниваются два способа собрать тело запроса
+``sendMessage``:
+
+- build: как было — фабрика создаёт новые ``ReplyKeyboardMarkup`` и
+  ``KeyboardButton`` (валидация pydantic), а ``AiohttpSession`` сериализует
+  их в JSON;
+- registry: готовый объект из реестра, ``KeyboardSession`` подставляет
+  заранее посчитанный JSON.
+
+Время — медиана мкс на ответ; память — пик выделений за один ответ
+(``tracemalloc``), т.е. сколько временных объектов создаётся и тут же
+выбрасывается.
+
+    python -m benchmarks.bench_keyboards --number 2000 --repeat 5
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
+
+import keyboards
+
+CHAT_ID = 100500
+
+
+def _factory(markup: ReplyKeyboardMarkup):
+    """Фабрика "как раньше": каждый вызов собирает клавиатуру заново."""
+    rows = [[button.model_dump(exclude_none=True) for button in row] for row in markup.keyboard]
+    options = markup.model_dump(exclude={"keyboard"}, exclude_none=True)
+
+    def build() -> ReplyKeyboardMarkup:
+        return ReplyKeyboardMarkup(
+            keyboard=[[KeyboardButton(**button) for button in row] for row in rows],
+            **options,
+        )
+
+    return build
+
+
+def _timeit(fn, number: int, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - started) / number)
+    return statistics.median(runs) * 1e6
+
+
+def _peak_bytes(fn) -> int:
+    fn()  # прогрев: кэши pydantic/aiogram не считаем
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def run(number: int, repeat: int) -> list[tuple[str, float, float, int, int]]:
+    bot = Bot(token="42:BENCH")
+    plain = AiohttpSession()
+    cached = keyboards.KeyboardSession()
+
+    rows = []
+    for name, markup in keyboards.KEYBOARDS.items():
+        factory = _factory(markup)
+        if plain.prepare_value(factory(), bot, {}) != keyboards.serialized(markup):
+            raise RuntimeError(f"{name}: JSON из реестра не совпадает с сериализацией aiogram")
+
+        def build(factory=factory):
+            method = SendMessage(chat_id=CHAT_ID, text="Выберите действие:", reply_markup=factory())
+            return plain.build_form_data(bot, method)
+
+        def registry(markup=markup):
+            method = SendMessage(chat_id=CHAT_ID, text="Выберите действие:", reply_markup=markup)
+            return cached.build_form_data(bot, method)
+
+        rows.append((
+            name,
+            _timeit(build, number, repeat),
+            _timeit(registry, number, repeat),
+            _peak_bytes(build),
+            _peak_bytes(registry),
+        ))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="ответов в одном прогоне")
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов (берётся медиана)")
+    args = parser.parse_args()
+
+    rows = run(args.number, args.repeat)
+    width = max(len(row[0]) for row in rows)
+    print(f"{'клавиатура':<{width}}  {'build мкс':>10} {'registry мкс':>12}  {'build Б':>9} {'registry Б':>10}")
+    for name, build_us, registry_us, build_bytes, registry_bytes in rows:
+        print(f"{name:<{width}}  {build_us:10.1f} {registry_us:12.1f}  {build_bytes:9d} {registry_bytes:10d}")
+
+    build_total = sum(row[1] for row in rows)
+    registry_total = sum(row[2] for row in rows)
+    print(f"\nв среднем на ответ: {build_total / len(rows):.1f} → {registry_total / len(rows):.1f} мкс "
+          f"(x{build_total / registry_total:.1f}), пик памяти "
+          f"{statistics.mean(row[3] for row in rows):.0f} → {statistics.mean(row[4] for row in rows):.0f} Б")
+
+
+if __name__ == "__main__":
+    main()
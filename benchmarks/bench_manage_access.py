@@ -0,0 +1,130 @@
+"""Бенчмарк: списки и выгрузка пользователей в ``manage_access.py``.
+
+В ``users`` ``--users`` строк, из них активна (``/start`` меньше 24 ч назад)
+доля ``--active``.
+
+- load-all: как было — ``select(User)`` всей таблицы в ORM-объекты и
+  фильтр ``started_at + 24h`` в Python;
+- sql: ``count_users`` (один агрегатный запрос), первая страница
+  ``get_users_page`` и ``export_users`` (серверный курсор, ``yield_per``).
+
+Время и пик памяти Python (tracemalloc) на операцию.
+
+Продление доступа ``--extend`` пользователям (из них 10% нет в базе):
+по одному (сессия, SELECT, commit на ID — как было) и
+``extend_access_multiple`` (``UPDATE ... RETURNING`` на пачку). Задержка сети
+до PostgreSQL имитируется: trace-callback SQLite спит ``--latency`` секунд на
+каждый SQL-запрос.
+
+    python -m benchmarks.bench_manage_access --users 200000 --active 0.05 --extend 5000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/bench.db"
+
+from sqlalchemy import event, insert, select  # noqa: E402
+
+import manage_access  # noqa: E402
+from models import Base, User  # noqa: E402
+
+
+def _legacy_counts() -> tuple[int, int]:
+    """Меню 4/5 до перехода на SQL: вся таблица и фильтр в Python."""
+    with manage_access.SessionLocal() as session:
+        users = session.execute(select(User)).scalars().all()
+        now = datetime.now(timezone.utc)
+        active = 0
+        for user in users:
+            started_at = user.started_at.replace(tzinfo=timezone.utc)  # SQLite хранит naive
+            if now < started_at + timedelta(hours=24):
+                active += 1
+        return active, len(users) - active
+
+
+def _legacy_extend(telegram_ids: list[int], hours: int) -> None:
+    """``extend_access_multiple`` до перехода на пачки: сессия и commit на каждый ID."""
+    for tid in telegram_ids:
+        with manage_access.SessionLocal() as session:
+            user = session.execute(select(User).where(User.telegram_id == tid)).scalar_one_or_none()
+            if user:
+                user.started_at = datetime.now(timezone.utc)
+                session.commit()
+
+
+def _measure(fn) -> tuple[float, float, object]:
+    tracemalloc.start()
+    begin = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - begin
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def _fill(args) -> None:
+    Base.metadata.create_all(manage_access.engine)
+    now = datetime.now(timezone.utc)
+    active = int(args.users * args.active)
+    rows = [
+        {
+            "telegram_id": 1000 + i,
+            "started_at": now - (timedelta(hours=1) if i < active else timedelta(days=2 + i % 30)),
+        }
+        for i in range(args.users)
+    ]
+    with manage_access.engine.begin() as conn:
+        conn.execute(insert(User), rows)
+
+
+def main(args) -> None:
+    _fill(args)
+    print(f"{args.users} пользователей, активных {args.active:.0%}")
+    cases = [
+        ("load-all: подсчёт", _legacy_counts),
+        ("sql: count_users", manage_access.count_users),
+        ("sql: первая страница активных", lambda: manage_access.get_users_page("active")),
+        ("sql: export expired (csv)", lambda: manage_access.export_users("expired", "csv", devnull)),
+    ]
+    # выгрузка в /dev/null — считаем память самой выгрузки, а не буфера с результатом
+    with open(os.devnull, "w") as devnull:
+        for name, fn in cases:
+            elapsed, peak, _ = _measure(fn)
+            print(f"{name:<32} {elapsed * 1000:9.1f} мс  пик памяти {peak / 2**20:7.2f} МБ")
+
+    @event.listens_for(manage_access.engine, "connect")
+    def on_connect(dbapi_connection, _):
+        dbapi_connection.set_trace_callback(lambda statement: time.sleep(args.latency))
+
+    manage_access.engine.dispose()  # новые соединения — уже с задержкой
+    found = min(args.extend * 9 // 10, args.users)
+    telegram_ids = [1000 + i for i in range(found)] + [-i for i in range(1, args.extend - found + 1)]
+    print(f"\nпродление {len(telegram_ids)} ID, задержка БД {args.latency * 1000:.1f} мс")
+    begin = time.perf_counter()
+    _legacy_extend(telegram_ids, 24)
+    print(f"{'по одному':<32} {time.perf_counter() - begin:9.2f} с")
+    begin = time.perf_counter()
+    result = manage_access.extend_access_multiple(telegram_ids, 24)
+    print(
+        f"{'extend_access_multiple':<32} {time.perf_counter() - begin:9.2f} с  "
+        f"продлено {len(result['success'])}, не найдено {len(result['failed'])}"
+    )
+    manage_access.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200000, help="строк в users")
+    parser.add_argument("--active", type=float, default=0.05, help="доля активных пользователей")
+    parser.add_argument("--extend", type=int, default=5000, help="ID для продления доступа")
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка на SQL-запрос при продлении, сек")
+    try:
+        main(parser.parse_args())
+    finally:
+        _tmp.cleanup()
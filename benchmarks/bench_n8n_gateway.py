@@ -0,0 +1,91 @@
+"""Бенчмарк: новый httpx.AsyncClient на каждый вызов vs общий пул n8n_gateway.
+
+Запускает локальную заглушку n8n и гоняет одинаковую нагрузку
+(N конкурентных пользователей × M запросов) двумя способами, печатая
+среднюю/p95 задержку запроса и число открытых TCP-соединений.
+
+    python -m benchmarks.bench_n8n_gateway --users 50 --requests 20 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import n8n_gateway
+from benchmarks.fake_n8n import FakeN8n
+
+
+async def _per_call_client(url: str, payload: dict) -> None:
+    # Старое поведение: клиент (и соединение) создаётся на каждый вызов
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        response = await client.post(url, json=payload)
+        response.raise_for_status()
+
+
+async def _shared_gateway(url: str, payload: dict) -> None:
+    response = await n8n_gateway.post(url, payload)
+    response.raise_for_status()
+
+
+async def _run(call, url: str, users: int, requests: int) -> list[float]:
+    latencies: list[float] = []
+
+    async def user(uid: int) -> None:
+        for i in range(requests):
+            started = time.perf_counter()
+            await call(url, {"telegram_id": uid, "n": i})
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(user(uid) for uid in range(users)))
+    return latencies
+
+
+def _report(name: str, latencies: list[float], elapsed: float, server: FakeN8n) -> None:
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<22} запросов={len(latencies):>6}  "
+        f"avg={statistics.mean(latencies) * 1000:7.2f} мс  "
+        f"p95={p95 * 1000:7.2f} мс  "
+        f"rps={len(latencies) / elapsed:8.1f}  "
+        f"TCP-соединений={server.connections}"
+    )
+
+
+async def main(users: int, requests: int, latency: float) -> None:
+    server = FakeN8n(latency=latency)
+    await server.start()
+    url = f"{server.base_url}/webhook/interview"
+
+    try:
+        for name, call in (
+            ("per-call AsyncClient", _per_call_client),
+            ("shared n8n_gateway", _shared_gateway),
+        ):
+            server.reset()
+            await n8n_gateway.init_gateway()
+            started = time.perf_counter()
+            latencies = await _run(call, url, users, requests)
+            elapsed = time.perf_counter() - started
+            await n8n_gateway.close_gateway()
+            _report(name, latencies, elapsed, server)
+    finally:
+        await server.stop()
+
+    print(
+        "\nПримечание: заглушка работает по HTTP на localhost, поэтому разница "
+        "показывает только стоимость TCP-handshake; к реальному n8n Cloud "
+        "добавляются DNS и TLS на каждое новое соединение."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="конкурентных пользователей")
+    parser.add_argument("--requests", type=int, default=20, help="запросов на пользователя")
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка заглушки n8n, сек")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.requests, args.latency))
@@ -0,0 +1,139 @@
+"""Бенчмарк: всплеск /start — регистрация пользователей в ``users``.
+
+``--users`` новых пользователей нажимают /start одновременно, доля
+``--double-taps`` из них — дважды подряд. Задержка сети до PostgreSQL
+имитируется на SQLite: trace-callback драйвера спит ``--latency`` секунд на
+каждый SQL-запрос. Соединений в пуле — ``--pool``, как у бота.
+
+- select-insert: как было — SELECT, INSERT, commit, refresh на каждый /start;
+- upsert: ``models.ensure_user_started`` — один
+  ``INSERT ... ON CONFLICT DO NOTHING RETURNING``;
+- batched: ``registration.RegistrationBatcher`` — /start, пришедшие за
+  ``--delay`` секунд, записываются одним INSERT на несколько строк.
+
+Для каждого варианта: общее время всплеска, задержка одного /start (p50/p99),
+число SQL-запросов и ошибок (двойное нажатие в select-insert падает на
+уникальном telegram_id).
+
+    python -m benchmarks.bench_registration --users 2000 --double-taps 0.1 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from models import Base, User, ensure_user_started  # noqa: E402
+from registration import RegistrationBatcher  # noqa: E402
+
+
+async def _select_insert(session, telegram_id: int, started_at: datetime) -> None:
+    """``ensure_user_started`` до перехода на upsert."""
+    user = (
+        await session.execute(select(User).where(User.telegram_id == telegram_id))
+    ).scalar_one_or_none()
+    if user:
+        return
+    user = User(telegram_id=telegram_id, started_at=started_at)
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+
+
+async def _run(variant: str, path: str, args) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=args.pool, max_overflow=0)
+    statements = 0
+
+    def on_connect(conn, _):
+        def trace(statement: str) -> None:
+            time.sleep(args.latency)
+        conn.run_async(lambda c: c.set_trace_callback(trace))
+
+    def on_execute(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "connect", on_connect)
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    statements = 0
+
+    Session = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    batcher = RegistrationBatcher(delay=args.delay, max_size=args.batch_size, session_factory=Session)
+    latencies: list[float] = []
+    errors = 0
+
+    async def start(telegram_id: int) -> None:
+        nonlocal errors
+        started_at = datetime.now(timezone.utc)
+        begin = time.perf_counter()
+        try:
+            if variant == "batched":
+                await batcher.register(telegram_id, started_at)
+            else:
+                async with Session() as session:
+                    if variant == "upsert":
+                        await ensure_user_started(session, telegram_id, started_at)
+                    else:
+                        await _select_insert(session, telegram_id, started_at)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - begin)
+
+    taps = [1000 + i for i in range(args.users)]
+    taps += taps[: int(args.users * args.double_taps)]
+    begin = time.perf_counter()
+    await asyncio.gather(*(start(telegram_id) for telegram_id in taps))
+    elapsed = time.perf_counter() - begin
+    await batcher.close()
+
+    async with Session() as session:
+        rows = len((await session.execute(select(User.id))).all())
+    await engine.dispose()
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "statements": statements,
+        "errors": errors,
+        "rows": rows,
+        "taps": len(taps),
+    }
+
+
+async def main(args) -> None:
+    print(
+        f"{args.users} пользователей, повторных нажатий {args.double_taps:.0%}, "
+        f"задержка БД {args.latency * 1000:.1f} мс, пул {args.pool}"
+    )
+    for variant in ("select-insert", "upsert", "batched"):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = await _run(variant, os.path.join(tmp, "bench.db"), args)
+        print(
+            f"{variant:<14} время={result['elapsed']:6.2f} с  "
+            f"/start в сек={result['taps'] / result['elapsed']:8.1f}  "
+            f"p50={result['p50'] * 1000:7.1f} мс  p99={result['p99'] * 1000:7.1f} мс  "
+            f"SQL={result['statements']:5d}  ошибок={result['errors']:4d}  строк={result['rows']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000, help="новых пользователей во всплеске")
+    parser.add_argument("--double-taps", type=float, default=0.1, help="доля пользователей, нажавших /start дважды")
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка на SQL-запрос, сек")
+    parser.add_argument("--pool", type=int, default=10, help="соединений в пуле")
+    parser.add_argument("--delay", type=float, default=0.005, help="окно накопления пачки, сек")
+    parser.add_argument("--batch-size", type=int, default=500, help="строк в одном INSERT")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""Бенчмарк: задержка поиска в semantic_cache при 10k / 100k вопросов.
+
+Индекс заполняется синтетическими вопросами из словаря IT/HR-тематики,
+затем замеряется время ``lookup()`` для перефразированных вопросов
+(попадания) и случайных вопросов (промахи), а также время добавления
+и сохранения/загрузки индекса.
+
+    python -m benchmarks.bench_semantic_cache --sizes 10000 100000 --queries 500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from semantic_cache import SEMANTIC_CACHE_DIM, SemanticIndex
+
+_WORDS = (
+    "как подключить настроить впн vpn wifi пароль гостевой служебный сеть офис "
+    "дом удаленный доступ jira тикет создать сбросить сменить политика антивирус "
+    "скачать установить принтер почта outlook отпуск оформить заявление больничный "
+    "лист зарплата выплата аванс дмс страховка справка бухгалтерия кадры приказ "
+    "ноутбук монитор учетная запись двухфакторная аутентификация токен сервер"
+).split()
+
+
+def _question(rng: random.Random) -> str:
+    words = rng.sample(_WORDS, rng.randint(4, 8))
+    return " ".join(words).capitalize() + "?"
+
+
+def _paraphrase(question: str, rng: random.Random) -> str:
+    # Типичные "мелкие отличия": регистр, пунктуация, одна опечатка
+    chars = list(question.lower().rstrip("?"))
+    i = rng.randrange(len(chars))
+    if chars[i].isalpha():
+        chars[i] = chars[i - 1] if i else chars[i]
+    return "".join(chars) + " ??"
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def bench(size: int, queries: int, dim: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    index = SemanticIndex("bench", dim=dim, max_size=size)
+
+    questions = [_question(rng) for _ in range(size)]
+    started = time.perf_counter()
+    for i, question in enumerate(questions):
+        index.add(question, f"answer {i}")
+    build_time = time.perf_counter() - started
+
+    probes = [_paraphrase(rng.choice(questions), rng) for _ in range(queries // 2)]
+    probes += [_question(rng) + " и что-то ещё" for _ in range(queries - len(probes))]
+    rng.shuffle(probes)
+
+    latencies = []
+    for probe in probes:
+        t0 = time.perf_counter()
+        index.lookup(probe)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.npz")
+        t0 = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        SemanticIndex("bench", dim=dim, max_size=size).load(path)
+        load_time = time.perf_counter() - t0
+        file_mb = os.path.getsize(path) / 1e6
+
+    print(
+        f"{size:>7} вопросов, dim={dim}: "
+        f"lookup avg={statistics.mean(latencies):.2f} ms "
+        f"p95={_percentile(latencies, 0.95):.2f} ms "
+        f"max={max(latencies):.2f} ms | "
+        f"hit rate={index.hits / max(1, index.hits + index.misses):.0%} | "
+        f"add {build_time / size * 1e6:.0f} us/вопрос | "
+        f"save {save_time:.2f}s load {load_time:.2f}s ({file_mb:.0f} MB)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=SEMANTIC_CACHE_DIM)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        bench(size, args.queries, args.dim)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Бенчмарк: время до первого видимого текста — ожидание полного ответа vs стриминг.
+
+Заглушка n8n "генерирует" ответ из ``--tokens`` токенов по ``--token-delay``
+секунд. Сравниваются два пути:
+
+- blocking: ``n8n_gateway.post`` + одна отправка готового ответа (как сейчас);
+- streaming: ``streaming.stream_answer`` с правками сообщения через
+  ``ThrottledEditor`` (Telegram заменён фейковым сообщением, которое
+  запоминает время и число правок).
+
+    python -m benchmarks.bench_streaming --tokens 80 --token-delay 0.05 --format sse
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import n8n_gateway
+import streaming
+from benchmarks.fake_n8n import FakeN8n
+
+
+class FakeMessage:
+    """Вместо aiogram Message: считает правки и время первой из них."""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.first_visible: float | None = None
+        self.edits = 0
+
+    async def edit_text(self, text: str, parse_mode: str | None = None) -> None:
+        await asyncio.sleep(0.005)  # round-trip к Bot API
+        self.edits += 1
+        if self.first_visible is None:
+            self.first_visible = time.perf_counter() - self.started
+
+    async def answer(self, text: str, **kwargs) -> None:
+        await self.edit_text(text)
+
+
+async def _blocking(url: str) -> tuple[float, float, int]:
+    started = time.perf_counter()
+    message = FakeMessage(started)
+    response = await n8n_gateway.post(url, {"query": "bench"})
+    answer = response.json()["answer"]
+    await message.answer(answer)
+    return message.first_visible, time.perf_counter() - started, message.edits
+
+
+async def _streaming(url: str) -> tuple[float, float, int]:
+    started = time.perf_counter()
+    message = FakeMessage(started)
+    await streaming.stream_answer(message, url, {"query": "bench"})
+    return message.first_visible, time.perf_counter() - started, message.edits
+
+
+async def main(runs: int, tokens: int, token_delay: float, stream_format: str, interval: float) -> None:
+    streaming.STREAM_EDIT_INTERVAL = interval
+    server = FakeN8n(latency=0.05, tokens=tokens, token_delay=token_delay, stream_format=stream_format)
+    await server.start()
+    await n8n_gateway.init_gateway()
+    url = f"{server.base_url}/webhook/company-rag"
+
+    try:
+        for name, call in (("blocking", _blocking), ("streaming", _streaming)):
+            results = [await call(url) for _ in range(runs)]
+            first = [r[0] for r in results]
+            total = [r[1] for r in results]
+            edits = [r[2] for r in results]
+            print(
+                f"{name:<10} первый текст={statistics.mean(first) * 1000:8.1f} мс  "
+                f"полный ответ={statistics.mean(total) * 1000:8.1f} мс  "
+                f"правок сообщения={statistics.mean(edits):5.1f}"
+            )
+    finally:
+        await n8n_gateway.close_gateway()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=80, help="токенов в ответе")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="сек на токен")
+    parser.add_argument("--format", choices=["ndjson", "sse"], default="ndjson")
+    parser.add_argument("--interval", type=float, default=1.0, help="STREAM_EDIT_INTERVAL, сек")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.tokens, args.token_delay, args.format, args.interval))
@@ -0,0 +1,173 @@
+"""Локальная заглушка n8n для бенчмарков.
+
+Отвечает на любой ``POST /webhook/<name>`` JSON-ом после настраиваемой задержки
+и считает количество уникальных TCP-соединений, открытых клиентами.
+
+Имитация генерации LLM: ответ состоит из ``tokens`` токенов по ``token_delay``
+секунд каждый. Если в payload есть ``"stream": true``, токены отдаются
+по мере "генерации" (NDJSON как в n8n или SSE), иначе — одним JSON в конце.
+
+Для нагрузочных тестов:
+
+- ``responders`` — ``{имя вебхука: функция(payload) -> dict}`` с ответом,
+  который ждёт обработчик бота (вопрос собеседования, номер наряда ...);
+- ``error_rate`` — доля запросов, на которые отвечаем 500;
+- ``not_registered`` — имена вебхуков, которые отвечают 404
+  "webhook is not registered", как неактивированный workflow n8n.
+
+Запуск отдельно:
+    python -m benchmarks.fake_n8n --port 8765 --latency 0.05 --tokens 60 --token-delay 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Callable
+
+from aiohttp import web
+
+
+class FakeN8n:
+    """aiohttp-сервер, имитирующий вебхуки n8n."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        tokens: int = 40,
+        token_delay: float = 0.0,
+        stream_format: str = "ndjson",
+        responders: dict[str, Callable[[dict], dict[str, Any]]] | None = None,
+        error_rate: float = 0.0,
+        not_registered: set[str] | None = None,
+    ):
+        self.latency = latency
+        self.responders = responders or {}
+        self.error_rate = error_rate
+        self.not_registered = not_registered or set()
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.stream_format = stream_format
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.errors = 0
+        self.peers: set[tuple] = set()
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def connections(self) -> int:
+        return len(self.peers)
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.peers.clear()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        if peer:
+            self.peers.add(peer)
+
+        try:
+            payload = await request.json()
+        except Exception:
+            payload = {}
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        name = request.match_info["name"]
+        if name in self.not_registered:
+            self.errors += 1
+            return web.json_response({
+                "code": 404,
+                "message": f'The requested webhook "POST {name}" is not registered.',
+                "hint": "Click the 'Execute workflow' button on the canvas, then try again.",
+            }, status=404)
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"message": "Error in workflow"}, status=500)
+        if name in self.responders:
+            return web.json_response(self.responders[name](payload if isinstance(payload, dict) else {}))
+        if isinstance(payload, dict) and payload.get("stream"):
+            return await self._stream(request, name)
+
+        words = self._words(name)
+        if self.token_delay:
+            await asyncio.sleep(self.token_delay * len(words))
+        return web.json_response({
+            "answer": "".join(words) if self.token_delay else f"stub answer for {name}",
+            "echo": payload,
+        })
+
+    def _words(self, name: str) -> list[str]:
+        return [f"token{i} " for i in range(self.tokens - 1)] + [f"({name})"]
+
+    async def _stream(self, request: web.Request, name: str) -> web.StreamResponse:
+        sse = self.stream_format == "sse"
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream" if sse else "application/x-ndjson",
+        })
+        await response.prepare(request)
+
+        def event(data: dict) -> bytes:
+            line = json.dumps(data, ensure_ascii=False)
+            return f"data: {line}\n\n".encode() if sse else f"{line}\n".encode()
+
+        await response.write(event({"type": "begin"}))
+        for word in self._words(name):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            await response.write(event({"type": "item", "content": word}))
+        await response.write(event({"type": "end"}))
+        await response.write_eof()
+        return response
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/webhook/{name:.*}", self._handle)
+        app.router.add_post("/webhook-test/{name:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Если порт был 0 — берём реально выданный ОС
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(port: int, latency: float, tokens: int, token_delay: float, stream_format: str) -> None:
+    server = FakeN8n(
+        latency=latency,
+        port=port,
+        tokens=tokens,
+        token_delay=token_delay,
+        stream_format=stream_format,
+    )
+    await server.start()
+    print(f"fake n8n слушает {server.base_url} (latency={latency}s)")
+    while True:
+        await asyncio.sleep(3600)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная заглушка n8n")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--stream-format", choices=["ndjson", "sse"], default="ndjson")
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.latency, args.tokens, args.token_delay, args.stream_format))
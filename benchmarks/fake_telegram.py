@@ -0,0 +1,266 @@
+"""Локальная заглушка Telegram Bot API для тестов и бенчмарков.
+
+Бот подключается к ней через ``AiohttpSession(api=TelegramAPIServer.from_base(url))``.
+Поддерживается то, что нужно для приёма обновлений и ответов:
+
+- ``getUpdates`` — long polling по очереди ``inject()``-нутых обновлений;
+- ``setWebhook`` / ``deleteWebhook`` — после setWebhook обновления
+  доставляются POST-ом на url бота с ``X-Telegram-Bot-Api-Secret-Token``,
+  503 и ошибки повторяются (как у настоящего Telegram);
+- ``sendMessage`` — запоминается время ответа на каждое обновление
+  (текст ответа должен содержать ``#<update_id>``);
+- ``send<Медиа>`` / ``edit*`` возвращают правдоподобный ``Message`` (с ``file_id``
+  отправленного файла), ``getFile`` — ``File`` с ``file_path``;
+- остальные методы отвечают ``{"ok": true, "result": true}``.
+
+``latency`` — односторонняя сетевая задержка до Telegram: её платит каждый
+запрос бота и каждая доставка webhook.
+
+Запуск отдельно:
+    python -m benchmarks.fake_telegram --port 8766
+"""
+
+import argparse
+import asyncio
+import re
+import time
+
+import aiohttp
+from aiohttp import web
+
+_UPDATE_REF = re.compile(r"#(\d+)")
+
+# send-метод -> поле Message с отправленным файлом
+_MEDIA_FIELDS = {
+    "sendPhoto": "photo",
+    "sendVideo": "video",
+    "sendVideoNote": "video_note",
+    "sendDocument": "document",
+    "sendVoice": "voice",
+    "sendAudio": "audio",
+    "sendAnimation": "animation",
+}
+
+
+class FakeTelegram:
+    """aiohttp-сервер, имитирующий api.telegram.org."""
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0, max_connections: int = 40):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+
+        self.pending: list[dict] = []
+        self.injected_at: dict[int, float] = {}
+        self.replied_at: dict[int, float] = {}
+        self.calls: dict[str, int] = {}
+        self.webhook_deliveries = 0
+        self.webhook_retries = 0
+
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._new_updates = asyncio.Event()
+        self._webhook_url: str | None = None
+        self._webhook_secret: str | None = None
+        self._pusher: asyncio.Task | None = None
+        self._client: aiohttp.ClientSession | None = None
+        self._runner: web.AppRunner | None = None
+        self._all_replied = asyncio.Event()
+        self._expected = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ---------- Обновления ----------
+
+    def inject(self, text: str | None, chat_id: int, **fields) -> int:
+        """Добавить входящее сообщение пользователя; возвращает update_id.
+
+        ``fields`` — остальные поля ``Message`` (``photo``, ``document``, ``voice`` ...).
+        """
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        message = {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+            **fields,
+        }
+        if text is not None:
+            message["text"] = text.replace("{id}", str(update_id))
+            if text.startswith("/"):
+                command = text.split()[0]
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        self.pending.append({"update_id": update_id, "message": message})
+        self.injected_at[update_id] = time.perf_counter()
+        self._expected += 1
+        self._all_replied.clear()
+        self._new_updates.set()
+        return update_id
+
+    async def wait_replies(self, timeout: float) -> None:
+        await asyncio.wait_for(self._all_replied.wait(), timeout)
+
+    def reset(self) -> None:
+        self.pending.clear()
+        self.injected_at.clear()
+        self.replied_at.clear()
+        self.calls.clear()
+        self._expected = 0
+        self.webhook_deliveries = 0
+        self.webhook_retries = 0
+
+    # ---------- Bot API ----------
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        if self.latency:
+            await asyncio.sleep(self.latency)  # запрос бота идёт до Telegram
+
+        handler = getattr(self, f"_api_{method}", None)
+        if handler:
+            result = await handler(params)
+        elif method in _MEDIA_FIELDS:
+            result = self._message(params, **{_MEDIA_FIELDS[method]: self._media(method)})
+        elif method.startswith("edit"):
+            result = self._message(params, text=params.get("text") or "")
+        else:
+            result = True
+        if self.latency:
+            await asyncio.sleep(self.latency)  # ответ идёт обратно
+        return web.json_response({"ok": True, "result": result})
+
+    async def _api_getMe(self, params: dict) -> dict:
+        return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+    async def _api_getUpdates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            self.pending = [u for u in self.pending if u["update_id"] >= offset]
+        if not self.pending and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.pending[:limit]
+
+    async def _api_setWebhook(self, params: dict) -> bool:
+        self._webhook_url = params["url"]
+        self._webhook_secret = params.get("secret_token")
+        if self._pusher is None:
+            self._pusher = asyncio.create_task(self._push_loop())
+        return True
+
+    async def _api_deleteWebhook(self, params: dict) -> bool:
+        self._webhook_url = None
+        if self._pusher is not None:
+            self._pusher.cancel()
+            self._pusher = None
+        return True
+
+    async def _api_sendMessage(self, params: dict) -> dict:
+        text = params.get("text", "")
+        match = _UPDATE_REF.search(text)
+        if match:
+            update_id = int(match.group(1))
+            self.replied_at.setdefault(update_id, time.perf_counter())
+            if len(self.replied_at) >= self._expected:
+                self._all_replied.set()
+        return self._message(params, text=text)
+
+    async def _api_getFile(self, params: dict) -> dict:
+        file_id = params.get("file_id", "")
+        return {"file_id": file_id, "file_unique_id": f"u{file_id}", "file_size": 1024, "file_path": f"files/{file_id}"}
+
+    def _message(self, params: dict, **fields) -> dict:
+        message_id = params.get("message_id")
+        if not message_id:
+            message_id = self._next_message_id
+            self._next_message_id += 1
+        chat_id = int(params.get("chat_id") or 0)
+        return {
+            "message_id": int(message_id),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            **fields,
+        }
+
+    def _media(self, method: str) -> dict | list:
+        file_id = f"{method}-{self._next_message_id}"
+        media = {"file_id": file_id, "file_unique_id": f"u{file_id}", "width": 240, "height": 240,
+                 "duration": 1, "length": 240}
+        return [media] if method == "sendPhoto" else media
+
+    # ---------- Доставка webhook ----------
+
+    async def _deliver(self, update: dict, semaphore: asyncio.Semaphore) -> None:
+        headers = {"X-Telegram-Bot-Api-Secret-Token": self._webhook_secret or ""}
+        async with semaphore:
+            while self._webhook_url:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                try:
+                    async with self._client.post(self._webhook_url, json=update, headers=headers) as response:
+                        if response.status == 200:
+                            self.webhook_deliveries += 1
+                            return
+                except aiohttp.ClientError:
+                    pass
+                self.webhook_retries += 1
+                await asyncio.sleep(0.1)
+
+    async def _push_loop(self) -> None:
+        semaphore = asyncio.Semaphore(self.max_connections)
+        while True:
+            await self._new_updates.wait()
+            self._new_updates.clear()
+            updates, self.pending = self.pending, []
+            for update in updates:
+                asyncio.create_task(self._deliver(update, semaphore))
+
+    # ---------- Жизненный цикл ----------
+
+    async def start(self) -> None:
+        self._client = aiohttp.ClientSession()
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._pusher is not None:
+            self._pusher.cancel()
+            self._pusher = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._client:
+            await self._client.close()
+            self._client = None
+
+
+async def _serve(port: int, latency: float) -> None:
+    server = FakeTelegram(latency=latency, port=port)
+    await server.start()
+    print(f"fake Telegram API слушает {server.base_url} (latency={latency}s)")
+    while True:
+        await asyncio.sleep(3600)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная заглушка Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.latency))
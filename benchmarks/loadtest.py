@@ -0,0 +1,469 @@
+"""Нагрузочный тест бота целиком: настоящий ``main.main()`` против заглушек Telegram и n8n.
+
+Поднимаются ``FakeTelegram`` и ``FakeN8n`` (задержка, доля 500-х, вебхуки,
+отвечающие 404 "not registered"), бот из ``main.py`` стартует как в проде
+(polling, планировщик Telegram, исполнитель обновлений, FSM в БД, кэши),
+только его сессия смотрит в заглушку Telegram, а пул ``n8n_gateway`` —
+в заглушку n8n (URL вебхуков в обработчиках не меняются).
+
+Виртуальные пользователи приходят со скоростью ``--rate`` в секунду и
+проходят сценарии по всем отделам: собеседование, CV Scan, фото-контроль,
+наряд-допуск, умный тикет, база знаний (company RAG), калькулятор продаж.
+Шаг сценария — одно сообщение пользователя; его время — от появления
+обновления в "Telegram" до конца обработки ботом (включая все ответы
+пользователю и ожидание лимитов Telegram).
+
+Отчёт: throughput и p50/p95/p99 по каждому шагу каждого сценария.
+
+    python -m benchmarks.loadtest --rate 2 --duration 60
+    python -m benchmarks.loadtest --save-baseline benchmarks/loadtest_baseline.json
+    python -m benchmarks.loadtest --baseline benchmarks/loadtest_baseline.json --tolerance 0.2
+
+В режиме сравнения процесс завершается с кодом 1, если p95 шага вырос
+больше чем на ``--tolerance`` (и больше чем на ``--min-delta`` мс), выросла
+доля ошибок или упал throughput.
+
+БД по умолчанию — временный SQLite; ``--database-url`` — отдельная тестовая БД
+(не продовая: тест создаёт пользователей и состояния FSM).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Callable
+
+import httpx
+
+from benchmarks.fake_n8n import FakeN8n
+from benchmarks.fake_telegram import FakeTelegram
+
+USER_ID_BASE = 1_000_000
+
+# Шаг: (название, текст сообщения или None, доп. поля Message или функция uid -> поля)
+Step = tuple[str, str | None, dict | Callable[[int], dict] | None]
+
+
+def _photo(uid: int) -> dict:
+    return {"photo": [{"file_id": f"photo-{uid}", "file_unique_id": f"p{uid}", "width": 1280, "height": 960}]}
+
+
+def _cv(uid: int) -> dict:
+    return {"document": {
+        "file_id": f"cv-{uid}", "file_unique_id": f"d{uid}", "file_name": "cv.pdf", "mime_type": "application/pdf",
+    }}
+
+
+JOURNEYS: dict[str, list[Step]] = {
+    "interview": [
+        ("start", "/start", None),
+        ("hr_menu", "🤝 HR и найм", None),
+        ("begin", "🎭 Пройти собеседование", None),
+        ("answer_1", "Пять лет в B2B-продажах, вёл ключевых клиентов", None),
+        ("answer_2", "Сначала выясняю потребность, потом показываю выгоду", None),
+        ("answer_3", "Хочу расти до руководителя отдела", None),
+    ],
+    "cv_scan": [
+        ("start", "/start", None),
+        ("hr_menu", "🤝 HR и найм", None),
+        ("begin", "📄 Анализ резюме (CV Scan)", None),
+        ("position", "Менеджер по продажам", None),
+        ("file", None, _cv),
+    ],
+    "photo_control": [
+        ("start", "/start", None),
+        ("safety_menu", "👷‍♂️ Охрана труда", None),
+        ("begin", "📸 Получить допуск", None),
+        ("photo", None, _photo),
+    ],
+    "work_permit": [
+        ("start", "/start", None),
+        ("safety_menu", "👷‍♂️ Охрана труда", None),
+        ("begin", "📝 Оформить работы", None),
+        ("mode", "📋 Стандартное оформление", None),
+        ("work_type", "🔥 Огневые работы", None),
+        ("location", "Цех №2, участок сварки", None),
+        ("duration", "2 часа", None),
+        ("description", "Сварка трубопровода, нужен огнетушитель и СИЗ", None),
+    ],
+    "smart_ticket": [
+        ("start", "/start", None),
+        ("it_menu", "🛠 IT HelpDesk", None),
+        ("begin", "📋 Умный Тикет", None),
+        ("description", "У нового сотрудника нет доступа к сетевой папке Маркетинга", None),
+    ],
+    "company_rag": [
+        ("start", "/start", None),
+        ("kb_menu", "🧠 База Знаний", None),
+        ("begin", "🔎 Найти ответ", None),
+        ("preset", "🌴 Оформление отпуска", None),
+        ("question", "{question}", None),
+    ],
+    "sales_calc": [
+        ("start", "/start", None),
+        ("manager_menu", "💰 AI-Менеджер", None),
+        ("begin", "💰 Расчет стоимости", None),
+        ("niche", "Логистика", None),
+        ("task", "Бот, который отвечает клиентам по статусу доставки", None),
+        ("budget", "50-150 тыс. руб", None),
+        ("contact", "@loadtest_user", None),
+    ],
+}
+
+_QUESTIONS = [
+    "Как оформить командировку?",
+    "Когда индексация зарплаты?",
+    "Где взять справку 2-НДФЛ?",
+    "Сколько дней отпуска положено?",
+    "Как подать заявку на обучение?",
+]
+
+
+# ==================== Ответы n8n ====================
+
+
+def _n8n_responders() -> dict[str, Callable[[dict], dict[str, Any]]]:
+    interview_stage: dict[Any, int] = {}
+
+    def interview(payload: dict) -> dict:
+        user = payload.get("telegram_id")
+        if payload.get("action") == "start":
+            interview_stage[user] = 0
+            return {"question": "Расскажите о своём опыте в продажах.", "done": False, "stage": 0}
+        if payload.get("action") == "cancel":
+            interview_stage.pop(user, None)
+            return {"ok": True}
+        stage = interview_stage.get(user, 0) + 1
+        interview_stage[user] = stage
+        if stage >= 3:
+            interview_stage.pop(user, None)
+            return {"done": True, "result": "Кандидат подходит", "hr_recommendation": {"score": 8}}
+        return {"question": f"Вопрос {stage + 1}: как вы работаете с возражениями?", "done": False, "stage": stage}
+
+    return {
+        "interview": interview,
+        "scan": lambda p: {"ai_feedback": "Сильный опыт продаж, мало управленческого.", "score": 7},
+        "photo-control": lambda p: {"analysis": "✅ Каска и жилет на месте. Допуск разрешён."},
+        "work-permit": lambda p: {"permit_number": "WP-2024-001", "message": "Наряд согласован."},
+        "smart-ticket": lambda p: {
+            "ticket_id": "IT-1042", "title": "Нет доступа к папке", "category": "Access",
+            "priority": "High", "summary": p.get("text", ""), "solution_hint": "Выдать права в AD",
+        },
+        "company-rag": lambda p: {"answer": f"Ответ базы знаний на «{p.get('query', '')}»"},
+        "sales-calc": lambda p: {"answer": "Смета: 120 000 руб, срок 3 недели."},
+    }
+
+
+class _RedirectTransport(httpx.AsyncBaseTransport):
+    """Отправляет запросы к n8n Cloud в локальную заглушку, сохраняя путь вебхука."""
+
+    def __init__(self, base_url: str, limits: httpx.Limits):
+        self._target = httpx.URL(base_url)
+        self._inner = httpx.AsyncHTTPTransport(limits=limits)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme=self._target.scheme, host=self._target.host, port=self._target.port
+        )
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+# ==================== Замер шагов ====================
+
+
+class StepTracker:
+    """Inner-middleware ``dp.update``: сообщает, когда бот закончил обрабатывать update.
+
+    Стоит внутри ``update_executor``, поэтому время включает ожидание в очереди чата.
+    """
+
+    def __init__(self):
+        self._waiters: dict[int, asyncio.Future] = {}
+
+    def expect(self, update_id: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[update_id] = future
+        return future
+
+    def _resolve(self, update_id: int, outcome: str) -> None:
+        future = self._waiters.pop(update_id, None)
+        if future is not None and not future.done():
+            future.set_result((time.perf_counter(), outcome))
+
+    async def __call__(self, handler, event, data: dict[str, Any]) -> Any:
+        from aiogram.dispatcher.event.bases import UNHANDLED
+
+        try:
+            result = await handler(event, data)
+        except Exception:
+            self._resolve(event.update_id, "error")
+            raise
+        self._resolve(event.update_id, "unhandled" if result is UNHANDLED else "ok")
+        return result
+
+
+class Results:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.outcomes: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.journeys_done = 0
+        self.journeys_failed = 0
+
+    def add(self, step: str, latency: float | None, outcome: str) -> None:
+        self.outcomes[step][outcome] += 1
+        if latency is not None:
+            self.latencies[step].append(latency)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# ==================== Пользователи ====================
+
+
+async def _journey(name: str, uid: int, server: FakeTelegram, tracker: StepTracker, results: Results, args) -> None:
+    failed = False
+    for step_name, text, fields in JOURNEYS[name]:
+        extra = fields(uid) if callable(fields) else (fields or {})
+        if text is not None:
+            text = text.format(question=_QUESTIONS[uid % len(_QUESTIONS)])
+        update_id = server.inject(text, chat_id=uid, **extra)
+        waiter = tracker.expect(update_id)
+        key = f"{name}/{step_name}"
+        try:
+            finished, outcome = await asyncio.wait_for(waiter, args.step_timeout)
+            results.add(key, finished - server.injected_at[update_id], outcome)
+            failed = failed or outcome != "ok"
+        except asyncio.TimeoutError:
+            results.add(key, None, "timeout")
+            failed = True
+            break
+        if args.think:
+            await asyncio.sleep(args.think)
+    if failed:
+        results.journeys_failed += 1
+    else:
+        results.journeys_done += 1
+
+
+async def _drive(server: FakeTelegram, tracker: StepTracker, results: Results, args) -> float:
+    names = [n for n in JOURNEYS if not args.journeys or n in args.journeys]
+    cycle = itertools.cycle(names)
+    users = []
+    started = time.perf_counter()
+    total = max(1, int(args.rate * args.duration))
+    for i in range(total):
+        # по расписанию, как в bench_ingress: погрешность sleep не накапливается
+        delay = started + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        users.append(asyncio.create_task(
+            _journey(next(cycle), USER_ID_BASE + i, server, tracker, results, args)
+        ))
+    await asyncio.gather(*users)
+    return time.perf_counter() - started
+
+
+# ==================== Отчёт и baseline ====================
+
+
+def _summary(results: Results, elapsed: float) -> dict[str, Any]:
+    steps = {}
+    for key in sorted(results.outcomes):
+        values = results.latencies.get(key, [])
+        outcomes = dict(results.outcomes[key])
+        count = sum(outcomes.values())
+        steps[key] = {
+            "count": count,
+            "errors": count - outcomes.get("ok", 0),
+            "p50": _percentile(values, 0.50) if values else None,
+            "p95": _percentile(values, 0.95) if values else None,
+            "p99": _percentile(values, 0.99) if values else None,
+        }
+    completed = sum(len(v) for v in results.latencies.values())
+    return {
+        "elapsed": elapsed,
+        "steps_per_sec": completed / elapsed if elapsed else 0.0,
+        "journeys_done": results.journeys_done,
+        "journeys_failed": results.journeys_failed,
+        "steps": steps,
+    }
+
+
+def _ms(value: float | None) -> str:
+    return f"{value * 1000:8.1f}" if value is not None else "       —"
+
+
+def _print_summary(summary: dict[str, Any]) -> None:
+    print(f"\n{'шаг':<28} {'n':>5} {'ошибки':>6} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8}")
+    for key, step in summary["steps"].items():
+        print(f"{key:<28} {step['count']:>5} {step['errors']:>6} {_ms(step['p50'])} {_ms(step['p95'])} {_ms(step['p99'])}")
+    print(
+        f"\nthroughput: {summary['steps_per_sec']:.1f} шагов/сек за {summary['elapsed']:.1f} с; "
+        f"сценариев пройдено {summary['journeys_done']}, с ошибками/таймаутами {summary['journeys_failed']}"
+    )
+
+
+def _compare(summary: dict[str, Any], baseline: dict[str, Any], tolerance: float, min_delta: float) -> list[str]:
+    problems = []
+    for key, base in baseline["steps"].items():
+        current = summary["steps"].get(key)
+        if current is None:
+            problems.append(f"{key}: шаг не выполнялся")
+            continue
+        if base["p95"] is not None and current["p95"] is not None:
+            grown = current["p95"] - base["p95"]
+            if current["p95"] > base["p95"] * (1 + tolerance) and grown * 1000 > min_delta:
+                problems.append(f"{key}: p95 {base['p95'] * 1000:.1f} → {current['p95'] * 1000:.1f} мс")
+        base_rate = base["errors"] / base["count"] if base["count"] else 0.0
+        rate = current["errors"] / current["count"] if current["count"] else 0.0
+        if rate > base_rate + tolerance * max(base_rate, 0.01):
+            problems.append(f"{key}: ошибки {base_rate:.1%} → {rate:.1%}")
+    if summary["steps_per_sec"] < baseline["steps_per_sec"] * (1 - tolerance):
+        problems.append(
+            f"throughput {baseline['steps_per_sec']:.1f} → {summary['steps_per_sec']:.1f} шагов/сек"
+        )
+    return problems
+
+
+# ==================== Запуск ====================
+
+
+def _configure_env(args, workdir: str) -> None:
+    """Окружение бота — до импорта main (модули читают его при импорте)."""
+    os.environ.setdefault("BOT_TOKEN", "42:LOADTEST")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/loadtest.db"
+    os.environ["BOT_MODE"] = "polling"
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["JOB_CALLBACK_PUBLIC_URL"] = ""  # CV Scan / AI-Глаз — синхронно, без callback-сервера
+    os.environ["SEMANTIC_CACHE_DIR"] = os.path.join(workdir, "semantic_cache")
+    os.environ["INTERVIEW_JOURNAL_PATH"] = os.path.join(workdir, "interview_journal.jsonl")
+    os.environ.pop("MEDIA_WARMUP_CHAT_ID", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FORMAT", "text")
+    if args.no_telegram_limits:
+        for name in ("TG_GLOBAL_RATE", "TG_GLOBAL_BURST", "TG_CHAT_RATE", "TG_CHAT_BURST"):
+            os.environ[name] = "100000"
+
+
+async def run(args) -> dict[str, Any]:
+    telegram = FakeTelegram(latency=args.telegram_latency)
+    n8n = FakeN8n(
+        latency=args.n8n_latency,
+        responders=_n8n_responders(),
+        error_rate=args.n8n_error_rate,
+        not_registered=set(args.not_registered),
+    )
+    await telegram.start()
+    await n8n.start()
+
+    from aiogram.client.telegram import TelegramAPIServer
+
+    import main
+    import n8n_gateway
+
+    main.bot.session.api = TelegramAPIServer.from_base(telegram.base_url)
+    # init_gateway() не пересоздаёт уже открытый клиент
+    n8n_gateway._client = httpx.AsyncClient(
+        transport=_RedirectTransport(n8n.base_url, httpx.Limits(
+            max_connections=n8n_gateway.N8N_MAX_CONNECTIONS,
+            max_keepalive_connections=n8n_gateway.N8N_MAX_KEEPALIVE,
+        )),
+        timeout=httpx.Timeout(n8n_gateway.N8N_DEFAULT_TIMEOUT, connect=n8n_gateway.N8N_CONNECT_TIMEOUT),
+    )
+    tracker = StepTracker()
+    main.dp.update.middleware(tracker)
+
+    bot_task = asyncio.create_task(main.main())
+    await asyncio.sleep(args.warmup)
+    if bot_task.done():
+        await bot_task  # поднимет исключение старта
+
+    results = Results()
+    try:
+        elapsed = await _drive(telegram, tracker, results, args)
+    finally:
+        await main.dp.stop_polling()
+        await bot_task
+        await n8n.stop()
+        await telegram.stop()
+
+    summary = _summary(results, elapsed)
+    summary["config"] = {
+        "rate": args.rate, "duration": args.duration, "think": args.think,
+        "n8n_latency": args.n8n_latency, "n8n_error_rate": args.n8n_error_rate,
+        "telegram_latency": args.telegram_latency, "not_registered": args.not_registered,
+        "no_telegram_limits": args.no_telegram_limits, "journeys": args.journeys,
+    }
+    summary["telegram_calls"] = dict(telegram.calls)
+    summary["n8n_requests"] = n8n.requests
+    summary["n8n_errors"] = n8n.errors
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=1.0, help="новых пользователей в секунду")
+    parser.add_argument("--duration", type=float, default=30.0, help="сколько секунд приходят пользователи")
+    parser.add_argument("--think", type=float, default=0.5, help="пауза пользователя между шагами, сек")
+    parser.add_argument("--journeys", type=lambda s: s.split(","), default=[],
+                        help=f"сценарии через запятую (по умолчанию все: {','.join(JOURNEYS)})")
+    parser.add_argument("--n8n-latency", type=float, default=0.5, help="время ответа workflow n8n, сек")
+    parser.add_argument("--n8n-error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--not-registered", type=lambda s: s.split(","), default=[],
+                        help="вебхуки, отвечающие 404 not registered (interview,scan,...)")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="сеть до Telegram в одну сторону, сек")
+    parser.add_argument("--no-telegram-limits", action="store_true",
+                        help="снять лимиты telegram_scheduler (мерить только код бота)")
+    parser.add_argument("--step-timeout", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=1.0, help="пауза после старта бота, сек")
+    parser.add_argument("--database-url", help="тестовая БД (по умолчанию временный SQLite)")
+    parser.add_argument("--save-baseline", help="сохранить результат как baseline (JSON)")
+    parser.add_argument("--baseline", help="сравнить с baseline; код выхода 1 при регрессии")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p95 / падение throughput")
+    parser.add_argument("--min-delta", type=float, default=20.0, help="рост p95 меньше стольких мс не считается")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.journeys) - set(JOURNEYS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        _configure_env(args, workdir)
+        summary = asyncio.run(run(args))
+
+    _print_summary(summary)
+    print(f"n8n: {summary['n8n_requests']} запросов, {summary['n8n_errors']} ошибок; "
+          f"Telegram: {sum(summary['telegram_calls'].values())} запросов")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"baseline сохранён в {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = _compare(summary, baseline, args.tolerance, args.min_delta)
+        if problems:
+            print("\n❌ Регрессия относительно baseline:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print("\n✅ В пределах baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""Диспетчеризация кнопок по хэш-таблице вместо перебора фильтров.
+
+aiogram ищет обработчик сообщения линейно: в каждом роутере по порядку
+проверяет фильтры всех обработчиков, потом спускается в подроутеры. Почти все
+обработчики бота — кнопки ``F.text == "🤝 HR и найм"`` (иногда вместе с
+состоянием FSM), и синхронные фильтры (``MagicFilter``) aiogram выполняет
+через ``asyncio.to_thread`` — по переходу в поток на каждый проверенный
+обработчик. Кнопка последнего отдела или свободный текст проходили
+через все ~90 обработчиков.
+
+``ButtonDispatch`` — outer-middleware ``dp.message``. При ``install`` он один
+раз обходит дерево роутеров в том же порядке, что и aiogram, и раскладывает
+обработчики:
+
+- с точным текстом (``F.text == "..."``) — в словарь ``текст -> обработчики``;
+- остальные (``CVScanState.waiting_for_file``, ``F.photo``, ``Command``) —
+  по состоянию FSM, из которого они срабатывают, или в общий список, если
+  состояние не ограничено.
+
+Для сообщения берутся только кандидаты с его текстом и его состоянием, в
+исходном порядке регистрации, — выбирается тот же обработчик, что выбрал бы
+aiogram. Фильтры состояния уже учтены индексом, остальные ``MagicFilter``
+проверяются прямо в event loop. Обработчик вызывается через inner-middleware
+своего роутера (проверка доступа, метрики), как при обычной диспетчеризации.
+
+Если ни один кандидат не подошёл, то не подошёл бы и ни один обработчик в
+роутерах — сообщение сразу считается необработанным. В обычные роутеры оно
+уходит, только если после ``install`` в дереве появились новые обработчики.
+Роутеры с собственными фильтрами или outer-middleware на ``message`` индекс не
+поддерживает — тогда ``install`` оставляет обычную диспетчеризацию.
+
+``BUTTON_DISPATCH=0`` — отключить.
+"""
+
+import os
+import heapq
+import logging
+import operator
+from inspect import isclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+
+from aiogram import BaseMiddleware, Router
+from aiogram.dispatcher.event.bases import SkipHandler, UNHANDLED
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters.state import StateFilter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, TelegramObject
+from magic_filter.operations import ComparatorOperation, GetAttributeOperation
+
+logger = logging.getLogger(__name__)
+
+BUTTON_DISPATCH = os.getenv("BUTTON_DISPATCH", "1") == "1"
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class UnsupportedRouter(Exception):
+    """В дереве есть то, что индекс не умеет повторить."""
+
+
+class _Entry:
+    """Обработчик с заранее разобранными фильтрами."""
+
+    __slots__ = ("position", "observer", "handler", "text", "states", "filters")
+
+    def __init__(self, position: int, observer: TelegramEventObserver, handler: HandlerObject):
+        self.position = position  # порядок, в котором его проверил бы aiogram
+        self.observer = observer
+        self.handler = handler
+        self.text: str | None = None
+        self.states: frozenset | None = None  # None — в любом состоянии
+        self.filters: list[FilterObject] = []
+
+        for filter_ in handler.filters or ():
+            states = _filter_states(filter_.callback)
+            if states is _ANY_STATE:
+                continue
+            if states is not None:
+                self.states = states if self.states is None else self.states & states
+                continue
+            text = _exact_text(filter_)
+            if text is not None and self.text is None:
+                self.text = text
+                continue
+            self.filters.append(filter_)
+
+    def allows(self, raw_state: str | None) -> bool:
+        return self.states is None or raw_state in self.states
+
+
+_ANY_STATE = frozenset({"*"})
+
+
+def _state_names(state: Any) -> frozenset | None:
+    """Состояния, разрешённые одним элементом ``StateFilter``; None — любое."""
+    if isinstance(state, str) or state is None:
+        return None if state == "*" else frozenset({state})
+    if isinstance(state, State):
+        return None if state.state == "*" else frozenset({state.state})
+    if isinstance(state, StatesGroup) or (isclass(state) and issubclass(state, StatesGroup)):
+        return frozenset(type(state).__all_states_names__ if isinstance(state, StatesGroup) else state.__all_states_names__)
+    raise UnsupportedRouter(f"неизвестное состояние в StateFilter: {state!r}")
+
+
+def _filter_states(callback: Any) -> frozenset | None:
+    """Множество состояний для фильтра состояния (``_ANY_STATE`` — любое), иначе None."""
+    if isinstance(callback, State):
+        names = _state_names(callback)
+    elif isinstance(callback, StateFilter):
+        names = frozenset()
+        for state in callback.states:
+            allowed = _state_names(state)
+            if allowed is None:
+                return _ANY_STATE
+            names |= allowed
+    else:
+        return None
+    return _ANY_STATE if names is None else names
+
+
+def _exact_text(filter_: FilterObject) -> str | None:
+    """``"..."`` для фильтра ``F.text == "..."``."""
+    magic = filter_.magic
+    if magic is None or len(magic._operations) != 2:
+        return None
+    getattr_op, compare_op = magic._operations
+    if (
+        isinstance(getattr_op, GetAttributeOperation)
+        and getattr_op.name == "text"
+        and isinstance(compare_op, ComparatorOperation)
+        and compare_op.comparator is operator.eq
+        and isinstance(compare_op.right, str)
+    ):
+        return compare_op.right
+    return None
+
+
+def _walk(router: Router, is_root: bool = True) -> Iterable[tuple[TelegramEventObserver, HandlerObject]]:
+    """Обработчики сообщений в порядке ``Router.propagate_event``."""
+    observer = router.message
+    if observer._handler.filters:
+        raise UnsupportedRouter(f"у роутера {router.name} есть router.message.filter(...)")
+    if not is_root and len(observer.outer_middleware):
+        raise UnsupportedRouter(f"у роутера {router.name} есть outer-middleware на message")
+    for handler in observer.handlers:
+        yield observer, handler
+    for sub_router in router.sub_routers:
+        yield from _walk(sub_router, is_root=False)
+
+
+def _count_handlers(router: Router) -> int:
+    return len(router.message.handlers) + sum(_count_handlers(r) for r in router.sub_routers)
+
+
+class ButtonDispatch(BaseMiddleware):
+    """``dp.message.outer_middleware(ButtonDispatch(dp))``."""
+
+    def __init__(self, router: Router):
+        self._by_text: dict[str, list[_Entry]] = {}
+        self._by_state: dict[str | None, list[_Entry]] = {}
+        self._anywhere: list[_Entry] = []
+        # состояние -> общие обработчики + обработчики этого состояния, по порядку
+        self._generic: dict[Any, list[_Entry]] = {}
+
+        self._router = router
+        self.handlers = 0
+        for position, (observer, handler) in enumerate(_walk(router)):
+            entry = _Entry(position, observer, handler)
+            self.handlers += 1
+            if entry.text is not None:
+                self._by_text.setdefault(entry.text, []).append(entry)
+            elif entry.states is None:
+                self._anywhere.append(entry)
+            else:
+                for state in entry.states:
+                    self._by_state.setdefault(state, []).append(entry)
+
+        self.buttons = len(self._by_text)
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def _generic_for(self, raw_state: str | None) -> list[_Entry]:
+        key = raw_state if raw_state in self._by_state else _ANY_STATE
+        entries = self._generic.get(key)
+        if entries is None:
+            entries = sorted(self._anywhere + self._by_state.get(raw_state, []), key=lambda e: e.position)
+            self._generic[key] = entries
+        return entries
+
+    async def _check(self, entry: _Entry, event: Message, kwargs: dict[str, Any]) -> bool:
+        """``HandlerObject.check`` без фильтров, уже учтённых индексом."""
+        for filter_ in entry.filters:
+            if filter_.magic is not None and not filter_.awaitable:
+                # MagicFilter — чистая функция от события, поток ему не нужен
+                result = filter_.callback(event, **filter_._prepare_kwargs(kwargs))
+            else:
+                result = await filter_.call(event, **kwargs)
+            if not result:
+                return False
+            if isinstance(result, dict):
+                kwargs.update(result)
+        return True
+
+    async def _matches(self, event: Message, data: dict[str, Any]) -> AsyncIterator[tuple[_Entry, dict[str, Any]]]:
+        """Подходящие обработчики в порядке aiogram (с данными фильтров)."""
+        raw_state = data.get("raw_state")
+        exact = [e for e in self._by_text.get(event.text, ()) if e.allows(raw_state)] if event.text else []
+        for entry in heapq.merge(exact, self._generic_for(raw_state), key=lambda e: e.position):
+            kwargs = {**data, "handler": entry.handler}
+            if await self._check(entry, event, kwargs):
+                yield entry, kwargs
+
+    async def match(self, event: Message, data: dict[str, Any]) -> HandlerObject | None:
+        """Обработчик, который будет вызван для сообщения (None — уйдёт в роутеры)."""
+        async for entry, _ in self._matches(event, data):
+            return entry.handler
+        return None
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        if not isinstance(event, Message):
+            return await handler(event, data)
+
+        skipped = False
+        async for entry, kwargs in self._matches(event, data):
+            wrapped = entry.observer.outer_middleware.wrap_middlewares(
+                entry.observer._resolve_middlewares(),
+                entry.handler.call,
+            )
+            try:
+                result = await wrapped(event, kwargs)
+            except SkipHandler:
+                skipped = True
+                continue
+            self.hits += 1
+            return result
+
+        if skipped:
+            return UNHANDLED
+        if _count_handlers(self._router) == self.handlers:
+            self.misses += 1
+            return UNHANDLED
+        self.fallbacks += 1
+        return await handler(event, data)
+
+
+def install(dp) -> ButtonDispatch | None:
+    """Построить индекс по уже зарегистрированным роутерам (вызывается из main.py)."""
+    if not BUTTON_DISPATCH:
+        return None
+    try:
+        dispatch = ButtonDispatch(dp)
+    except UnsupportedRouter as e:
+        logger.warning(f"Диспетчеризация кнопок по индексу отключена: {e}")
+        return None
+    dp.message.outer_middleware(dispatch)
+    logger.info(f"Кнопки: {dispatch.buttons} текстов, {dispatch.handlers} обработчиков в индексе")
+    return dispatch
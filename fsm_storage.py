@@ -0,0 +1,281 @@
+"""Хранилище FSM aiogram в БД (вместо ``MemoryStorage``).
+
+С ``MemoryStorage`` состояние диалогов (этап собеседования, ответы
+``SalesState``, поля наряда-допуска, должность для CV Scan) терялось при
+перезапуске, а второй процесс бота не видел состояний первого.
+
+``DBStorage`` хранит состояние в таблице ``fsm_states`` через общий
+асинхронный движок ``models``:
+
+- несохранённые изменения читаются из памяти; записанное состояние
+  по умолчанию перечитывается из БД при каждом обращении
+  (``FSM_CACHE_TTL=0``), иначе реплика увидит чужую запись с опозданием.
+  Кэш на ``FSM_CACHE_TTL`` секунд допустим только при одной реплике или
+  маршрутизации всех обновлений чата в одну реплику;
+- записи копятся ``FSM_WRITE_DELAY`` секунд — серия ``update_data`` одного
+  обработчика уходит в БД одним запросом;
+- оптимистичная блокировка по ``version``: если запись успела изменить
+  другая реплика, строка перечитывается и изменения применяются поверх
+  (``update_data`` — слиянием, ``set_state``/``set_data`` — заменой);
+- раз в ``FSM_CLEANUP_INTERVAL`` удаляются состояния, не менявшиеся
+  ``FSM_STATE_TTL_DAYS`` дней.
+
+Выбор: ``FSM_STORAGE=db`` (по умолчанию) или ``memory``.
+"""
+
+import os
+import copy
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from models import get_session, get_fsm_state, save_fsm_state, delete_expired_fsm_states
+
+logger = logging.getLogger(__name__)
+
+FSM_STORAGE = os.getenv("FSM_STORAGE", "db").lower()
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "0"))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_WRITE_DELAY = float(os.getenv("FSM_WRITE_DELAY", "0.05"))
+FSM_STATE_TTL = timedelta(days=int(os.getenv("FSM_STATE_TTL_DAYS", "7")))
+FSM_CLEANUP_INTERVAL = float(os.getenv("FSM_CLEANUP_INTERVAL", "3600"))
+FSM_MAX_CONFLICT_RETRIES = 3
+FSM_RETRY_DELAY = 1.0  # пауза перед повтором записи после ошибки БД
+FSM_CLOSE_TIMEOUT = 10.0
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny)
+    )
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+def _apply(state: str | None, data: dict, op: tuple[str, Any]) -> tuple[str | None, dict]:
+    kind, value = op
+    if kind == "state":
+        return value, data
+    if kind == "data":
+        return state, dict(value)
+    return state, {**data, **value}  # update
+
+
+class _Entry:
+    __slots__ = ("state", "data", "version", "loaded_at", "ops", "flusher", "failed")
+
+    def __init__(self, state: str | None, data: dict, version: int):
+        self.state = state
+        self.data = data
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.ops: list[tuple[str, Any]] = []  # изменения, ещё не записанные в БД
+        self.flusher: asyncio.Task | None = None
+        self.failed = False
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.ops) or self.flusher is not None
+
+
+class DBStorage(BaseStorage):
+    """FSM-хранилище в ``fsm_states`` с кэшем и отложенной записью."""
+
+    def __init__(
+        self,
+        cache_ttl: float = FSM_CACHE_TTL,
+        cache_size: int = FSM_CACHE_SIZE,
+        write_delay: float = FSM_WRITE_DELAY,
+    ):
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.write_delay = write_delay
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._flush_now = asyncio.Event()
+        self._cleanup: asyncio.Task | None = None
+
+        self.reads = 0
+        self.cache_hits = 0
+        self.writes = 0
+        self.conflicts = 0
+
+    # ---------- Чтение ----------
+
+    async def _entry(self, key: StorageKey) -> tuple[str, _Entry]:
+        skey = _key(key)
+        entry = self._entries.get(skey)
+        if entry is not None and (entry.dirty or time.monotonic() - entry.loaded_at < self.cache_ttl):
+            self._entries.move_to_end(skey)
+            self.cache_hits += 1
+            return skey, entry
+
+        async with get_session() as session:
+            row = await get_fsm_state(session, skey)
+        self.reads += 1
+        # Пока читали, обработчик мог успеть что-то записать в этот ключ
+        current = self._entries.get(skey)
+        if current is not None and current.dirty:
+            return skey, current
+
+        entry = _Entry(row.state, dict(row.data or {}), row.version) if row else _Entry(None, {}, 0)
+        if self.cache_ttl > 0:
+            self._store(skey, entry)
+        else:
+            # Без кэша в памяти живут только записи с несохранёнными изменениями
+            self._entries.pop(skey, None)
+        return skey, entry
+
+    def _store(self, skey: str, entry: _Entry) -> None:
+        self._entries[skey] = entry
+        self._entries.move_to_end(skey)
+        self._evict()
+
+    def _evict(self) -> None:
+        excess = len(self._entries) - self.cache_size
+        if excess <= 0:
+            return
+        # С начала (давно не читались); записи с несохранёнными изменениями не трогаем
+        victims = []
+        for skey, entry in self._entries.items():
+            if not entry.dirty:
+                victims.append(skey)
+                if len(victims) >= excess:
+                    break
+        for skey in victims:
+            del self._entries[skey]
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        _, entry = await self._entry(key)
+        return entry.state
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, entry = await self._entry(key)
+        return copy.deepcopy(entry.data)
+
+    # ---------- Запись ----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._mutate(key, ("state", _state_name(state)))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._mutate(key, ("data", copy.deepcopy(dict(data))))
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        entry = await self._mutate(key, ("update", copy.deepcopy(dict(data))))
+        return copy.deepcopy(entry.data)
+
+    async def _mutate(self, key: StorageKey, op: tuple[str, Any]) -> _Entry:
+        skey, entry = await self._entry(key)
+        if self._entries.get(skey) is not entry:
+            self._store(skey, entry)
+        entry.state, entry.data = _apply(entry.state, entry.data, op)
+        entry.ops.append(op)
+        if entry.flusher is None:
+            entry.flusher = asyncio.create_task(self._flush_later(skey, entry))
+        return entry
+
+    async def _flush_later(self, skey: str, entry: _Entry) -> None:
+        delay = FSM_RETRY_DELAY if entry.failed else self.write_delay
+        try:
+            await asyncio.wait_for(self._flush_now.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await self._flush(skey, entry)
+        finally:
+            entry.flusher = None
+            if entry.ops:
+                # Новые изменения пришли во время записи (или запись не удалась)
+                entry.flusher = asyncio.create_task(self._flush_later(skey, entry))
+            elif self.cache_ttl <= 0 and self._entries.get(skey) is entry:
+                # Записано; без кэша следующее чтение всё равно пойдёт в БД
+                del self._entries[skey]
+
+    async def _flush(self, skey: str, entry: _Entry) -> None:
+        ops, entry.ops = entry.ops, []
+        if not ops:
+            return
+        state, data, version = entry.state, entry.data, entry.version
+
+        try:
+            for _ in range(FSM_MAX_CONFLICT_RETRIES):
+                async with get_session() as session:
+                    new_version = await save_fsm_state(session, skey, state, data, version)
+                if new_version is not None:
+                    entry.version = new_version
+                    entry.loaded_at = time.monotonic()
+                    entry.failed = False
+                    self.writes += 1
+                    return
+
+                # Другая реплика изменила запись — применяем наши изменения поверх неё
+                self.conflicts += 1
+                async with get_session() as session:
+                    row = await get_fsm_state(session, skey)
+                state, data, version = (row.state, dict(row.data or {}), row.version) if row else (None, {}, 0)
+                for op in ops:
+                    state, data = _apply(state, data, op)
+                entry.state, entry.data, entry.version = state, data, version
+                for op in entry.ops:
+                    entry.state, entry.data = _apply(entry.state, entry.data, op)
+
+            logger.error(f"FSM: не удалось записать {skey} — {FSM_MAX_CONFLICT_RETRIES} конфликта версий подряд")
+            # Изменения не теряем: _flush_later повторит запись через FSM_RETRY_DELAY
+            entry.ops = ops + entry.ops
+            entry.failed = True
+        except Exception as e:
+            logger.error(f"FSM: ошибка записи {skey}: {e}")
+            entry.ops = ops + entry.ops
+            entry.failed = True
+
+    # ---------- Жизненный цикл ----------
+
+    def start_cleanup(self) -> None:
+        if self._cleanup is None:
+            self._cleanup = asyncio.create_task(self._cleanup_loop())
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            try:
+                async with get_session() as session:
+                    removed = await delete_expired_fsm_states(session, FSM_STATE_TTL)
+                if removed:
+                    logger.info(f"FSM: удалено брошенных состояний: {removed}")
+            except Exception as e:
+                logger.error(f"FSM cleanup error: {e}")
+            await asyncio.sleep(FSM_CLEANUP_INTERVAL)
+
+    async def close(self) -> None:
+        """Записать все отложенные изменения (вызывается aiogram при остановке)."""
+        if self._cleanup is not None:
+            self._cleanup.cancel()
+            self._cleanup = None
+        self._flush_now.set()
+        try:
+            await asyncio.wait_for(self._flush_all(), FSM_CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            pending = sum(1 for e in self._entries.values() if e.ops)
+            logger.error(f"FSM: при остановке не записано состояний: {pending}")
+        finally:
+            self._flush_now.clear()
+
+    async def _flush_all(self) -> None:
+        while flushers := [e.flusher for e in self._entries.values() if e.flusher is not None]:
+            await asyncio.gather(*flushers, return_exceptions=True)
+
+
+def create_storage() -> BaseStorage:
+    """Хранилище FSM по ``FSM_STORAGE``."""
+    if FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return DBStorage()
@@ -3,16 +3,17 @@
 Production-версия: Сбор данных -> RAG (Прайс) -> КП -> Email админу.
 """
 
-import os
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove, FSInputFile
-import httpx
+from aiogram.types import ReplyKeyboardRemove
 import logging
 from aiogram.filters import Command
 
+import n8n_gateway
+import media_registry
 from states import BotStates
+import keyboards
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -33,11 +34,6 @@ class SalesState(StatesGroup):
 class ManagerState(StatesGroup):
     waiting_for_message = State()
 
-def _cancel_kb() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отмена")]], resize_keyboard=True
-    )
-
 # --- ГЛАВНОЕ МЕНЮ AI-МЕНЕДЖЕРА ---
 @router.message(F.text == "💰 AI-Менеджер")
 async def ai_manager_main_menu(message: types.Message, state: FSMContext):
@@ -45,11 +41,7 @@ async def ai_manager_main_menu(message: types.Message, state: FSMContext):
     await state.set_state(BotStates.AI_MANAGER_MENU)
 
     # Отправляем видео-кружочек (Video Note)
-    video_path = "src/20260112.mp4"
-    if os.path.exists(video_path):
-        video = FSInputFile(video_path)
-        await message.answer_video_note(video)
-    else:
+    if not await media_registry.send(message, "src/20260112.mp4"):
         await message.answer("Видео не найдено")
 
     manager_text = """💠 <b>AI Менеджер по продажам</b>
@@ -63,15 +55,7 @@ async def ai_manager_main_menu(message: types.Message, state: FSMContext):
 
     <b>Выберите действие ниже, для запуска процесса:</b>"""
 
-    manager_keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="💰 Расчет стоимости")],
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
-
-    await message.answer(manager_text, parse_mode="HTML", reply_markup=manager_keyboard)
+    await message.answer(manager_text, parse_mode="HTML", reply_markup=keyboards.AI_MANAGER_MENU)
 
 # --- 1. Старт опроса ---
 @router.message(F.text == "💰 Расчет стоимости")
@@ -83,7 +67,7 @@ async def start_sales(message: types.Message, state: FSMContext):
         "Ответьте на 4 вопроса, и я сформирую персональное предложение, а также уведомлю руководителя.\n\n"
         "1️⃣ <b>Какая у Вас сфера бизнеса?</b>",
         parse_mode="HTML",
-        reply_markup=_cancel_kb()
+        reply_markup=keyboards.CANCEL
     )
 
 # --- 2. Ниша -> Задача ---
@@ -95,7 +79,7 @@ async def step_niche(message: types.Message, state: FSMContext):
         "2️⃣ Опишите задачу своими словами.\n"
         "Например: 'Хочу бота, который отвечает на вопросы по PDF и записывает на прием'",
         parse_mode="HTML",
-        reply_markup=_cancel_kb()
+        reply_markup=keyboards.CANCEL
     )
 
 # --- 3. Задача -> Бюджет ---
@@ -104,15 +88,7 @@ async def step_task(message: types.Message, state: FSMContext):
     await state.update_data(task=message.text)
     await state.set_state(SalesState.waiting_for_budget)
 
-    # Кнопки для удобства
-    kb = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="до 50 000 руб"), KeyboardButton(text="50-150 тыс. руб")],
-            [KeyboardButton(text="150-300 тыс. руб"), KeyboardButton(text="Бюджет не ограничен")],
-            [KeyboardButton(text="❌ Отмена")]
-        ], resize_keyboard=True
-    )
-    await message.answer("3️⃣ На какой бюджет Вы ориентируетесь?", reply_markup=kb)
+    await message.answer("3️⃣ На какой бюджет Вы ориентируетесь?", reply_markup=keyboards.SALES_BUDGET)
 
 # --- 4. Бюджет -> Контакт ---
 @router.message(SalesState.waiting_for_budget, F.text != "❌ Отмена")
@@ -123,12 +99,7 @@ async def step_budget(message: types.Message, state: FSMContext):
     await message.answer(
         "4️⃣ Как с Вами связаться?\n"
         "Напишите телефон или @username (или нажмите кнопку ниже).",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[
-                [KeyboardButton(text="📱 Отправить мой контакт", request_contact=True)],
-                [KeyboardButton(text="❌ Отмена")]
-            ], resize_keyboard=True
-        )
+        reply_markup=keyboards.SALES_CONTACT
     )
 
 # --- 5. Финал: Отправка в n8n ---
@@ -160,21 +131,20 @@ async def process_sales_final(message: types.Message, state: FSMContext, contact
         }
 
         # Отправляем в n8n
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(N8N_SALES_WEBHOOK_URL, json=payload)
-
-            if response.status_code == 200:
-                answer = response.json().get("answer", "Ошибка генерации КП.")
-
-                # Удаляем сообщение "анализирую" и шлем результат
-                await msg.delete()
-                await message.answer(
-                    f"📝 Ваше предварительное КП:\n\n{answer}\n\n"
-                    f"✅ Ваш запрос и контакты уже переданы руководителю проекта.",
-                    parse_mode="Markdown" # GPT любит markdown (**bold**)
-                )
-            else:
-                await msg.edit_text("❌ Ошибка связи с сервером расчета.")
+        response = await n8n_gateway.post(N8N_SALES_WEBHOOK_URL, payload, timeout=60.0)
+
+        if response.status_code == 200:
+            answer = response.json().get("answer", "Ошибка генерации КП.")
+
+            # Удаляем сообщение "анализирую" и шлем результат
+            await msg.delete()
+            await message.answer(
+                f"📝 Ваше предварительное КП:\n\n{answer}\n\n"
+                f"✅ Ваш запрос и контакты уже переданы руководителю проекта.",
+                parse_mode="Markdown" # GPT любит markdown (**bold**)
+            )
+        else:
+            await msg.edit_text("❌ Ошибка связи с сервером расчета.")
 
     except Exception as e:
         logger.error(f"Sales Error: {e}")
@@ -213,17 +183,12 @@ async def start_manager_contact(message: types.Message, state: FSMContext):
     """Начало процесса связи с менеджером"""
     await state.set_state(ManagerState.waiting_for_message)
 
-    kb = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отмена")]],
-        resize_keyboard=True
-    )
-
     await message.answer(
         "📞 <b>Связь с менеджером</b>\n\n"
         "Напишите Ваше сообщение. Вы можете отправить текст, файл или фото.\n"
         "Менеджер ответит Вам в ближайшее время.",
         parse_mode="HTML",
-        reply_markup=kb
+        reply_markup=keyboards.CANCEL
     )
 
 @router.message(ManagerState.waiting_for_message, F.text == "❌ Отмена")
@@ -1,11 +1,11 @@
 """Обработчик кнопки HR и Найм"""
 
-import os
 from aiogram import types, F, Router
-from aiogram.types import FSInputFile, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
+import media_registry
 from states import BotStates
+import keyboards
 
 router = Router()
 
@@ -14,11 +14,7 @@ router = Router()
 async def hr_handler(message: types.Message, state: FSMContext):
     """Обработчик кнопки HR и Найм"""
     # Отправляем видео-кружочек (Video Note)
-    video_path = "src/1218.mp4"
-    if os.path.exists(video_path):
-        video = FSInputFile(video_path)
-        await message.answer_video_note(video)
-    else:
+    if not await media_registry.send(message, "src/1218.mp4"):
         await message.answer("Видео не найдено")
 
     # Отправляем сообщение с описанием возможностей
@@ -38,19 +34,7 @@ async def hr_handler(message: types.Message, state: FSMContext):
 
 👇 Что запустим первым?"""
 
-    # Создаем клавиатуру для HR департамента
-    hr_keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🎭 Пройти собеседование")],
-            [KeyboardButton(text="📄 Анализ резюме (CV Scan)")],
-            [KeyboardButton(text="🔥 Быстрый подбор")],
-            [KeyboardButton(text="⚙️ Информация для HR")],
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
-
-    await message.answer(hr_text, parse_mode="HTML", reply_markup=hr_keyboard)
+    await message.answer(hr_text, parse_mode="HTML", reply_markup=keyboards.HR_MENU)
 
     # Устанавливаем состояние HR меню
     await state.set_state(BotStates.HR_MENU)
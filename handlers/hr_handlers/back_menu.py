@@ -1,34 +1,17 @@
 """Обработчик кнопки 'Назад в меню'"""
 
+import logging
+
 from aiogram import types, F, Router
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from states import BotStates
+import keyboards
 
+logger = logging.getLogger(__name__)
 router = Router()
 
 
-def get_main_keyboard() -> ReplyKeyboardMarkup:
-    """Возвращает клавиатуру главного меню"""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [
-                KeyboardButton(text="🤝 HR и найм"),
-                KeyboardButton(text="👷‍♂️ Охрана труда"),
-            ],
-            [
-                KeyboardButton(text="🛠 IT HelpDesk"),
-                KeyboardButton(text="🧠 База Знаний"),
-            ],
-            [
-                KeyboardButton(text="💰 AI-Менеджер"),
-            ]
-        ],
-        resize_keyboard=True
-    )
-
-
 @router.message(F.text == "🔙 Назад в меню")
 async def back_to_menu_handler(message: types.Message, state: FSMContext):
     """Обработчик для возврата в главное меню"""
@@ -50,16 +33,16 @@ async def back_to_menu_handler(message: types.Message, state: FSMContext):
                 "telegram_id": telegram_id,
             })
             # Завершаем сессию
-            end_session(telegram_id)
+            await end_session(telegram_id)
         except Exception as e:
-            print(f"Error ending interview session: {e}")
+            logger.error(f"Error ending interview session: {e}")
 
     # Устанавливаем состояние главного меню
     await state.set_state(BotStates.MAIN_MENU)
 
     await message.answer(
         "🏠 Выберите отдел, который хотите автоматизировать:",
-        reply_markup=get_main_keyboard()
+        reply_markup=keyboards.MAIN_MENU
     )
 
 
@@ -84,21 +67,9 @@ async def back_button_handler(message: types.Message, state: FSMContext):
                 "telegram_id": telegram_id,
             })
             # Завершаем сессию
-            end_session(telegram_id)
+            await end_session(telegram_id)
         except Exception as e:
-            print(f"Error ending interview session: {e}")
-
-    # Возвращаем в меню HR
-    hr_keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🎭 Пройти собеседование")],
-            [KeyboardButton(text="📄 Анализ резюме (CV Scan)")],
-            [KeyboardButton(text="🔥 Быстрый подбор")],
-            [KeyboardButton(text="⚙️ Информация для HR")],
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
+            logger.error(f"Error ending interview session: {e}")
 
     hr_text = """👔 Департамент Найма и Оценки
 
@@ -106,7 +77,7 @@ async def back_button_handler(message: types.Message, state: FSMContext):
 
 👇 Что запустим?"""
 
-    await message.answer(hr_text, reply_markup=hr_keyboard)
+    await message.answer(hr_text, reply_markup=keyboards.HR_MENU)
 
     # Устанавливаем состояние HR меню
     await state.set_state(BotStates.HR_MENU)
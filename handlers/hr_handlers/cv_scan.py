@@ -3,10 +3,12 @@
 from aiogram import types, F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
+from aiogram.types import ReplyKeyboardRemove
 import logging
 from typing import Any
-import httpx
+import n8n_gateway
+import n8n_jobs
+import keyboards
 
 
 logger = logging.getLogger(__name__)
@@ -20,63 +22,57 @@ async def call_cv_scan_n8n(payload: dict[str, Any]) -> dict[str, Any]:
     """Отправка файла на анализ в n8n (webhook /scan)."""
 
     try:
-        print(f"\n{'='*60}")
-        print(f"[CV_SCAN n8n REQUEST]")
-        print(f"URL: {N8N_CV_SCAN_WEBHOOK_URL}")
-        print(f"Payload: {payload}")
-
-        async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-            response = await client.post(N8N_CV_SCAN_WEBHOOK_URL, json=payload)
-
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text}")
-            print(f"{'='*60}\n")
-
-            response.raise_for_status()
-            if response.content:
-                try:
-                    return response.json()
-                except Exception:
-                    return {"raw": response.text}
-            return {}
-    except Exception as e:
-        print(f"\n{'='*60}")
-        print(f"[CV_SCAN n8n ERROR]")
-        print(f"URL: {N8N_CV_SCAN_WEBHOOK_URL}")
-        print(f"Error: {type(e).__name__}: {e}")
-        print(f"{'='*60}\n")
-        raise
+        logger.debug(
+            "[CV_SCAN n8n REQUEST]",
+            extra={"category": "n8n", "url": N8N_CV_SCAN_WEBHOOK_URL, "payload": payload},
+        )
 
+        response = await n8n_gateway.post(N8N_CV_SCAN_WEBHOOK_URL, payload, timeout=60.0)
 
-class CVScanState(StatesGroup):
-    """Состояния FSM для загрузки резюме."""
+        logger.info(
+            "[CV_SCAN n8n RESPONSE]",
+            extra={"category": "n8n", "url": N8N_CV_SCAN_WEBHOOK_URL, "status": response.status_code, "body": response.text},
+        )
 
-    waiting_for_position = State()
-    waiting_for_file = State()
+        response.raise_for_status()
+        if response.content:
+            try:
+                return response.json()
+            except Exception:
+                return {"raw": response.text}
+        return {}
+    except Exception as e:
+        logger.error(
+            "[CV_SCAN n8n ERROR]",
+            extra={"category": "n8n", "url": N8N_CV_SCAN_WEBHOOK_URL, "error": f"{type(e).__name__}: {e}"},
+        )
+        raise
 
 
-def get_cancel_keyboard() -> ReplyKeyboardMarkup:
-    """Клавиатура с кнопкой отмены для режима загрузки."""
+def _format_cv_result(result: dict[str, Any]) -> str:
+    """Текст результата CV Scan, который n8n присылает на callback."""
 
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отмена")]],
-        resize_keyboard=True,
+    feedback = (
+        result.get("ai_feedback")
+        or result.get("feedback")
+        or result.get("text")
+        or result.get("answer")
+        or "Анализ выполнен, но текст отчёта не получен."
     )
+    text = f"📄 Результат анализа резюме\n\n{feedback}"
+    if result.get("score") is not None:
+        text += f"\n\n📊 Оценка совместимости: {result['score']}/10"
+    return text
 
 
-def get_hr_keyboard() -> ReplyKeyboardMarkup:
-    """Базовое меню HR отдела."""
+n8n_jobs.register_formatter("cv_scan", _format_cv_result)
 
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🎭 Пройти собеседование")],
-            [KeyboardButton(text="📄 Анализ резюме (CV Scan)")],
-            [KeyboardButton(text="🔥 Быстрый подбор")],
-            [KeyboardButton(text="⚙️ Информация для HR")],
-            [KeyboardButton(text="🔙 Назад в меню")],
-        ],
-        resize_keyboard=True,
-    )
+
+class CVScanState(StatesGroup):
+    """Состояния FSM для загрузки резюме."""
+
+    waiting_for_position = State()
+    waiting_for_file = State()
 
 
 @router.message(F.text == "📄 Анализ резюме (CV Scan)")
@@ -92,7 +88,7 @@ async def start_cv_scan(message: types.Message, state: FSMContext) -> None:
         "📊 Итоговая оценка совместимости\n\n"
         "👇 <b>Для старта введите название должности:</b>",
         parse_mode="HTML",
-        reply_markup=get_cancel_keyboard(),
+        reply_markup=keyboards.CANCEL,
     )
 
 
@@ -104,7 +100,7 @@ async def cancel_cv_scan(message: types.Message, state: FSMContext) -> None:
     await state.clear()
     await message.answer(
         "Сканирование отменено.",
-        reply_markup=get_hr_keyboard(),
+        reply_markup=keyboards.HR_MENU,
     )
 
 
@@ -123,7 +119,7 @@ async def handle_position(message: types.Message, state: FSMContext) -> None:
     await state.set_state(CVScanState.waiting_for_file)
     await message.answer(
         "Отлично! Теперь пришлите файл резюме в PDF как документ.",
-        reply_markup=get_cancel_keyboard(),
+        reply_markup=keyboards.CANCEL,
     )
 
 
@@ -136,7 +132,7 @@ async def handle_cv_file(message: types.Message, state: FSMContext) -> None:
     if not position_text:
         await message.answer(
             "⚠️ Сначала укажите вакансию, а потом отправьте резюме.",
-            reply_markup=get_cancel_keyboard(),
+            reply_markup=keyboards.CANCEL,
         )
         await state.set_state(CVScanState.waiting_for_position)
         return
@@ -160,26 +156,35 @@ async def handle_cv_file(message: types.Message, state: FSMContext) -> None:
     await state.clear()
 
     try:
-        await call_cv_scan_n8n(
-            {
-                "action": "cv_scan",
-                "telegram_id": message.from_user.id,
-                "user_name": message.from_user.full_name or "",
-                "position_text": position_text,
-                "file_id": document.file_id,
-                "file_name": document.file_name or "",
-                "mime_type": document.mime_type or "",
-            }
-        )
-        # Сообщение можно расширить, когда n8n начнет возвращать результат сразу
+        payload = {
+            "action": "cv_scan",
+            "telegram_id": message.from_user.id,
+            "chat_id": message.chat.id,
+            "user_name": message.from_user.full_name or "",
+            "position_text": position_text,
+            "file_id": document.file_id,
+            "file_name": document.file_name or "",
+            "mime_type": document.mime_type or "",
+        }
+        if n8n_jobs.jobs_enabled():
+            # n8n пришлёт результат на callback, обработчик не ждёт LLM
+            await n8n_jobs.submit_job(
+                "cv_scan",
+                N8N_CV_SCAN_WEBHOOK_URL,
+                payload,
+                telegram_id=message.from_user.id,
+                chat_id=message.chat.id,
+            )
+        else:
+            await call_cv_scan_n8n(payload)
         await message.answer(
             "✅ Резюме отправлено на анализ. Я сообщу результат, как только он будет готов.",
-            reply_markup=get_hr_keyboard(),
+            reply_markup=keyboards.HR_MENU,
         )
     except Exception as e:
         await message.answer(
             f"❌ Ошибка отправки: {e}",
-            reply_markup=get_hr_keyboard(),
+            reply_markup=keyboards.HR_MENU,
         )
 
 
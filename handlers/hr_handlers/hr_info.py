@@ -1,24 +1,15 @@
 """Обработчик кнопки 'Информация для HR'"""
 
-import asyncio
 from aiogram import types, F, Router
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from progress import ProgressAnimator
+import keyboards
 
 router = Router()
 
-
-def get_hr_keyboard() -> ReplyKeyboardMarkup:
-    """Базовое меню HR отдела."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🎭 Пройти собеседование")],
-            [KeyboardButton(text="📄 Анализ резюме (CV Scan)")],
-            [KeyboardButton(text="🔥 Быстрый подбор")],
-            [KeyboardButton(text="⚙️ Информация для HR")],
-            [KeyboardButton(text="🔙 Назад в меню")],
-        ],
-        resize_keyboard=True,
-    )
+HR_DASHBOARD_STEPS = [
+    "🔄 <i>Синхронизация с ATS и CRM-системой...</i>",
+    "📊 <i>Генерация аналитики по воронке найма...</i>",
+]
 
 
 @router.message(F.text == "⚙️ Информация для HR")
@@ -36,19 +27,10 @@ async def hr_section_intro(message: types.Message) -> None:
         "👇 <b>Нажмите кнопку, чтобы увидеть, как выглядит сводный отчет за неделю.</b>"
     )
 
-    # Клавиатура с кнопкой для показа демо
-    demo_keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📊 Показать демо-отчет")],
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
-
     await message.answer(
         intro_text,
         parse_mode="HTML",
-        reply_markup=demo_keyboard
+        reply_markup=keyboards.HR_INFO_DEMO
     )
 
 
@@ -56,16 +38,7 @@ async def hr_section_intro(message: types.Message) -> None:
 async def show_hr_dashboard(message: types.Message) -> None:
     """Демонстрация аналитической панели для HR-директора."""
 
-    # 1. Эффект загрузки данных (Имитация подключения к CRM)
-    loading_msg = await message.answer("🔄 <i>Синхронизация с ATS и CRM-системой...</i>", parse_mode="HTML")
-    await asyncio.sleep(1.0)
-
-    await loading_msg.edit_text("📊 <i>Генерация аналитики по воронке найма...</i>", parse_mode="HTML")
-    await asyncio.sleep(1.2)
-
-    await loading_msg.delete()
-
-    # 2. Формируем красивый дашборд
+    # 1. Формируем красивый дашборд
     # Используем текстовые графики (ASCII/Emoji bars) для наглядности
 
     dashboard_text = (
@@ -96,15 +69,6 @@ async def show_hr_dashboard(message: types.Message) -> None:
         "👇 <b>Выберите действие:</b>"
     )
 
-    # 3. Кнопки действий под отчетом
-    inline_kb = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📥 Скачать детальный PDF (Demo)")],
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
-
     # Надёжный PNG с Wikimedia (правильный Content-Type image/png)
     photo_url = (
         "https://upload.wikimedia.org/wikipedia/commons/thumb/3/3a/"
@@ -112,21 +76,23 @@ async def show_hr_dashboard(message: types.Message) -> None:
         "Business_presentation_illustration2.svg.png"
     )
 
+    # 3. Эффект загрузки данных (подключение к CRM) — пока Telegram загружает дашборд.
     # Отправляем дашборд с картинкой; если не получится, шлём текст без фото
-    try:
-        await message.answer_photo(
-            photo=photo_url,
-            caption=dashboard_text,
-            parse_mode="HTML",
-            reply_markup=inline_kb
-        )
-    except Exception:
-        # Фоллбэк: текстом без изображения
-        await message.answer(
-            dashboard_text,
-            parse_mode="HTML",
-            reply_markup=inline_kb
-        )
+    async with ProgressAnimator(message, HR_DASHBOARD_STEPS, delete=True):
+        try:
+            await message.answer_photo(
+                photo=photo_url,
+                caption=dashboard_text,
+                parse_mode="HTML",
+                reply_markup=keyboards.HR_INFO_PDF
+            )
+        except Exception:
+            # Фоллбэк: текстом без изображения
+            await message.answer(
+                dashboard_text,
+                parse_mode="HTML",
+                reply_markup=keyboards.HR_INFO_PDF
+            )
 
 
 @router.message(F.text == "📥 Скачать детальный PDF (Demo)")
@@ -137,7 +103,7 @@ async def download_demo_report(message: types.Message) -> None:
         "(В реальном проекте здесь бот присылает документ с полной аналитикой, "
         "транскрипциями звонков и рейтингом всех кандидатов).",
         parse_mode="HTML",
-        reply_markup=get_hr_keyboard()
+        reply_markup=keyboards.HR_MENU
     )
 
 
@@ -10,15 +10,14 @@
 
 import os
 import logging
-import asyncio
 from typing import Any
 
 import httpx
 from aiogram import F, Router, types
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 
+import n8n_gateway
 from states import BotStates
 
 logger = logging.getLogger(__name__)
@@ -30,8 +29,11 @@ router = Router()
 N8N_WEBHOOK_URL = "https://levinbiz.app.n8n.cloud/webhook/interview"
 
 HTTP_TIMEOUT = 60.0  # Whisper + LLM могут работать долго
-N8N_RETRY_ATTEMPTS = 40  # ~120 сек при интервале 3 сек
-N8N_RETRY_INTERVAL = 3.0  # сек
+
+N8N_NOT_REGISTERED_ERROR = (
+    "Webhook не зарегистрирован в n8n. Откройте workflow и нажмите "
+    "'Execute workflow' кнопку на canvas."
+)
 
 
 # ==================== Состояние сессий ====================
@@ -40,133 +42,101 @@ N8N_RETRY_INTERVAL = 3.0  # сек
 from models import (
     get_session,
     get_active_interview,
-    start_interview,
-    cancel_interview,
-    save_answer_1,
-    save_answer_2,
-    save_answer_3_and_complete,
 )
+import interview_journal
+import keyboards
 
 
-def is_in_interview(telegram_id: int) -> bool:
+async def is_in_interview(telegram_id: int) -> bool:
     """Проверить, проходит ли пользователь собеседование."""
-    with get_session() as session:
-        interview = get_active_interview(session, telegram_id)
+    async with get_session() as session:
+        interview = await get_active_interview(session, telegram_id)
         return interview is not None and interview.is_active
 
 
-def start_session(telegram_id: int, first_question: str) -> None:
-    """Отметить начало собеседования в БД."""
-    with get_session() as session:
-        start_interview(session, telegram_id, first_question)
+async def start_session(telegram_id: int, first_question: str) -> None:
+    """Отметить начало собеседования в БД (через журнал, без ожидания записи)."""
+    interview_journal.journal.record("start", telegram_id, question=first_question)
 
 
-def end_session(telegram_id: int) -> None:
-    """Отметить завершение/отмену собеседования в БД."""
-    with get_session() as session:
-        cancel_interview(session, telegram_id)
+async def end_session(telegram_id: int) -> None:
+    """Отметить отмену собеседования в БД (через журнал, без ожидания записи)."""
+    interview_journal.journal.record("cancel", telegram_id)
 
 
 # ==================== HTTP клиент для n8n ====================
 
 async def _try_call_n8n_once(payload: dict[str, Any]) -> dict[str, Any]:
-    """Один попыт вызова n8n."""
+    """Один вызов n8n."""
     try:
-        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, verify=False) as client:
-            print(f"\n{'='*60}")
-            print(f"[n8n REQUEST]")
-            print(f"URL: {N8N_WEBHOOK_URL}")
-            print(f"Payload: {payload}")
+        logger.debug(
+            "[n8n REQUEST]",
+            extra={"category": "n8n", "url": N8N_WEBHOOK_URL, "payload": payload},
+        )
 
-            response = await client.post(N8N_WEBHOOK_URL, json=payload)
+        response = await n8n_gateway.post(N8N_WEBHOOK_URL, payload, timeout=HTTP_TIMEOUT)
 
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text}")
-            print(f"{'='*60}\n")
+        logger.info(
+            "[n8n RESPONSE]",
+            extra={"category": "n8n", "url": N8N_WEBHOOK_URL, "status": response.status_code, "body": response.text},
+        )
 
-            response.raise_for_status()
-            data = response.json()
-            return data
+        response.raise_for_status()
+        data = response.json()
+        return data
     except httpx.HTTPStatusError as e:
-        print(f"\n{'='*60}")
-        print(f"[n8n ERROR - Status {e.response.status_code}]")
-        print(f"URL: {N8N_WEBHOOK_URL}")
-        print(f"Error: {e.response.text}")
-        print(f"{'='*60}\n")
-
-        if e.response.status_code == 404:
-            # Webhook не зарегистрирован — нужно нажать Execute/Test в n8n
-            raise  # Пробросим, чтобы retry логика могла обработать
+        logger.error(
+            f"[n8n ERROR - Status {e.response.status_code}]",
+            extra={"category": "n8n", "url": N8N_WEBHOOK_URL, "body": e.response.text},
+        )
+        raise
+    except n8n_gateway.CircuitOpenError:
         raise
     except Exception as e:
-        print(f"\n{'='*60}")
-        print(f"[n8n EXCEPTION]")
-        print(f"Error: {type(e).__name__}: {e}")
-        print(f"{'='*60}\n")
-        logger.error(f"n8n call error: {e}")
+        logger.error(
+            "[n8n EXCEPTION]",
+            extra={"category": "n8n", "url": N8N_WEBHOOK_URL, "error": f"{type(e).__name__}: {e}"},
+        )
         raise
 
 
 async def call_n8n(payload: dict[str, Any]) -> dict[str, Any]:
-    """Отправить запрос в n8n с автоматическим ретраем при 404.
+    """Отправить запрос в n8n.
+
+    Ретраев нет: если вебхук не зарегистрирован или n8n лежит, circuit breaker
+    в ``n8n_gateway`` сразу отклоняет вызовы всех пользователей, пока фоновый
+    проб не увидит, что вебхук снова доступен.
 
     Returns:
         Ответ от n8n в формате:
         - При успехе: {"question": "...", "done": False} или {"result": "...", "done": True}
         - При ошибке: {"error": "..."}
     """
-    last_error: Exception | None = None
-
-    for attempt in range(N8N_RETRY_ATTEMPTS):
-        try:
-            logger.info(f"→ n8n (attempt {attempt + 1}): {payload.get('action')}")
-            data = await _try_call_n8n_once(payload)
-            logger.info(f"← n8n: success")
-            return data
-
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                # Webhook не готов — ждём и повторяем
-                last_error = e
-                if attempt < N8N_RETRY_ATTEMPTS - 1:
-                    await asyncio.sleep(N8N_RETRY_INTERVAL)
-                    continue
-            # Для других ошибок — не повторяем
-            logger.error(f"n8n HTTP {e.response.status_code}: {e.response.text}")
-            return {"error": f"Ошибка сервиса: {e.response.status_code}"}
-
-        except httpx.TimeoutException:
-            logger.error(f"n8n timeout")
-            return {"error": "Сервис не отвечает, попробуйте позже"}
-
-        except Exception as e:
-            logger.error(f"n8n error: {e}")
-            return {"error": "Не удалось связаться с сервисом"}
-
-    # Все попытки исчерпаны, вернём ошибку 404
-    logger.error(f"n8n: webhook not registered after {N8N_RETRY_ATTEMPTS} attempts")
-    return {"error": "Webhook не зарегистрирован в n8n. Откройте workflow и нажмите 'Execute workflow' кнопку на canvas."}
-
-
-# ==================== Клавиатуры ====================
-
-def get_interview_keyboard() -> ReplyKeyboardMarkup:
-    """Клавиатура во время собеседования."""
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отменить собеседование")]],
-        resize_keyboard=True,
-    )
+    try:
+        logger.info(f"→ n8n: {payload.get('action')}")
+        data = await _try_call_n8n_once(payload)
+        logger.info(f"← n8n: success")
+        return data
 
+    except n8n_gateway.CircuitOpenError as e:
+        logger.warning(f"n8n circuit open: {e.reason}")
+        if e.reason == n8n_gateway.REASON_NOT_REGISTERED:
+            return {"error": N8N_NOT_REGISTERED_ERROR}
+        return {"error": "Сервис временно недоступен, попробуйте позже"}
 
-def get_main_keyboard() -> ReplyKeyboardMarkup:
-    """Основная клавиатура HR-раздела (подставь свою)."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🎭 Пройти собеседование")],
-            [KeyboardButton(text="◀️ Назад")],
-        ],
-        resize_keyboard=True,
-    )
+    except httpx.HTTPStatusError as e:
+        if n8n_gateway.is_webhook_not_registered(e.response):
+            return {"error": N8N_NOT_REGISTERED_ERROR}
+        logger.error(f"n8n HTTP {e.response.status_code}: {e.response.text}")
+        return {"error": f"Ошибка сервиса: {e.response.status_code}"}
+
+    except httpx.TimeoutException:
+        logger.error(f"n8n timeout")
+        return {"error": "Сервис не отвечает, попробуйте позже"}
+
+    except Exception as e:
+        logger.error(f"n8n error: {e}")
+        return {"error": "Не удалось связаться с сервисом"}
 
 
 # ==================== Обработчики ====================
@@ -198,13 +168,12 @@ async def handle_start_interview(message: types.Message, state: FSMContext) -> N
         "🔸 В конце я дам развернутый фидбек.\n\n"
         "🏁 <b>Готов начать? Жмите кнопку ниже!</b>",
         parse_mode="HTML",
-        reply_markup=get_interview_keyboard(),
+        reply_markup=keyboards.INTERVIEW,
     )
 
     # Показываем статус
     status_msg = await message.answer(
         "⏳ <b>Подготавливаю собеседование...</b>\n\n"
-        "Если это займёт больше 10 секунд, значит в n8n нужно нажать кнопку 'Execute workflow'.\n"
         "Пожалуйста, подождите...",
         parse_mode="HTML"
     )
@@ -237,7 +206,7 @@ async def handle_start_interview(message: types.Message, state: FSMContext) -> N
 
     # Успех — начинаем сессию в БД
     question = data.get("question", "Расскажите о себе и вашем опыте в продажах.")
-    start_session(telegram_id, question)
+    await start_session(telegram_id, question)
 
     # Устанавливаем состояние собеседования
     await state.set_state(BotStates.INTERVIEW)
@@ -247,7 +216,7 @@ async def handle_start_interview(message: types.Message, state: FSMContext) -> N
         f"<b>Вопрос 1 из 3:</b>\n{question}\n\n"
         "💬 Ответьте текстом или 🎙 голосовым сообщением.",
         parse_mode="HTML",
-        reply_markup=get_interview_keyboard(),
+        reply_markup=keyboards.INTERVIEW,
     )
 
 
@@ -272,7 +241,7 @@ async def handle_cancel_interview(message: types.Message, state: FSMContext) ->
         "telegram_id": telegram_id,
     })
 
-    end_session(telegram_id)
+    await end_session(telegram_id)
 
     # Возвращаемся в состояние HR меню
     await state.set_state(BotStates.HR_MENU)
@@ -280,7 +249,7 @@ async def handle_cancel_interview(message: types.Message, state: FSMContext) ->
     await message.answer(
         "🚫 Собеседование отменено.\n"
         "Вы можете начать заново в любое время.",
-        reply_markup=get_main_keyboard(),
+        reply_markup=keyboards.INTERVIEW_MENU,
     )
 
 
@@ -316,8 +285,8 @@ async def handle_voice_answer(message: types.Message, state: FSMContext) -> None
     except Exception:
         pass
 
-    # Обрабатываем ответ
-    await _process_n8n_response(message, telegram_id, data, state)
+    # Обрабатываем ответ (текст ответа — расшифровка Whisper из n8n)
+    await _process_n8n_response(message, telegram_id, data, state, voice_file_id=voice.file_id)
 
 
 @router.message(StateFilter(BotStates.INTERVIEW), F.text)
@@ -353,7 +322,7 @@ async def handle_text_answer(message: types.Message, state: FSMContext) -> None:
         pass
 
     # Обрабатываем ответ
-    await _process_n8n_response(message, telegram_id, data, state)
+    await _process_n8n_response(message, telegram_id, data, state, answer_text=text)
 
 
 async def _process_n8n_response(
@@ -361,8 +330,14 @@ async def _process_n8n_response(
     telegram_id: int,
     data: dict[str, Any],
     state: FSMContext,
+    answer_text: str | None = None,
+    voice_file_id: str | None = None,
 ) -> None:
-    """Обработка ответа от n8n после ответа кандидата."""
+    """Обработка ответа от n8n после ответа кандидата.
+
+    answer_text / voice_file_id — то, что прислал кандидат; для расшифровки
+    берутся, если n8n не вернул ``answer`` / ``voice_file_id``.
+    """
 
     # Ошибка
     if "error" in data:
@@ -372,29 +347,23 @@ async def _process_n8n_response(
     # Проверяем, завершено ли собеседование
     is_done = data.get("done", False)
     stage = data.get("stage", 0)  # текущий этап после сохранения
-    answer_text = data.get("answer", "")  # текст ответа (расшифрованный через Whisper если голос)
-    voice_file_id = data.get("voice_file_id")  # ID голосового файла если был
+    # Текст ответа: расшифровка Whisper для голоса, для текста — сам ответ кандидата
+    answer_text = data.get("answer") or answer_text or ""
+    voice_file_id = data.get("voice_file_id") or voice_file_id  # ID голосового файла если был
 
     if is_done:
         # Финал — сохраняем последний ответ и завершаем
         result = data.get("result", "")
         hr_summary = data.get("hr_recommendation", {})
 
-        #with get_session() as session:
-        #    try:
-        #        # Сохраняем 3-й ответ и завершаем собеседование
-        #        save_answer_3_and_complete(
-        #            session,
-        #            telegram_id,
-        #            answer=answer_text,
-        #            hr_recommendation=hr_summary,
-        #            voice_file_id=voice_file_id,
-        #        )
-        #    except Exception as e:
-        #        print(f"Error saving final answer to DB: {e}")
-
-        # Завершаем сессию в любом случае
-        end_session(telegram_id)
+        # Сохраняем 3-й ответ и завершаем собеседование — в фоне, ответ кандидату не ждёт БД
+        interview_journal.journal.record(
+            "complete",
+            telegram_id,
+            answer=answer_text,
+            hr_recommendation=hr_summary,
+            voice_file_id=voice_file_id,
+        )
 
         # Возвращаемся в состояние HR меню
         await state.set_state(BotStates.HR_MENU)
@@ -403,31 +372,31 @@ async def _process_n8n_response(
             "✅ <b>Собеседование завершено!</b>\n\n"
             "Спасибо за уделённое время! 🙏",
             parse_mode="HTML",
-            reply_markup=get_main_keyboard(),
+            reply_markup=keyboards.INTERVIEW_MENU,
         )
     else:
         # Следующий вопрос - сохраняем ответ и вопрос
         question = data.get("question", "Продолжайте, пожалуйста.")
         question_num = stage + 1  # stage 0 = вопрос 1, stage 1 = вопрос 2, stage 2 = вопрос 3
 
-        # Сохраняем в БД в зависимости от этапа
-        #with get_session() as session:
-        #    try:
-        #        # ВАЖНО: Мы ориентируемся на ответ n8n, а не на базу, чтобы #избежать гонки
-        #        if stage == 1:
-        #            # n8n перевел нас на 1 этап -> значит мы сохраняем ответ #на 1 вопрос
-        #            save_answer_1(session, telegram_id, answer_text, #question, voice_file_id)
-        #        elif stage == 2:
-        #            # n8n перевел нас на 2 этап -> значит мы сохраняем ответ #на 2 вопрос
-        #            save_answer_2(session, telegram_id, answer_text, #question, voice_file_id)
-        #    except Exception as e:
-        #        print(f"Error saving answer to DB: {e}")
+        # Сохраняем в БД в зависимости от этапа — в фоне, следующий вопрос не ждёт БД.
+        # ВАЖНО: Мы ориентируемся на ответ n8n, а не на базу, чтобы избежать гонки:
+        # stage 1 -> ответ на 1 вопрос, stage 2 -> ответ на 2 вопрос
+        if stage in (1, 2):
+            interview_journal.journal.record(
+                "answer",
+                telegram_id,
+                stage=stage,
+                answer=answer_text,
+                question=question,
+                voice_file_id=voice_file_id,
+            )
 
         await message.answer(
             f"<b>Вопрос {question_num} из 3:</b>\n{question}\n\n"
             "💬 Ответьте текстом или 🎙 голосовым сообщением.",
             parse_mode="HTML",
-            reply_markup=get_interview_keyboard(),
+            reply_markup=keyboards.INTERVIEW,
         )
 
 
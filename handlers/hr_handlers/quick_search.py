@@ -1,41 +1,27 @@
 """Обработчик кнопки 'Быстрый подбор'"""
 
-import asyncio
 from aiogram import types, F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from progress import ProgressAnimator
+import keyboards
 
 router = Router()
 
+QUICK_SEARCH_STEPS = [
+    "🔄 <i>Подключение к базам кандидатов...</i>",
+    "🔍 <i>Сканирование источников (HH, LinkedIn, TG)...</i>",
+    "🧠 <i>Найдено 142 анкеты. Анализирую опыт...</i>",
+    "🗑 <i>Отсев нерелевантных... (осталось 12)</i>",
+    "⭐ <i>Выбор лучших по Soft Skills...</i>",
+]
+
 
 class QuickSearchState(StatesGroup):
     """Состояния FSM для быстрого подбора."""
     waiting_for_action = State()
 
 
-def get_cancel_keyboard() -> ReplyKeyboardMarkup:
-    """Клавиатура с кнопкой отмены для режима подбора."""
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отмена")]],
-        resize_keyboard=True,
-    )
-
-
-def get_hr_keyboard() -> ReplyKeyboardMarkup:
-    """Базовое меню HR отдела."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🎭 Пройти собеседование")],
-            [KeyboardButton(text="📄 Анализ резюме (CV Scan)")],
-            [KeyboardButton(text="🔥 Быстрый подбор")],
-            [KeyboardButton(text="⚙️ Информация для HR")],
-            [KeyboardButton(text="🔙 Назад в меню")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 @router.message(F.text == "🔥 Быстрый подбор")
 async def start_fast_search_demo(message: types.Message, state: FSMContext) -> None:
     """Демонстрация быстрого подбора с имитацией работы ИИ."""
@@ -52,34 +38,10 @@ async def start_fast_search_demo(message: types.Message, state: FSMContext) -> N
         "🔹 Выдача только тех, кого стоит звать на звонок\n\n"
         "👇 <b>Запускаю демонстрацию на примере вакансии «Менеджер по продажам»...</b>",
         parse_mode="HTML",
-        reply_markup=get_cancel_keyboard(),
+        reply_markup=keyboards.CANCEL,
     )
 
-    # Небольшая пауза для чтения
-    await asyncio.sleep(1.5)
-
-    # 2. Эффект "Работающего ИИ" (изменяющееся сообщение)
-    status_msg = await message.answer(
-        "🔄 <i>Подключение к базам кандидатов...</i>",
-        parse_mode="HTML"
-    )
-
-    steps = [
-        "🔍 <i>Сканирование источников (HH, LinkedIn, TG)...</i>",
-        "🧠 <i>Найдено 142 анкеты. Анализирую опыт...</i>",
-        "🗑 <i>Отсев нерелевантных... (осталось 12)</i>",
-        "⭐ <i>Выбор лучших по Soft Skills...</i>",
-        "✅ <b>Готово! Подобран Топ-1 кандидат.</b>"
-    ]
-
-    for step in steps:
-        await asyncio.sleep(1.0)  # Пауза между этапами (1 секунда)
-        try:
-            await status_msg.edit_text(step, parse_mode="HTML")
-        except Exception:
-            pass  # Игнорируем ошибки, если юзер удалил чат и т.д.
-
-    # 3. Отправляем "Карточку Героя"
+    # 2. "Карточка Героя"
     candidate_text = (
         "🏆 <b>Кандидат #1: Елена В.</b>\n"
         "<i>Менеджер по продажам (B2B)</i>\n\n"
@@ -93,30 +55,28 @@ async def start_fast_search_demo(message: types.Message, state: FSMContext) -> N
         "📅 <b>Готова выйти:</b> Завтра"
     )
 
-    # Удаляем сообщение о загрузке, чтобы не мешало
-    await status_msg.delete()
-
-    # Отправляем результат (Фото + Описание)
     photo_url = (
         "https://upload.wikimedia.org/wikipedia/commons/thumb/0/0b/"
         "Businesswoman_icon_%28Noun_Project%29.svg/1024px-"
         "Businesswoman_icon_%28Noun_Project%29.svg.png"
     )
 
-    try:
-        await message.answer_photo(
-            photo=photo_url,
-            caption=candidate_text,
-            parse_mode="HTML",
-            reply_markup=get_cancel_keyboard()
-        )
-    except Exception:
-        # Фоллбэк: если Telegram не смог скачать картинку
-        await message.answer(
-            candidate_text,
-            parse_mode="HTML",
-            reply_markup=get_cancel_keyboard()
-        )
+    # 3. Эффект "Работающего ИИ" — пока Telegram загружает карточку (Фото + Описание)
+    async with ProgressAnimator(message, QUICK_SEARCH_STEPS, delete=True):
+        try:
+            await message.answer_photo(
+                photo=photo_url,
+                caption=candidate_text,
+                parse_mode="HTML",
+                reply_markup=keyboards.CANCEL
+            )
+        except Exception:
+            # Фоллбэк: если Telegram не смог скачать картинку
+            await message.answer(
+                candidate_text,
+                parse_mode="HTML",
+                reply_markup=keyboards.CANCEL
+            )
 
 
 @router.message(QuickSearchState.waiting_for_action, F.text == "❌ Отмена")
@@ -125,7 +85,7 @@ async def cancel_fast_search(message: types.Message, state: FSMContext) -> None:
     await state.clear()
     await message.answer(
         "Быстрый подбор отменен.",
-        reply_markup=get_hr_keyboard(),
+        reply_markup=keyboards.HR_MENU,
     )
 
 
@@ -1,33 +1,23 @@
 """Обработчик кнопки IT HelpDesk"""
 
-import os
+import logging
+
 from aiogram import Router, F, types
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, FSInputFile
 from aiogram.fsm.context import FSMContext
 
+import media_registry
 from states import BotStates
 from handlers.it_helpdesk_handlers import menu
+import keyboards
 
+logger = logging.getLogger(__name__)
 router = Router()
 
 
-def _it_helpdesk_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔍 AI-Глаз")],
-            [KeyboardButton(text="⚡ Мгновенное действие")],
-            [KeyboardButton(text="📋 Умный Тикет")],
-            [KeyboardButton(text="❓ Как подключить")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 @router.message(F.text == "🛠 IT HelpDesk")
 async def it_helpdesk_menu(message: types.Message, state: FSMContext):
     """Отображает меню IT HelpDesk с основными действиями."""
-    print(f"✅ IT HELPDESK HANDLER TRIGGERED! Text: {message.text!r}")
+    logger.debug("IT HelpDesk menu", extra={"telegram_id": message.from_user.id})
 
     # Если пользователь был в собеседовании, отменяем его
     current_state = await state.get_state()
@@ -41,17 +31,14 @@ async def it_helpdesk_menu(message: types.Message, state: FSMContext):
                 "telegram_id": telegram_id,
             })
             # Завершаем сессию
-            end_session(telegram_id)
+            await end_session(telegram_id)
         except Exception as e:
-            print(f"Error ending interview session: {e}")
+            logger.error(f"Error ending interview session: {e}")
     # Отправляем видео в кружочке (Video Note)
-    video_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src", "1221.mp4")
     try:
-        if os.path.exists(video_path):
-            video = FSInputFile(video_path)
-            await message.answer_video_note(video)
+        await media_registry.send(message, "src/1221.mp4")
     except Exception as e:
-        print(f"Error sending video: {e}")
+        logger.error(f"Error sending video: {e}")
     
     menu_text = (
         "🦾 <b>Системы в норме. Я готова к работе.</b>\n\n"
@@ -63,7 +50,7 @@ async def it_helpdesk_menu(message: types.Message, state: FSMContext):
         "❓ <b>Как подключить</b> - Ваша база знаний, которая доступна 24/7.\n\n"
         "👇 <i>Выбирайте пунк меню!</i>"
     )
-    await message.answer(menu_text, parse_mode="HTML", reply_markup=_it_helpdesk_keyboard())
+    await message.answer(menu_text, parse_mode="HTML", reply_markup=keyboards.IT_MENU)
 
     # Устанавливаем состояние IT HelpDesk
     await state.set_state(BotStates.IT_HELPDESK_MENU)
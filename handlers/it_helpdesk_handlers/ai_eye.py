@@ -3,10 +3,12 @@
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
+from aiogram.types import ReplyKeyboardRemove
 import logging
 from typing import Any
-import httpx
+import n8n_gateway
+import n8n_jobs
+import keyboards
 
 
 logger = logging.getLogger(__name__)
@@ -20,62 +22,67 @@ async def call_vision_n8n(payload: dict[str, Any]) -> dict[str, Any]:
     """Отправка данных на анализ в n8n (webhook /vision)."""
 
     try:
-        print(f"\n{'='*60}")
-        print(f"[VISION n8n REQUEST]")
-        print(f"URL: {N8N_VISION_WEBHOOK_URL}")
-        print(f"Payload: {payload}")
-
-        async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-            response = await client.post(N8N_VISION_WEBHOOK_URL, json=payload)
-
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text}")
-            print(f"{'='*60}\n")
-
-            response.raise_for_status()
-            if response.content:
-                try:
-                    return response.json()
-                except Exception:
-                    return {"raw": response.text}
-            return {}
+        logger.debug(
+            "[VISION n8n REQUEST]",
+            extra={"category": "n8n", "url": N8N_VISION_WEBHOOK_URL, "payload": payload},
+        )
+
+        response = await n8n_gateway.post(N8N_VISION_WEBHOOK_URL, payload, timeout=60.0)
+
+        logger.info(
+            "[VISION n8n RESPONSE]",
+            extra={"category": "n8n", "url": N8N_VISION_WEBHOOK_URL, "status": response.status_code, "body": response.text},
+        )
+
+        response.raise_for_status()
+        if response.content:
+            try:
+                return response.json()
+            except Exception:
+                return {"raw": response.text}
+        return {}
     except Exception as e:
-        print(f"\n{'='*60}")
-        print(f"[VISION n8n ERROR]")
-        print(f"URL: {N8N_VISION_WEBHOOK_URL}")
-        print(f"Error: {type(e).__name__}: {e}")
-        print(f"{'='*60}\n")
+        logger.error(
+            "[VISION n8n ERROR]",
+            extra={"category": "n8n", "url": N8N_VISION_WEBHOOK_URL, "error": f"{type(e).__name__}: {e}"},
+        )
         raise
 
 
-class AIEyeState(StatesGroup):
-    """Состояния FSM для Vision анализа."""
+async def send_vision_request(message: types.Message, payload: dict[str, Any]) -> None:
+    """Передать запрос в n8n: асинхронной задачей с callback или напрямую."""
 
-    waiting_for_input = State()
+    if n8n_jobs.jobs_enabled():
+        await n8n_jobs.submit_job(
+            "vision",
+            N8N_VISION_WEBHOOK_URL,
+            payload,
+            telegram_id=message.from_user.id,
+            chat_id=message.chat.id,
+        )
+    else:
+        await call_vision_n8n(payload)
 
 
-def get_cancel_keyboard() -> ReplyKeyboardMarkup:
-    """Клавиатура с кнопкой отмены."""
+def _format_vision_result(result: dict[str, Any]) -> str:
+    """Текст решения AI-Глаза, который n8n присылает на callback."""
 
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отмена")]],
-        resize_keyboard=True,
+    solution = (
+        result.get("solution")
+        or result.get("answer")
+        or result.get("text")
+        or "Анализ выполнен, но решение не получено."
     )
+    return f"🔍 AI-Глаз: результат анализа\n\n{solution}"
 
 
-def get_it_helpdesk_keyboard() -> ReplyKeyboardMarkup:
-    """Базовое меню IT Help Desk."""
+n8n_jobs.register_formatter("vision", _format_vision_result)
 
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🎫 Умный тикет")],
-            [KeyboardButton(text="⚡ Мгновенные действия")],
-            [KeyboardButton(text="🔍 AI-Глаз")],
-            [KeyboardButton(text="🔌 Как подключиться")],
-            [KeyboardButton(text="🔙 Назад в меню")],
-        ],
-        resize_keyboard=True,
-    )
+
+class AIEyeState(StatesGroup):
+    """Состояния FSM для Vision анализа."""
+
+    waiting_for_input = State()
 
 
 @router.message(F.text == "🔍 AI-Глаз")
@@ -94,7 +101,7 @@ async def ai_eye_handler(message: types.Message, state: FSMContext):
         "📉 <i>Я понимаю даже сложные логи, консольные ошибки и \"синие экраны смерти\".</i>\n\n"
         "👇 <b>Пришлите скриншот, фото или опишите ошибку прямо в этот чат.</b>",
         parse_mode="HTML",
-        reply_markup=get_cancel_keyboard(),
+        reply_markup=keyboards.CANCEL,
     )
 
 
@@ -105,7 +112,7 @@ async def cancel_ai_eye(message: types.Message, state: FSMContext) -> None:
     await state.clear()
     await message.answer(
         "Анализ отменен.",
-        reply_markup=get_it_helpdesk_keyboard(),
+        reply_markup=keyboards.AI_EYE_IT_MENU,
     )
 
 
@@ -131,6 +138,7 @@ async def handle_photo(message: types.Message, state: FSMContext) -> None:
         payload = {
             "action": "vision_analyze",
             "telegram_id": message.from_user.id,
+            "chat_id": message.chat.id,
             "user_name": message.from_user.full_name or "",
             "content_type": "photo",
             "file_id": photo.file_id,
@@ -138,17 +146,17 @@ async def handle_photo(message: types.Message, state: FSMContext) -> None:
             "description": caption,
         }
         
-        await call_vision_n8n(payload)
+        await send_vision_request(message, payload)
         
         await message.answer(
             "✅ Изображение отправлено на анализ. Я сообщу результат, как только он будет готов.",
-            reply_markup=get_it_helpdesk_keyboard(),
+            reply_markup=keyboards.AI_EYE_IT_MENU,
         )
     except Exception as e:
         logger.error(f"Ошибка отправки изображения: {e}")
         await message.answer(
             f"❌ Ошибка отправки на анализ: {e}",
-            reply_markup=get_it_helpdesk_keyboard(),
+            reply_markup=keyboards.AI_EYE_IT_MENU,
         )
 
 
@@ -172,22 +180,23 @@ async def handle_text_description(message: types.Message, state: FSMContext) ->
         payload = {
             "action": "vision_analyze",
             "telegram_id": message.from_user.id,
+            "chat_id": message.chat.id,
             "user_name": message.from_user.full_name or "",
             "content_type": "text",
             "description": text_description,
         }
         
-        await call_vision_n8n(payload)
+        await send_vision_request(message, payload)
         
         await message.answer(
             "✅ Описание отправлено на анализ. Я сообщу решение, как только оно будет готово.",
-            reply_markup=get_it_helpdesk_keyboard(),
+            reply_markup=keyboards.AI_EYE_IT_MENU,
         )
     except Exception as e:
         logger.error(f"Ошибка отправки описания: {e}")
         await message.answer(
             f"❌ Ошибка отправки на анализ: {e}",
-            reply_markup=get_it_helpdesk_keyboard(),
+            reply_markup=keyboards.AI_EYE_IT_MENU,
         )
 
 
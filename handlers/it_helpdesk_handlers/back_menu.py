@@ -1,25 +1,14 @@
 """Обработчик кнопки Назад из IT HelpDesk в главное меню."""
 
 from aiogram import Router, F, types
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from states import BotStates
+import keyboards
 
 router = Router()
 
 
-def _main_menu_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🤝 HR и найм"), KeyboardButton(text="👷‍♂️ Охрана труда")],
-            [KeyboardButton(text="🛠 IT HelpDesk"), KeyboardButton(text="🧠 База Знаний")],
-            [KeyboardButton(text="💰 AI-Менеджер")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 @router.message(F.text == "🔙 Назад")
 async def back_to_main_menu(message: types.Message, state: FSMContext):
     # Устанавливаем состояние главного меню
@@ -27,7 +16,7 @@ async def back_to_main_menu(message: types.Message, state: FSMContext):
 
     await message.answer(
         "Возвращаю в главное меню. Выберите отдел:",
-        reply_markup=_main_menu_keyboard(),
+        reply_markup=keyboards.MAIN_MENU,
     )
 
 
@@ -1,15 +1,16 @@
 """Демонстрация RAG на IT-документации"""
 
-import asyncio
 import logging
 import httpx
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
-# Импортируем клавиатуру возврата в меню IT HelpDesk
-from handlers.it_helpdesk_handlers.smart_ticket import get_helpdesk_keyboard
+import n8n_gateway
+import semantic_cache
+import streaming
+from progress import ProgressAnimator
+import keyboards
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -21,12 +22,6 @@ N8N_RAG_WEBHOOK = "https://levinbiz.app.n8n.cloud/webhook/rag-demo"
 class RAGDemoState(StatesGroup):
     waiting_for_question = State()
 
-def get_exit_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="🔙 Завершить тест")]],
-        resize_keyboard=True
-    )
-
 @router.message(F.text == "❓ Как подключить")
 async def start_it_rag_demo(message: types.Message, state: FSMContext):
     """Демонстрация RAG на IT-документации."""
@@ -39,20 +34,19 @@ async def start_it_rag_demo(message: types.Message, state: FSMContext):
         "<b>Я решаю это иначе.</b> Я подключаюсь к Вашей Confluence/Jira, индексирую техническую документацию и отвечаю пользователям мгновенно.\n\n"
         "⚙️ <i>Инициализация IT-контура...</i>"
     )
-    msg = await message.answer(info_text, parse_mode="HTML")
-    
-    # Анимация загрузки "тяжелых" данных
-    await asyncio.sleep(1.0)
-    await msg.edit_text(info_text + "\n📥 <i>Импорт протоколов безопасности (ISO 27001)...</i>", parse_mode="HTML")
-    await asyncio.sleep(1.0)
-    await msg.edit_text(info_text + "\n🔗 <i>Индексация сетевых настроек и доступов...</i>", parse_mode="HTML")
-    await asyncio.sleep(0.8)
-    await msg.edit_text(info_text + "\n✅ <b>IT-База Знаний подключена.</b>", parse_mode="HTML")
-    
-    await asyncio.sleep(0.5)
-    
+    # Анимация загрузки "тяжелых" данных — пока реально переключаем состояние
+    async with ProgressAnimator(
+        message,
+        [
+            info_text,
+            info_text + "\n📥 <i>Импорт протоколов безопасности (ISO 27001)...</i>",
+            info_text + "\n🔗 <i>Индексация сетевых настроек и доступов...</i>",
+        ],
+        final=info_text + "\n✅ <b>IT-База Знаний подключена.</b>",
+    ):
+        await state.set_state(RAGDemoState.waiting_for_question)
+
     # 2. Призыв к тесту (Строго по IT)
-    await state.set_state(RAGDemoState.waiting_for_question)
     
     await message.answer(
         "💻 <b>Демо-режим: «Новый сотрудник»</b>\n\n"
@@ -66,7 +60,7 @@ async def start_it_rag_demo(message: types.Message, state: FSMContext):
         "👇 <b>Спросите меня о чем-то техническом.</b>\n"
         "<i>(Например: «Какой пароль от вайфая для гостей?» или «Как подключиться к VPN из дома?»)</i>",
         parse_mode="HTML",
-        reply_markup=get_exit_keyboard()
+        reply_markup=keyboards.CONNECT_EXIT
     )
 
 @router.message(RAGDemoState.waiting_for_question, F.text != "🔙 Завершить тест")
@@ -75,50 +69,74 @@ async def process_it_rag_question(message: types.Message):
     
     user_question = message.text
     status_msg = await message.answer("terminal@bot:~$ <i>grep 'search_query' /var/docs/wiki...</i>", parse_mode="HTML")
-    
+
+    # Похожий вопрос уже задавали — отвечаем без похода в n8n
+    cached_answer = semantic_cache.lookup("it_rag", user_question)
+    if cached_answer is not None:
+        await status_msg.edit_text(cached_answer, parse_mode="Markdown")
+        return
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
-                N8N_RAG_WEBHOOK, 
-                json={"question": user_question}
+        if streaming.streaming_enabled():
+            # Ответ дописывается в статусное сообщение по мере генерации
+            answer_text = await streaming.stream_answer(
+                status_msg,
+                N8N_RAG_WEBHOOK,
+                {"question": user_question},
+                parse_mode="Markdown",
+                timeout=30.0,
             )
-            
-            logger.info(f"n8n response status: {resp.status_code}")
-            logger.info(f"n8n response body: {resp.text}")
-            
-            # Проверяем статус ответа
-            if resp.status_code != 200:
-                await status_msg.edit_text(
-                    f"❌ Ошибка сервера: HTTP {resp.status_code}\n"
-                    f"Webhook может быть неактивен или неправильно настроен."
-                )
-                return
-            
-            # Пробуем распарсить JSON
-            try:
-                result = resp.json()
-                logger.info(f"Parsed JSON: {result}")
-            except Exception as json_err:
-                await status_msg.edit_text(
-                    f"❌ Ошибка парсинга ответа: {json_err}\n"
-                    f"Ответ сервера: {resp.text[:200]}"
-                )
-                return
-            
-            # Извлекаем ответ (пробуем разные варианты ключей)
-            answer_text = result.get('answer') or result.get('response') or result.get('output')
-            
-            if not answer_text:
-                # Если нет нужных ключей, показываем весь ответ
-                await status_msg.edit_text(
-                    f"⚠️ Получен ответ от сервера, но не найдено поле 'answer'.\n\n"
-                    f"Полный ответ:\n```json\n{result}\n```",
-                    parse_mode="Markdown"
-                )
-                return
-            
-            await status_msg.edit_text(answer_text, parse_mode="Markdown")
-            
+            semantic_cache.remember("it_rag", user_question, answer_text)
+            return
+
+        resp = await n8n_gateway.post(
+            N8N_RAG_WEBHOOK,
+            {"question": user_question},
+            timeout=30.0,
+        )
+
+        logger.info(f"n8n response status: {resp.status_code}")
+        logger.info(f"n8n response body: {resp.text}")
+
+        # Проверяем статус ответа
+        if resp.status_code != 200:
+            await status_msg.edit_text(
+                f"❌ Ошибка сервера: HTTP {resp.status_code}\n"
+                f"Webhook может быть неактивен или неправильно настроен."
+            )
+            return
+
+        # Пробуем распарсить JSON
+        try:
+            result = resp.json()
+            logger.info(f"Parsed JSON: {result}")
+        except Exception as json_err:
+            await status_msg.edit_text(
+                f"❌ Ошибка парсинга ответа: {json_err}\n"
+                f"Ответ сервера: {resp.text[:200]}"
+            )
+            return
+
+        # Извлекаем ответ (пробуем разные варианты ключей)
+        answer_text = result.get('answer') or result.get('response') or result.get('output')
+
+        if not answer_text:
+            # Если нет нужных ключей, показываем весь ответ
+            await status_msg.edit_text(
+                f"⚠️ Получен ответ от сервера, но не найдено поле 'answer'.\n\n"
+                f"Полный ответ:\n```json\n{result}\n```",
+                parse_mode="Markdown"
+            )
+            return
+
+        await status_msg.edit_text(answer_text, parse_mode="Markdown")
+        semantic_cache.remember("it_rag", user_question, answer_text)
+
+    except n8n_gateway.CircuitOpenError:
+        await status_msg.edit_text(
+            "❌ Сервер n8n временно недоступен или вебхук не активирован.\n"
+            "Попробуйте чуть позже."
+        )
     except httpx.TimeoutException:
         await status_msg.edit_text("❌ Timeout: Сервер n8n не отвечает более 30 секунд.")
     except httpx.ConnectError:
@@ -137,7 +155,7 @@ async def exit_rag_demo(message: types.Message, state: FSMContext):
         "Сессия завершена.\n\n"
         "Точно так же я могу выучить Вашу документацию по <b>1С, API, серверам или Cybersecurity</b>.",
         parse_mode="HTML",
-        reply_markup=get_helpdesk_keyboard()
+        reply_markup=keyboards.IT_MENU
     )
 
 
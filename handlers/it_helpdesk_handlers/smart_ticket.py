@@ -1,18 +1,18 @@
 """Модуль Smart Ticket: создание структурированных тикетов с помощью n8n/AI."""
 
-import asyncio
 import logging
-import httpx
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
-    ReplyKeyboardMarkup,
-    KeyboardButton,
 )
 
+import n8n_gateway
+from progress import ProgressAnimator
+import keyboards
+
 router = Router()
 logger = logging.getLogger(__name__)
 
@@ -22,20 +22,6 @@ class SmartTicketState(StatesGroup):
     waiting_for_ticket_description = State()
 
 
-# --- Клавиатура IT HelpDesk (возврат в раздел и назад) ---
-def get_helpdesk_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔍 AI-Глаз")],
-            [KeyboardButton(text="⚡ Мгновенное действие")],
-            [KeyboardButton(text="📋 Умный Тикет")],
-            [KeyboardButton(text="❓ Как подключить")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 # URL вебхука n8n (замените на свой при деплой)
 N8N_TICKET_WEBHOOK = "https://levinbiz.app.n8n.cloud/webhook/smart-ticket"
 
@@ -50,42 +36,43 @@ async def analyze_ticket_with_n8n(user_text: str, user_name: str) -> dict:
     }
 
     # Таймаут 30 сек, так как n8n может думать
-    # n8n Cloud: иногда требуется verify=False и тестовый режим вебхука
-    async with httpx.AsyncClient(timeout=30.0, verify=False, follow_redirects=True) as client:
-        try:
-            resp = await client.post(N8N_TICKET_WEBHOOK, json=payload)
-            status = resp.status_code
-            text = resp.text
-            logger.info(f"[SmartTicket->n8n] status={status} body={text[:200]}")
-
-            # n8n test webhook (404 с подсказкой) — вернуть понятный ответ
-            if status == 404 and "requested webhook" in text:
-                return {
-                    "ticket_id": "TEST-MODE",
-                    "title": "Вебхук не активирован (test mode)",
-                    "category": "System",
-                    "priority": "Low",
-                    "summary": (
-                        "В n8n нужно нажать 'Execute workflow' перед тестовым вызовом "
-                        "вебхука или опубликовать продовый вебхук /webhook/..."
-                    ),
-                    "solution_hint": "Откройте workflow в n8n и нажмите Execute.",
-                }
-
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            logger.error(f"Ошибка запроса в n8n: {type(e).__name__}: {e}")
-            # Возвращаем заглушку, чтобы демо не сломалось при ошибке сети
+    # n8n Cloud: иногда требуется тестовый режим вебхука (verify=False настроен в шлюзе)
+    try:
+        resp = await n8n_gateway.post(
+            N8N_TICKET_WEBHOOK, payload, timeout=30.0, follow_redirects=True
+        )
+        status = resp.status_code
+        text = resp.text
+        logger.info(f"[SmartTicket->n8n] status={status} body={text[:200]}")
+
+        # n8n test webhook (404 с подсказкой) — вернуть понятный ответ
+        if status == 404 and "requested webhook" in text:
             return {
-                "ticket_id": "ERR-DEMO",
-                "title": "Ошибка соединения с AI",
+                "ticket_id": "TEST-MODE",
+                "title": "Вебхук не активирован (test mode)",
                 "category": "System",
                 "priority": "Low",
-                "summary": user_text,  # Возвращаем исходный текст
-                "solution_hint": "Пожалуйста, попробуйте позже.",
+                "summary": (
+                    "В n8n нужно нажать 'Execute workflow' перед тестовым вызовом "
+                    "вебхука или опубликовать продовый вебхук /webhook/..."
+                ),
+                "solution_hint": "Откройте workflow в n8n и нажмите Execute.",
             }
 
+        resp.raise_for_status()
+        return resp.json()
+    except Exception as e:
+        logger.error(f"Ошибка запроса в n8n: {type(e).__name__}: {e}")
+        # Возвращаем заглушку, чтобы демо не сломалось при ошибке сети
+        return {
+            "ticket_id": "ERR-DEMO",
+            "title": "Ошибка соединения с AI",
+            "category": "System",
+            "priority": "Low",
+            "summary": user_text,  # Возвращаем исходный текст
+            "solution_hint": "Пожалуйста, попробуйте позже.",
+        }
+
 
 # --- Точка входа: активация Smart Ticket ---
 @router.message(F.text == "📋 Умный Тикет")
@@ -123,34 +110,18 @@ async def process_ticket_real_ai(message: types.Message, state: FSMContext):
     user_text = message.text or ""
     user_name = message.from_user.full_name if message.from_user else ""
 
-    # 1) Эффект "Работающего ИИ" (Immersive Loading)
-    status_msg = await message.answer(
-        "🧠 <i>Нейросеть читает ваш запрос...</i>",
-        parse_mode="HTML",
-    )
-
-    # Запускаем запрос в n8n параллельно с анимацией статусов
-    n8n_task = asyncio.create_task(
-        analyze_ticket_with_n8n(user_text, user_name)
-    )
-
-    await asyncio.sleep(1.0)
-    await status_msg.edit_text(
-        "🔍 <i>Классификация инцидента и поиск в базе знаний...</i>",
-        parse_mode="HTML",
-    )
-    await asyncio.sleep(1.0)
-    await status_msg.edit_text(
-        "⚖️ <i>Оценка SLA и приоритета (Matrix Impact)...</i>",
-        parse_mode="HTML",
-    )
-    await asyncio.sleep(0.8)
-    await status_msg.edit_text(
-        "📝 <i>Формирование карточки тикета в Jira...</i>", parse_mode="HTML"
-    )
-
-    # Ждем ответ от n8n
-    ai_data = await n8n_task
+    # 1) Эффект "Работающего ИИ" (Immersive Loading) — ровно столько, сколько думает n8n
+    async with ProgressAnimator(
+        message,
+        [
+            "🧠 <i>Нейросеть читает ваш запрос...</i>",
+            "🔍 <i>Классификация инцидента и поиск в базе знаний...</i>",
+            "⚖️ <i>Оценка SLA и приоритета (Matrix Impact)...</i>",
+            "📝 <i>Формирование карточки тикета в Jira...</i>",
+        ],
+        delete=True,
+    ):
+        ai_data = await analyze_ticket_with_n8n(user_text, user_name)
 
     # 2) Карточка тикета
     tid = ai_data.get("ticket_id", "REQ-000")
@@ -172,12 +143,6 @@ async def process_ticket_real_ai(message: types.Message, state: FSMContext):
         )]]
     )
 
-    # Удаляем сообщение с загрузкой и отправляем результат
-    try:
-        await status_msg.delete()
-    except Exception:
-        pass
-
     await message.answer(
         result_text,
         parse_mode="HTML",
@@ -187,7 +152,7 @@ async def process_ticket_real_ai(message: types.Message, state: FSMContext):
     # Возврат клавиатуры меню IT HelpDesk
     await message.answer(
         "Тикет создан. Что делаем дальше?",
-        reply_markup=get_helpdesk_keyboard(),
+        reply_markup=keyboards.IT_MENU,
     )
 
     # Сбрасываем состояние
@@ -1,11 +1,11 @@
 """Обработчик кнопки База Знаний"""
 
-import os
 from aiogram import types, F, Router
-from aiogram.types import FSInputFile, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
+import media_registry
 from states import BotStates
+import keyboards
 
 router = Router()
 
@@ -14,11 +14,7 @@ router = Router()
 async def knowledge_base_handler(message: types.Message, state: FSMContext):
     """Обработчик кнопки База Знаний"""
     # Отправляем видео-кружочек (Video Note)
-    video_path = "src/2026_1.mp4"
-    if os.path.exists(video_path):
-        video = FSInputFile(video_path)
-        await message.answer_video_note(video)
-    else:
+    if not await media_registry.send(message, "src/2026_1.mp4"):
         await message.answer("Видео не найдено")
 
     # Отправляем сообщение с описанием возможностей
@@ -38,18 +34,7 @@ async def knowledge_base_handler(message: types.Message, state: FSMContext):
 
 👇 Что запустим первым?"""
 
-    # Создаем клавиатуру для раздела База Знаний
-    kb_keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔎 Найти ответ")],
-            [KeyboardButton(text="🚀 Курс молодого бойца")],
-            [KeyboardButton(text="📂 Библиотека")],
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
-
-    await message.answer(kb_text, parse_mode="HTML", reply_markup=kb_keyboard)
+    await message.answer(kb_text, parse_mode="HTML", reply_markup=keyboards.KB_MENU)
 
     # Устанавливаем состояние меню База Знаний
     await state.set_state(BotStates.KNOWLEDGE_BASE_MENU)
@@ -1,10 +1,10 @@
 """Обработчик кнопки 'Назад в меню' для раздела База Знаний"""
 
 from aiogram import types, F, Router
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from states import BotStates
+import keyboards
 
 router = Router()
 
@@ -16,25 +16,7 @@ async def back_menu_handler(message: types.Message, state: FSMContext):
     current_state = await state.get_state()
 
     if current_state == BotStates.KNOWLEDGE_BASE_MENU or "knowledge_base" in str(current_state):
-        # Возвращаем в главное меню
-        keyboard = ReplyKeyboardMarkup(
-            keyboard=[
-                [
-                    KeyboardButton(text="🤝 HR и найм"),
-                    KeyboardButton(text="👷‍♂️ Охрана труда"),
-                ],
-                [
-                    KeyboardButton(text="🛠 IT HelpDesk"),
-                    KeyboardButton(text="🧠 База Знаний"),
-                ],
-                [
-                    KeyboardButton(text="💰 AI-Менеджер"),
-                ]
-            ],
-            resize_keyboard=True
-        )
-
-        await message.answer("Вы вернулись в главное меню", reply_markup=keyboard)
+        await message.answer("Вы вернулись в главное меню", reply_markup=keyboards.MAIN_MENU)
         await state.set_state(BotStates.MAIN_MENU)
 
 
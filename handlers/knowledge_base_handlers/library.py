@@ -1,10 +1,10 @@
 """Обработчик подраздела 'Библиотека'"""
 
 from aiogram import types, F, Router
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from states import BotStates
+import keyboards
 
 router = Router()
 
@@ -45,15 +45,7 @@ async def library_handler(message: types.Message, state: FSMContext):
 
 Выберите интересующую вас категорию:"""
 
-    # Создаем клавиатуру для возврата
-    kb_keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
-
-    await message.answer(library_text, parse_mode="HTML", reply_markup=kb_keyboard)
+    await message.answer(library_text, parse_mode="HTML", reply_markup=keyboards.BACK_TO_MENU)
     await state.set_state(BotStates.KNOWLEDGE_BASE_MENU)
 
 
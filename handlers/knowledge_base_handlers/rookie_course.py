@@ -1,10 +1,10 @@
 """Обработчик подраздела 'Курс молодого бойца'"""
 
 from aiogram import types, F, Router
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from states import BotStates
+import keyboards
 
 router = Router()
 
@@ -40,15 +40,7 @@ async def rookie_course_handler(message: types.Message, state: FSMContext):
 
 Нажмите кнопку "Начать обучение", чтобы начать курс:"""
 
-    # Создаем клавиатуру для возврата
-    kb_keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔙 Назад в меню")]
-        ],
-        resize_keyboard=True
-    )
-
-    await message.answer(rookie_text, parse_mode="HTML", reply_markup=kb_keyboard)
+    await message.answer(rookie_text, parse_mode="HTML", reply_markup=keyboards.BACK_TO_MENU)
     await state.set_state(BotStates.KNOWLEDGE_BASE_MENU)
 
 
@@ -1,11 +1,15 @@
 """Обработчик раздела 'Найти ответ' (Корпоративная база знаний)."""
 
+import os
 import logging
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-import httpx
+import n8n_gateway
+import semantic_cache
+import streaming
+from answer_cache import AnswerCache, normalize_query
+import keyboards
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -13,48 +17,101 @@ router = Router()
 # ⚠️ Вставь сюда URL твоего НОВОГО вебхука из n8n (Company RAG)
 N8N_COMPANY_WEBHOOK_URL = "https://levinbiz.app.n8n.cloud/webhook/company-rag"
 
+# Ответы базы знаний одинаковы для всех — кэшируем их в памяти
+RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "3600"))  # сек
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "256"))  # вопросов
+RAG_CACHE_WARMUP = os.getenv("RAG_CACHE_WARMUP", "1") == "1"
+
+RAG_ERROR_ANSWER = "😔 База знаний сейчас отдыхает. Попробуйте позже."
+
+# Кнопки-подсказки — их ответы прогреваются при старте бота
+PRESET_QUESTIONS = [
+    "🌴 Оформление отпуска",
+    "💰 Дни выплаты зарплаты",
+    "🤒 Больничный лист",
+    "🏥 ДМС и страховка",
+]
+
+_answer_cache = AnswerCache(ttl=RAG_CACHE_TTL, max_size=RAG_CACHE_SIZE)
+
 class CompanyKBState(StatesGroup):
     waiting_for_question = State()
 
 # --- Кнопки-подсказки (Самое важное для Демо) ---
-def _company_menu_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🌴 Оформление отпуска"), KeyboardButton(text="💰 Дни выплаты зарплаты")],
-            [KeyboardButton(text="🤒 Больничный лист"), KeyboardButton(text="🏥 ДМС и страховка")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-        input_field_placeholder="Спросите о жизни компании..."
-    )
+COMPANY_MENU = keyboards.reply(
+    "kb_company_menu",
+    PRESET_QUESTIONS[0:2],
+    PRESET_QUESTIONS[2:4],
+    ["🔙 Назад"],
+    placeholder="Спросите о жизни компании...",
+)
 
-def _main_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Вернуться в главное меню (твое основное меню)."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔎 Найти ответ")],
-            [KeyboardButton(text="🚀 Курс молодого бойца")],
-            [KeyboardButton(text="📂 Библиотека")],
-            # ... добавь сюда свои кнопки выхода если есть
-        ],
-        resize_keyboard=True
+# --- Логика запроса ---
+async def _fetch_company_answer(question: str) -> str:
+    """Запрос в n8n без обработки ошибок (ошибки не должны попасть в кэш)."""
+    # Отправляем в n8n просто query
+    response = await n8n_gateway.post(
+        N8N_COMPANY_WEBHOOK_URL,
+        {"query": question},
+        timeout=60.0,
     )
+    response.raise_for_status()
+    # Ждем ответ в поле 'answer' (как настраивали раньше)
+    answer = response.json().get("answer")
+    if not answer:
+        raise ValueError("n8n вернул пустой ответ")
+    return answer
+
+async def _fetch_and_remember_company_answer(question: str) -> str:
+    answer = await _fetch_company_answer(question)
+    semantic_cache.remember("company_rag", question, answer)
+    return answer
+
+def _cached_company_answer(question: str) -> str | None:
+    """Ответ из точного кэша или индекса похожих вопросов (без n8n)."""
+    answer = _answer_cache.get(normalize_query(question))
+    if answer is None:
+        answer = semantic_cache.lookup("company_rag", question)
+    return answer
 
-# --- Логика запроса ---
 async def ask_company_rag(question: str) -> str:
+    # Ответ на похожий вопрос не кладём в точный кэш под ключом этого
+    # вопроса: ошибка похожести не должна закрепиться на час
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # Отправляем в n8n просто query
-            response = await client.post(
-                N8N_COMPANY_WEBHOOK_URL,
-                json={"query": question}
-            )
-            response.raise_for_status()
-            # Ждем ответ в поле 'answer' (как настраивали раньше)
-            return response.json().get("answer", "⚠️ Ошибка AI.")
+        answer = _cached_company_answer(question)
+        if answer is not None:
+            return answer
+        return await _answer_cache.get_or_fetch(question, _fetch_and_remember_company_answer)
     except Exception as e:
         logger.error(f"Company RAG Error: {e}")
-        return "😔 База знаний сейчас отдыхает. Попробуйте позже."
+        return RAG_ERROR_ANSWER
+
+def _remember_company_answer(question: str, answer: str) -> None:
+    _answer_cache.set(normalize_query(question), answer)
+    semantic_cache.remember("company_rag", question, answer)
+
+async def stream_company_answer(message: types.Message) -> None:
+    """Потоковый режим: ответ дописывается в сообщение по мере генерации."""
+    status_msg = await message.answer("🤖 Ищу ответ в базе знаний...")
+    try:
+        answer = await streaming.stream_answer(
+            status_msg,
+            N8N_COMPANY_WEBHOOK_URL,
+            {"query": message.text},
+            prefix="🤖 <b>Ответ HR-ассистента:</b>\n\n",
+            parse_mode="HTML",
+        )
+        _remember_company_answer(message.text, answer)
+    except Exception as e:
+        logger.error(f"Company RAG stream Error: {e}")
+        await status_msg.edit_text(RAG_ERROR_ANSWER)
+
+async def warm_up_company_rag() -> None:
+    """Прогреть кэш ответами на кнопки-подсказки (вызывается из main.main())."""
+    if not RAG_CACHE_WARMUP:
+        return
+    warmed = await _answer_cache.warm_up(PRESET_QUESTIONS, _fetch_company_answer)
+    logger.info(f"Company RAG: прогрето {warmed}/{len(PRESET_QUESTIONS)} ответов")
 
 # --- Хендлеры ---
 
@@ -72,16 +129,26 @@ async def start_company_kb(message: types.Message, state: FSMContext):
         "🏥 ДМС, больничные и справки\n\n"
         "👇 <b>Нажмите на тему или задайте вопрос своими словами:</b>",
         parse_mode="HTML",
-        reply_markup=_company_menu_keyboard()
+        reply_markup=COMPANY_MENU
     )
 
 @router.message(CompanyKBState.waiting_for_question, F.text == "🔙 Назад")
 async def exit_kb(message: types.Message, state: FSMContext):
     await state.clear()
-    await message.answer("Выход в главное меню.", reply_markup=_main_menu_keyboard())
+    await message.answer("Выход в главное меню.", reply_markup=keyboards.KB_SEARCH_EXIT)
 
 @router.message(CompanyKBState.waiting_for_question)
 async def process_question(message: types.Message):
+    if not message.text:
+        # Стикер, фото, голосовое — искать в базе знаний нечего
+        await message.answer("✍️ Напишите вопрос текстом.", reply_markup=COMPANY_MENU)
+        return
+
+    # Первый токен важнее полного ответа: стримим, если ответа ещё нет в кэше
+    if streaming.streaming_enabled() and _cached_company_answer(message.text) is None:
+        await stream_company_answer(message)
+        return
+
     # Показываем статус "печатает..."
     await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
 
@@ -90,7 +157,7 @@ async def process_question(message: types.Message):
     await message.answer(
         f"🤖 <b>Ответ HR-ассистента:</b>\n\n{answer}",
         parse_mode="HTML",
-        reply_markup=_company_menu_keyboard() # Оставляем кнопки, чтобы можно было спросить еще что-то
+        reply_markup=COMPANY_MENU # Оставляем кнопки, чтобы можно было спросить еще что-то
     )
 
 def register_handlers(parent_router: Router):
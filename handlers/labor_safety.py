@@ -1,34 +1,23 @@
 """Обработчик кнопки Охрана труда"""
 
-import os
+import logging
+
 from aiogram import types, F, Router
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, FSInputFile
 from aiogram.fsm.context import FSMContext
 
+import media_registry
 from states import BotStates
 from handlers.safety_handlers import menu
+import keyboards
 
+logger = logging.getLogger(__name__)
 router = Router()
 
 
-def _labor_safety_keyboard() -> ReplyKeyboardMarkup:
-    """Возвращает клавиатуру меню Охраны труда."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📸 Получить допуск")],
-            [KeyboardButton(text="📝 Оформить работы")],
-            [KeyboardButton(text="🆘 Сообщить о нарушении")],
-            [KeyboardButton(text="🧠 Бот-Инструктор")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 @router.message(F.text == "👷‍♂️ Охрана труда")
 async def labor_safety_handler(message: types.Message, state: FSMContext):
     """Отображает меню Охраны труда с основными функциями."""
-    print(f"✅ LABOR SAFETY HANDLER TRIGGERED! Text: {message.text!r}")
+    logger.debug("Labor safety menu", extra={"telegram_id": message.from_user.id})
 
     # Если пользователь был в другом разделе, очищаем состояние
     current_state = await state.get_state()
@@ -38,13 +27,10 @@ async def labor_safety_handler(message: types.Message, state: FSMContext):
     # Устанавливаем состояние меню охраны труда
     await state.set_state(BotStates.LABOR_SAFETY_MENU)
 
-    video_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src", "safe.mp4")
     try:
-        if os.path.exists(video_path):
-            video = FSInputFile(video_path)
-            await message.answer_video_note(video)
+        await media_registry.send(message, "src/safe.mp4")
     except Exception as e:
-        print(f"Error sending safety video note: {e}")
+        logger.error(f"Error sending safety video note: {e}")
 
     menu_text = (
         "👷‍♂️ <b>Модуль \"Безопасность труда\" активирован</b>\n"
@@ -60,7 +46,7 @@ async def labor_safety_handler(message: types.Message, state: FSMContext):
     await message.answer(
         menu_text,
         parse_mode="HTML",
-        reply_markup=_labor_safety_keyboard(),
+        reply_markup=keyboards.SAFETY_MENU,
     )
 
 
@@ -3,10 +3,12 @@
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 import logging
 from typing import Any
-import httpx
+import n8n_gateway
+import semantic_cache
+import streaming
+import keyboards
 
 
 logger = logging.getLogger(__name__)
@@ -20,31 +22,30 @@ async def call_bot_instructor_n8n(payload: dict[str, Any]) -> dict[str, Any]:
     """Отправка запроса к боту-инструктору в n8n."""
 
     try:
-        print(f"\n{'='*60}")
-        print(f"[BOT INSTRUCTOR n8n REQUEST]")
-        print(f"URL: {N8N_BOT_INSTRUCTOR_WEBHOOK_URL}")
-        print(f"Payload: {payload}")
-
-        async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-            response = await client.post(N8N_BOT_INSTRUCTOR_WEBHOOK_URL, json=payload)
-
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text}")
-            print(f"{'='*60}\n")
-
-            response.raise_for_status()
-            if response.content:
-                try:
-                    return response.json()
-                except Exception:
-                    return {"raw": response.text}
-            return {}
+        logger.debug(
+            "[BOT INSTRUCTOR n8n REQUEST]",
+            extra={"category": "n8n", "url": N8N_BOT_INSTRUCTOR_WEBHOOK_URL, "payload": payload},
+        )
+
+        response = await n8n_gateway.post(N8N_BOT_INSTRUCTOR_WEBHOOK_URL, payload, timeout=60.0)
+
+        logger.info(
+            "[BOT INSTRUCTOR n8n RESPONSE]",
+            extra={"category": "n8n", "url": N8N_BOT_INSTRUCTOR_WEBHOOK_URL, "status": response.status_code, "body": response.text},
+        )
+
+        response.raise_for_status()
+        if response.content:
+            try:
+                return response.json()
+            except Exception:
+                return {"raw": response.text}
+        return {}
     except Exception as e:
-        print(f"\n{'='*60}")
-        print(f"[BOT INSTRUCTOR n8n ERROR]")
-        print(f"URL: {N8N_BOT_INSTRUCTOR_WEBHOOK_URL}")
-        print(f"Error: {type(e).__name__}: {e}")
-        print(f"{'='*60}\n")
+        logger.error(
+            "[BOT INSTRUCTOR n8n ERROR]",
+            extra={"category": "n8n", "url": N8N_BOT_INSTRUCTOR_WEBHOOK_URL, "error": f"{type(e).__name__}: {e}"},
+        )
         raise
 
 
@@ -54,37 +55,6 @@ class BotInstructorState(StatesGroup):
     IN_CONVERSATION = State()
 
 
-def _safety_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Возвращает клавиатуру меню Охраны труда."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📸 Получить допуск")],
-            [KeyboardButton(text="📝 Оформить работы")],
-            [KeyboardButton(text="🆘 Сообщить о нарушении")],
-            [KeyboardButton(text="🧠 Бот-Инструктор")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-    )
-
-
-def _instructor_topics_keyboard() -> ReplyKeyboardMarkup:
-    """Возвращает клавиатуру с темами для инструктажа."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🦺 СИЗ и их применение")],
-            [KeyboardButton(text="🔥 Пожарная безопасность")],
-            [KeyboardButton(text="⚡ Электробезопасность")],
-            [KeyboardButton(text="⬆️ Работа на высоте")],
-            [KeyboardButton(text="🏗 Работа с оборудованием")],
-            [KeyboardButton(text="🚨 Действия при ЧС")],
-            [KeyboardButton(text="💬 Свой вопрос")],
-            [KeyboardButton(text="❌ Отмена")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 @router.message(F.text == "🧠 Бот-Инструктор")
 async def bot_instructor_handler(message: types.Message, state: FSMContext):
     """Запускает режим бота-инструктора."""
@@ -96,7 +66,7 @@ async def bot_instructor_handler(message: types.Message, state: FSMContext):
         "Я помогу вам разобраться в вопросах безопасности труда, проведу инструктаж и отвечу на ваши вопросы.\n\n"
         "Выберите тему или задайте свой вопрос:",
         parse_mode="HTML",
-        reply_markup=_instructor_topics_keyboard(),
+        reply_markup=keyboards.INSTRUCTOR_TOPICS,
     )
 
 
@@ -108,7 +78,7 @@ async def process_instructor_topic(message: types.Message, state: FSMContext):
         await state.clear()
         await message.answer(
             "Бот-Инструктор завершил работу.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         return
 
@@ -131,10 +101,7 @@ async def process_instructor_topic(message: types.Message, state: FSMContext):
                 "💬 <b>Задайте свой вопрос</b>\n\n"
                 "Напишите ваш вопрос по охране труда, и я постараюсь дать подробный ответ.",
                 parse_mode="HTML",
-                reply_markup=ReplyKeyboardMarkup(
-                    keyboard=[[KeyboardButton(text="❌ Отмена")]],
-                    resize_keyboard=True,
-                ),
+                reply_markup=keyboards.CANCEL,
             )
             await state.set_state(BotInstructorState.IN_CONVERSATION)
             await state.update_data(topic="custom", topic_text=message.text)
@@ -152,7 +119,7 @@ async def process_instructor_topic(message: types.Message, state: FSMContext):
 async def process_instructor_query(message: types.Message, state: FSMContext, query: str):
     """Обрабатывает запрос к боту-инструктору."""
 
-    await message.answer("🤔 Анализирую вопрос и готовлю ответ...")
+    status_msg = await message.answer("🤔 Анализирую вопрос и готовлю ответ...")
 
     data = await state.get_data()
 
@@ -168,23 +135,43 @@ async def process_instructor_query(message: types.Message, state: FSMContext, qu
             "action": "query",
         }
 
-        # Отправляем в n8n
-        response = await call_bot_instructor_n8n(payload)
+        # Ответы зависят от темы, поэтому индекс похожих вопросов — свой на каждую тему
+        cache_name = f"instructor:{data.get('topic')}"
+        answer = semantic_cache.lookup(cache_name, query)
+
+        if answer is None and streaming.streaming_enabled():
+            # Ответ дописывается в статусное сообщение по мере генерации
+            answer = await streaming.stream_answer(
+                status_msg,
+                N8N_BOT_INSTRUCTOR_WEBHOOK_URL,
+                payload,
+                prefix="🧠 <b>Ответ инструктора:</b>\n\n",
+                parse_mode="HTML",
+            )
+            semantic_cache.remember(cache_name, query, answer)
+            await message.answer(
+                "Задайте следующий вопрос или вернитесь в меню:",
+                reply_markup=keyboards.INSTRUCTOR_CONVERSATION,
+            )
+            await state.set_state(BotInstructorState.IN_CONVERSATION)
+            return
+
+        if answer is None:
+            # Отправляем в n8n
+            response = await call_bot_instructor_n8n(payload)
 
-        # Получаем ответ
-        answer = response.get("answer", "Извините, не смог обработать ваш запрос.")
+            # Получаем ответ
+            answer = response.get("answer")
+            if answer:
+                semantic_cache.remember(cache_name, query, answer)
+            else:
+                answer = "Извините, не смог обработать ваш запрос."
 
         await message.answer(
             f"🧠 <b>Ответ инструктора:</b>\n\n{answer}\n\n"
             f"Задайте следующий вопрос или вернитесь в меню:",
             parse_mode="HTML",
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=[
-                    [KeyboardButton(text="📚 Выбрать другую тему")],
-                    [KeyboardButton(text="✅ Завершить инструктаж")],
-                ],
-                resize_keyboard=True,
-            ),
+            reply_markup=keyboards.INSTRUCTOR_CONVERSATION,
         )
 
         await state.set_state(BotInstructorState.IN_CONVERSATION)
@@ -193,7 +180,7 @@ async def process_instructor_query(message: types.Message, state: FSMContext, qu
         logger.error(f"Error processing instructor query: {e}")
         await message.answer(
             "❌ Произошла ошибка при обработке запроса. Попробуйте еще раз.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         await state.clear()
 
@@ -206,7 +193,7 @@ async def back_to_topics(message: types.Message, state: FSMContext):
 
     await message.answer(
         "Выберите новую тему:",
-        reply_markup=_instructor_topics_keyboard(),
+        reply_markup=keyboards.INSTRUCTOR_TOPICS,
     )
 
 
@@ -233,7 +220,7 @@ async def end_instructor_session(message: types.Message, state: FSMContext):
         "Спасибо за внимание к вопросам охраны труда!\n"
         "Помните: ваша безопасность - наш приоритет.",
         parse_mode="HTML",
-        reply_markup=_safety_menu_keyboard(),
+        reply_markup=keyboards.SAFETY_MENU,
     )
 
 
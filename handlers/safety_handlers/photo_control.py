@@ -3,10 +3,10 @@
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 import logging
 from typing import Any
-import httpx
+import n8n_gateway
+import keyboards
 
 
 logger = logging.getLogger(__name__)
@@ -20,31 +20,30 @@ async def call_photo_control_n8n(payload: dict[str, Any]) -> dict[str, Any]:
     """Отправка данных на анализ фото допуска в n8n."""
 
     try:
-        print(f"\n{'='*60}")
-        print(f"[PHOTO CONTROL n8n REQUEST]")
-        print(f"URL: {N8N_PHOTO_CONTROL_WEBHOOK_URL}")
-        print(f"Payload: {payload}")
-
-        async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-            response = await client.post(N8N_PHOTO_CONTROL_WEBHOOK_URL, json=payload)
-
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text}")
-            print(f"{'='*60}\n")
-
-            response.raise_for_status()
-            if response.content:
-                try:
-                    return response.json()
-                except Exception:
-                    return {"raw": response.text}
-            return {}
+        logger.debug(
+            "[PHOTO CONTROL n8n REQUEST]",
+            extra={"category": "n8n", "url": N8N_PHOTO_CONTROL_WEBHOOK_URL, "payload": payload},
+        )
+
+        response = await n8n_gateway.post(N8N_PHOTO_CONTROL_WEBHOOK_URL, payload, timeout=60.0)
+
+        logger.info(
+            "[PHOTO CONTROL n8n RESPONSE]",
+            extra={"category": "n8n", "url": N8N_PHOTO_CONTROL_WEBHOOK_URL, "status": response.status_code, "body": response.text},
+        )
+
+        response.raise_for_status()
+        if response.content:
+            try:
+                return response.json()
+            except Exception:
+                return {"raw": response.text}
+        return {}
     except Exception as e:
-        print(f"\n{'='*60}")
-        print(f"[PHOTO CONTROL n8n ERROR]")
-        print(f"URL: {N8N_PHOTO_CONTROL_WEBHOOK_URL}")
-        print(f"Error: {type(e).__name__}: {e}")
-        print(f"{'='*60}\n")
+        logger.error(
+            "[PHOTO CONTROL n8n ERROR]",
+            extra={"category": "n8n", "url": N8N_PHOTO_CONTROL_WEBHOOK_URL, "error": f"{type(e).__name__}: {e}"},
+        )
         raise
 
 
@@ -53,20 +52,6 @@ class PhotoControlState(StatesGroup):
     WAITING_FOR_PHOTO = State()
 
 
-def _safety_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Возвращает клавиатуру меню Охраны труда."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📸 Получить допуск")],
-            [KeyboardButton(text="📝 Оформить работы")],
-            [KeyboardButton(text="🆘 Сообщить о нарушении")],
-            [KeyboardButton(text="🧠 Бот-Инструктор")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 @router.message(F.text == "📸 Получить допуск")
 async def photo_control_handler(message: types.Message, state: FSMContext):
     """Запускает процесс получения допуска через фото-контроль."""
@@ -86,10 +71,7 @@ async def photo_control_handler(message: types.Message, state: FSMContext):
         "• Размытые или неразборчивые фото\n\n"
         "🔍 Я проанализирую изображение и выдам <b>допуск</b> или укажу на нарушения.",
         parse_mode="HTML",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="❌ Отмена")]],
-            resize_keyboard=True,
-        ),
+        reply_markup=keyboards.CANCEL,
     )
 
 
@@ -126,7 +108,7 @@ async def process_photo_control(message: types.Message, state: FSMContext):
         await message.answer(
             f"📋 <b>Результат проверки:</b>\n\n{result_text}",
             parse_mode="HTML",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
 
         await state.clear()
@@ -135,7 +117,7 @@ async def process_photo_control(message: types.Message, state: FSMContext):
         logger.error(f"Error processing photo control: {e}")
         await message.answer(
             "❌ Произошла ошибка при анализе фотографии. Попробуйте еще раз.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         await state.clear()
 
@@ -147,7 +129,7 @@ async def cancel_photo_control(message: types.Message, state: FSMContext):
     await state.clear()
     await message.answer(
         "Фото-контроль отменен. Возвращаю в меню Охраны труда.",
-        reply_markup=_safety_menu_keyboard(),
+        reply_markup=keyboards.SAFETY_MENU,
     )
 
 
@@ -1,12 +1,12 @@
 """Обработчик кнопки 'Сообщить о нарушении' (DEMO-режим, без N8N)."""
 
-import asyncio
 import random
 import logging
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from progress import ProgressAnimator
+import keyboards
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -18,34 +18,6 @@ class ReportViolationState(StatesGroup):
     WAITING_FOR_DESCRIPTION = State()
     WAITING_FOR_PHOTO = State()
 
-# --- Клавиатуры ---
-def _safety_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Главное меню охраны труда."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📸 Получить допуск")],
-            [KeyboardButton(text="📝 Оформить работы")],
-            [KeyboardButton(text="🆘 Сообщить о нарушении")],
-            [KeyboardButton(text="🧠 Бот-Инструктор")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-    )
-
-def _violation_types_keyboard() -> ReplyKeyboardMarkup:
-    """Типы нарушений."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="⚠️ Нарушение ТБ")],
-            [KeyboardButton(text="🦺 Нет каски/жилета")],
-            [KeyboardButton(text="🔥 Пожарная опасность")],
-            [KeyboardButton(text="⚡ Электрика")],
-            [KeyboardButton(text="🏗 Оборудование")],
-            [KeyboardButton(text="❌ Отмена")],
-        ],
-        resize_keyboard=True,
-    )
-
 # --- 1. Старт сценария ---
 @router.message(F.text == "🆘 Сообщить о нарушении")
 async def report_violation_handler(message: types.Message, state: FSMContext):
@@ -65,7 +37,7 @@ async def report_violation_handler(message: types.Message, state: FSMContext):
     await message.answer(
         intro_text,
         parse_mode="HTML",
-        reply_markup=_violation_types_keyboard(),
+        reply_markup=keyboards.VIOLATION_TYPES,
     )
 
 # --- 2. Выбор типа ---
@@ -73,7 +45,7 @@ async def report_violation_handler(message: types.Message, state: FSMContext):
 async def process_violation_type(message: types.Message, state: FSMContext):
     if message.text == "❌ Отмена":
         await state.clear()
-        await message.answer("Отменено.", reply_markup=_safety_menu_keyboard())
+        await message.answer("Отменено.", reply_markup=keyboards.SAFETY_MENU)
         return
 
     await state.update_data(violation_type=message.text)
@@ -82,7 +54,7 @@ async def process_violation_type(message: types.Message, state: FSMContext):
     await message.answer(
         "📍 <b>Где это происходит?</b>\n"
         "Укажите цех, участок или этаж.",
-        reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="❌ Отмена")]], resize_keyboard=True)
+        reply_markup=keyboards.CANCEL
     )
 
 # --- 3. Место ---
@@ -90,7 +62,7 @@ async def process_violation_type(message: types.Message, state: FSMContext):
 async def process_location(message: types.Message, state: FSMContext):
     if message.text == "❌ Отмена":
         await state.clear()
-        await message.answer("Отменено.", reply_markup=_safety_menu_keyboard())
+        await message.answer("Отменено.", reply_markup=keyboards.SAFETY_MENU)
         return
 
     await state.update_data(location=message.text)
@@ -103,7 +75,7 @@ async def process_location(message: types.Message, state: FSMContext):
 async def process_description(message: types.Message, state: FSMContext):
     if message.text == "❌ Отмена":
         await state.clear()
-        await message.answer("Отменено.", reply_markup=_safety_menu_keyboard())
+        await message.answer("Отменено.", reply_markup=keyboards.SAFETY_MENU)
         return
 
     await state.update_data(description=message.text)
@@ -112,12 +84,7 @@ async def process_description(message: types.Message, state: FSMContext):
     await message.answer(
         "📸 <b>Приложите фото (если есть)</b>\n"
         "Или нажмите 'Пропустить'.",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[
-                [KeyboardButton(text="⏭ Пропустить")],
-                [KeyboardButton(text="❌ Отмена")]
-            ], resize_keyboard=True
-        )
+        reply_markup=keyboards.VIOLATION_SKIP
     )
 
 # --- 5. Финал (Обработка фото или пропуска) ---
@@ -126,24 +93,17 @@ async def finish_report(message: types.Message, state: FSMContext):
     # Проверка на отмену
     if message.text == "❌ Отмена":
         await state.clear()
-        await message.answer("Отменено.", reply_markup=_safety_menu_keyboard())
+        await message.answer("Отменено.", reply_markup=keyboards.SAFETY_MENU)
         return
 
     # Собираем данные (для красоты, никуда не шлем)
     data = await state.get_data()
     has_photo = bool(message.photo)
 
-    # 1. Имитация бурной деятельности (Анимация)
-    status_msg = await message.answer("⏳ <i>Формирование инцидента...</i>", parse_mode="HTML")
-    await asyncio.sleep(1.0) # Пауза 1 сек для реализма
-    await status_msg.edit_text("📡 <i>Отправка данных диспетчеру...</i>", parse_mode="HTML")
-    await asyncio.sleep(1.0) # Пауза 1 сек
-    await status_msg.delete()
-
-    # 2. Генерируем фейковый номер заявки
+    # 1. Генерируем фейковый номер заявки
     ticket_id = random.randint(1040, 9990)
 
-    # 3. Финальное сообщение (как ты просил)
+    # 2. Финальное сообщение (как ты просил)
     final_text = (
         f"✅ <b>Нарушение зафиксировано!</b>\n"
         f"Тикет: <b>#INC-{ticket_id}</b>\n"
@@ -155,7 +115,13 @@ async def finish_report(message: types.Message, state: FSMContext):
         f"Спасибо за бдительность!"
     )
 
-    await message.answer(final_text, parse_mode="HTML", reply_markup=_safety_menu_keyboard())
+    # 3. Анимация "бурной деятельности" — только пока реально отправляем ответ
+    async with ProgressAnimator(
+        message,
+        ["⏳ <i>Формирование инцидента...</i>", "📡 <i>Отправка данных диспетчеру...</i>"],
+        delete=True,
+    ):
+        await message.answer(final_text, parse_mode="HTML", reply_markup=keyboards.SAFETY_MENU)
     await state.clear()
 
 def register_handlers(parent_router: Router):
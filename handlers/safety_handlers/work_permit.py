@@ -1,14 +1,15 @@
 """Обработчик кнопки 'Оформить работы' с голосовым вводом."""
 
-import asyncio
 import logging
 from typing import Any
 
-import httpx
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+
+import n8n_gateway
+from progress import ProgressAnimator
+import keyboards
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -22,31 +23,30 @@ async def call_work_permit_n8n(payload: dict[str, Any]) -> dict[str, Any]:
     """Отправка данных для оформления работ в n8n."""
 
     try:
-        print(f"\n{'='*60}")
-        print(f"[WORK PERMIT n8n REQUEST]")
-        print(f"URL: {N8N_WORK_PERMIT_WEBHOOK_URL}")
-        print(f"Payload: {payload}")
-
-        async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-            response = await client.post(N8N_WORK_PERMIT_WEBHOOK_URL, json=payload)
-
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.text}")
-            print(f"{'='*60}\n")
-
-            response.raise_for_status()
-            if response.content:
-                try:
-                    return response.json()
-                except Exception:
-                    return {"raw": response.text}
-            return {}
+        logger.debug(
+            "[WORK PERMIT n8n REQUEST]",
+            extra={"category": "n8n", "url": N8N_WORK_PERMIT_WEBHOOK_URL, "payload": payload},
+        )
+
+        response = await n8n_gateway.post(N8N_WORK_PERMIT_WEBHOOK_URL, payload, timeout=60.0)
+
+        logger.info(
+            "[WORK PERMIT n8n RESPONSE]",
+            extra={"category": "n8n", "url": N8N_WORK_PERMIT_WEBHOOK_URL, "status": response.status_code, "body": response.text},
+        )
+
+        response.raise_for_status()
+        if response.content:
+            try:
+                return response.json()
+            except Exception:
+                return {"raw": response.text}
+        return {}
     except Exception as e:
-        print(f"\n{'='*60}")
-        print(f"[WORK PERMIT n8n ERROR]")
-        print(f"URL: {N8N_WORK_PERMIT_WEBHOOK_URL}")
-        print(f"Error: {type(e).__name__}: {e}")
-        print(f"{'='*60}\n")
+        logger.error(
+            "[WORK PERMIT n8n ERROR]",
+            extra={"category": "n8n", "url": N8N_WORK_PERMIT_WEBHOOK_URL, "error": f"{type(e).__name__}: {e}"},
+        )
         raise
 
 
@@ -58,19 +58,18 @@ async def process_voice_permit_n8n(file_id: str, file_url: str, user_info: dict)
         "user": user_info
     }
 
-    async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-        try:
-            resp = await client.post(N8N_VOICE_PERMIT_WEBHOOK, json=payload)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            logger.error(f"N8N Voice Error: {e}")
-            return {
-                "permit_id": "OFFLINE-001",
-                "summary": "Ошибка обработки голосового. Проверьте соединение.",
-                "risk_level": "Не определен",
-                "status": "❌ Ошибка"
-            }
+    try:
+        resp = await n8n_gateway.post(N8N_VOICE_PERMIT_WEBHOOK, payload, timeout=60.0)
+        resp.raise_for_status()
+        return resp.json()
+    except Exception as e:
+        logger.error(f"N8N Voice Error: {e}")
+        return {
+            "permit_id": "OFFLINE-001",
+            "summary": "Ошибка обработки голосового. Проверьте соединение.",
+            "risk_level": "Не определен",
+            "status": "❌ Ошибка"
+        }
 
 
 class WorkPermitState(StatesGroup):
@@ -82,35 +81,6 @@ class WorkPermitState(StatesGroup):
     WAITING_FOR_VOICE = State()
 
 
-def _safety_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Возвращает клавиатуру меню Охраны труда."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📸 Получить допуск")],
-            [KeyboardButton(text="📝 Оформить работы")],
-            [KeyboardButton(text="🆘 Сообщить о нарушении")],
-            [KeyboardButton(text="🧠 Бот-Инструктор")],
-            [KeyboardButton(text="🔙 Назад")],
-        ],
-        resize_keyboard=True,
-    )
-
-
-def _work_types_keyboard() -> ReplyKeyboardMarkup:
-    """Возвращает клавиатуру с типами работ."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔧 Ремонтные работы")],
-            [KeyboardButton(text="⚡ Электротехнические работы")],
-            [KeyboardButton(text="🔥 Огневые работы")],
-            [KeyboardButton(text="⬆️ Высотные работы")],
-            [KeyboardButton(text="🏗 Строительные работы")],
-            [KeyboardButton(text="❌ Отмена")],
-        ],
-        resize_keyboard=True,
-    )
-
-
 @router.message(F.text == "📝 Оформить работы")
 async def work_permit_handler(message: types.Message, state: FSMContext):
     """Запускает процесс оформления работ."""
@@ -127,14 +97,7 @@ async def work_permit_handler(message: types.Message, state: FSMContext):
         "Пошаговая форма с кнопками. Используйте, если вокруг шумно или нужна точность.\n\n"
         "👇 <b>Как вам удобнее оформить заявку сейчас?</b>",
         parse_mode="HTML",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[
-                [KeyboardButton(text="🎙 Голосовой наряд-допуск")],
-                [KeyboardButton(text="📋 Стандартное оформление")],
-                [KeyboardButton(text="🔙 Отмена")],
-            ],
-            resize_keyboard=True,
-        ),
+        reply_markup=keyboards.WORK_PERMIT_MODE,
     )
 
 
@@ -146,7 +109,7 @@ async def process_work_type(message: types.Message, state: FSMContext):
         await state.clear()
         await message.answer(
             "Оформление работ отменено.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         return
 
@@ -169,10 +132,7 @@ async def process_work_type(message: types.Message, state: FSMContext):
         "📍 <b>Укажите место проведения работ</b>\n\n"
         "Например: 'Цех №2, участок сборки' или 'Офисное здание, 3 этаж'",
         parse_mode="HTML",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="❌ Отмена")]],
-            resize_keyboard=True,
-        ),
+        reply_markup=keyboards.CANCEL,
     )
 
 
@@ -184,7 +144,7 @@ async def process_location(message: types.Message, state: FSMContext):
         await state.clear()
         await message.answer(
             "Оформление работ отменено.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         return
 
@@ -206,7 +166,7 @@ async def process_duration(message: types.Message, state: FSMContext):
         await state.clear()
         await message.answer(
             "Оформление работ отменено.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         return
 
@@ -228,7 +188,7 @@ async def process_description(message: types.Message, state: FSMContext):
         await state.clear()
         await message.answer(
             "Оформление работ отменено.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         return
 
@@ -266,7 +226,7 @@ async def process_description(message: types.Message, state: FSMContext):
             f"• Длительность: {data.get('duration')}\n"
             f"• Описание: {message.text}",
             parse_mode="HTML",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
 
         await state.clear()
@@ -275,7 +235,7 @@ async def process_description(message: types.Message, state: FSMContext):
         logger.error(f"Error processing work permit: {e}")
         await message.answer(
             "❌ Произошла ошибка при оформлении работ. Попробуйте еще раз или обратитесь к администратору.",
-            reply_markup=_safety_menu_keyboard(),
+            reply_markup=keyboards.SAFETY_MENU,
         )
         await state.clear()
 
@@ -297,10 +257,7 @@ async def start_voice_permit(message: types.Message, state: FSMContext):
         "<i>«Бригада Иванова. Огневые работы в Цеху №5. Варим лестницу.»</i>\n\n"
         "👇 <b>Жду ваше голосовое сообщение:</b>",
         parse_mode="HTML",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="🔙 Отмена")]],
-            resize_keyboard=True
-        )
+        reply_markup=keyboards.WORK_PERMIT_CANCEL
     )
 
 
@@ -314,23 +271,24 @@ async def process_voice_message(message: types.Message, state: FSMContext):
     file_info = await message.bot.get_file(file_id)
     file_url = f"https://api.telegram.org/file/bot{message.bot.token}/{file_info.file_path}"
 
-    # Анимация обработки
-    status_msg = await message.answer("🎙 <i>Получение аудиопотока...</i>", parse_mode="HTML")
-    await asyncio.sleep(1.0)
-
-    await status_msg.edit_text("⚡ <b>Whisper AI:</b> Транскрибация речи в текст...", parse_mode="HTML")
-
     user_data = {
         "id": message.from_user.id,
         "name": message.from_user.full_name,
         "username": message.from_user.username
     }
 
-    # Запрос к n8n
-    result = await process_voice_permit_n8n(file_id, file_url, user_data)
-
-    await status_msg.edit_text("📑 <i>Структурирование данных и генерация документа...</i>", parse_mode="HTML")
-    await asyncio.sleep(1.0)
+    # Анимация обработки — ровно столько, сколько работают Whisper и n8n
+    async with ProgressAnimator(
+        message,
+        [
+            "🎙 <i>Получение аудиопотока...</i>",
+            "⚡ <b>Whisper AI:</b> Транскрибация речи в текст...",
+            "📑 <i>Структурирование данных и генерация документа...</i>",
+        ],
+        delete=True,
+    ):
+        # Запрос к n8n
+        result = await process_voice_permit_n8n(file_id, file_url, user_data)
 
     # Формируем ответ
     permit_text = (
@@ -347,8 +305,7 @@ async def process_voice_message(message: types.Message, state: FSMContext):
         f"<b>Статус:</b> Ожидает подписи гл. инженера."
     )
 
-    await status_msg.delete()
-    await message.answer(permit_text, parse_mode="HTML", reply_markup=_safety_menu_keyboard())
+    await message.answer(permit_text, parse_mode="HTML", reply_markup=keyboards.SAFETY_MENU)
     await state.clear()
 
 
@@ -358,7 +315,7 @@ async def cancel_voice(message: types.Message, state: FSMContext):
     await state.clear()
     await message.answer(
         "Оформление отменено.",
-        reply_markup=_safety_menu_keyboard()
+        reply_markup=keyboards.SAFETY_MENU
     )
 
 
@@ -381,7 +338,7 @@ async def standard_work_permit(message: types.Message, state: FSMContext):
         "📝 <b>Оформление работ</b>\n\n"
         "Выберите тип работ, который необходимо оформить:",
         parse_mode="HTML",
-        reply_markup=_work_types_keyboard(),
+        reply_markup=keyboards.WORK_TYPES,
     )
 
 
@@ -391,7 +348,7 @@ async def cancel_work_permit(message: types.Message, state: FSMContext):
     await state.clear()
     await message.answer(
         "Оформление работ отменено.",
-        reply_markup=_safety_menu_keyboard(),
+        reply_markup=keyboards.SAFETY_MENU,
     )
 
 
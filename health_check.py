@@ -57,15 +57,15 @@ except Exception as e:
 # Проверка 4: Функция check_user_access
 print("\n4️⃣  Проверка функции check_user_access...")
 try:
-    from models import check_user_access
+    # check_user_access асинхронная; её логика расчета — в compute_access
+    from models import compute_access
     
     with SessionLocal() as session:
         # Берем первого пользователя
         user = session.execute(select(User)).scalars().first()
         
         if user:
-            has_access, access_until = check_user_access(
-                session, user.telegram_id)
+            has_access, access_until = compute_access(user.started_at)
             print(f"   ✅ Функция работает")
             print(f"      Пользователь {user.telegram_id}:")
             print(f"      - Доступ: {'АКТИВЕН' if has_access else 'ИСТЕК'}")
@@ -0,0 +1,305 @@
+"""Отложенная запись хода собеседования в ``interview_sessions``.
+
+Сохранение ответов в ``_process_n8n_response`` было закомментировано:
+синхронная запись в БД задерживала следующий вопрос кандидату. Теперь
+обработчик только записывает событие в журнал и сразу отвечает:
+
+- ``start`` — новая сессия с первым вопросом;
+- ``answer`` — ответ на вопрос 1 или 2 (текст, ``voice_file_id``) и
+  следующий вопрос;
+- ``complete`` — ответ на вопрос 3 и рекомендация HR (JSON);
+- ``cancel`` — отмена.
+
+Событие сначала дописывается строкой JSON в spool-файл
+``INTERVIEW_JOURNAL_PATH`` (переживает перезапуск и падение процесса), затем
+ставится в очередь. Фоновая задача раз в ``INTERVIEW_JOURNAL_DELAY`` секунд
+забирает накопленное и пишет события каждого кандидата по порядку одной
+сессией БД (разных кандидатов — параллельно). Переходы этапов —
+``UPDATE ... RETURNING`` с условием на ожидаемый этап (``models``), поэтому
+ответ, пришедший не на том этапе, не перезапишет чужие данные.
+
+При ошибке БД события кандидата остаются в очереди (порядок сохраняется) и
+повторяются через ``INTERVIEW_JOURNAL_RETRY_DELAY``. Событие, которое не
+подходит к состоянию сессии в БД (нет активной сессии, другой этап),
+пропускается с предупреждением. Записанные события удаляются из
+spool-файла (файл переписывается в отдельном потоке, не блокируя цикл
+событий); при старте бота невыполненные события из него дописываются в БД.
+
+При остановке запись, которая идёт, не прерывается: если она не успела за
+``INTERVIEW_JOURNAL_CLOSE_TIMEOUT``, в spool остаётся всё незаписанное, включая
+события этой пачки, — они допишутся при следующем старте (событие, которое
+успело записаться уже после остановки, может повториться).
+"""
+
+import os
+import json
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import (
+    get_session,
+    start_interview,
+    cancel_interview,
+    save_answer_1,
+    save_answer_2,
+    save_answer_3_and_complete,
+)
+
+logger = logging.getLogger(__name__)
+
+INTERVIEW_JOURNAL_PATH = os.getenv("INTERVIEW_JOURNAL_PATH", "data/interview_journal.jsonl")
+INTERVIEW_JOURNAL_DELAY = float(os.getenv("INTERVIEW_JOURNAL_DELAY", "0.1"))
+INTERVIEW_JOURNAL_RETRY_DELAY = float(os.getenv("INTERVIEW_JOURNAL_RETRY_DELAY", "5"))
+INTERVIEW_JOURNAL_CONCURRENCY = int(os.getenv("INTERVIEW_JOURNAL_CONCURRENCY", "4"))
+INTERVIEW_JOURNAL_CLOSE_TIMEOUT = 10.0
+
+
+async def _apply_start(session, event: dict) -> None:
+    await start_interview(session, event["telegram_id"], event["question"])
+
+
+async def _apply_answer(session, event: dict) -> None:
+    # stage — этап, на который n8n перевёл кандидата после этого ответа
+    save = {1: save_answer_1, 2: save_answer_2}.get(event["stage"])
+    if save is None:
+        raise ValueError(f"нет ответа для этапа {event['stage']}")
+    await save(session, event["telegram_id"], event["answer"], event["question"], event.get("voice_file_id"))
+
+
+async def _apply_complete(session, event: dict) -> None:
+    try:
+        await save_answer_3_and_complete(
+            session,
+            event["telegram_id"],
+            answer=event["answer"],
+            hr_recommendation=event["hr_recommendation"],
+            voice_file_id=event.get("voice_file_id"),
+        )
+    except ValueError:
+        # Сессия не на 3-м вопросе (ответы до выкладки не сохранялись) —
+        # закрываем её, как раньше делал end_session
+        await cancel_interview(session, event["telegram_id"])
+        raise
+
+
+_APPLY = {
+    "start": _apply_start,
+    "answer": _apply_answer,
+    "complete": _apply_complete,
+    "cancel": lambda session, event: cancel_interview(session, event["telegram_id"]),
+}
+
+
+class InterviewJournal:
+    """Очередь событий собеседования со spool-файлом."""
+
+    def __init__(
+        self,
+        path: str = INTERVIEW_JOURNAL_PATH,
+        delay: float = INTERVIEW_JOURNAL_DELAY,
+        retry_delay: float = INTERVIEW_JOURNAL_RETRY_DELAY,
+        concurrency: int = INTERVIEW_JOURNAL_CONCURRENCY,
+        session_factory: Callable[[], AsyncSession] = get_session,
+    ):
+        self.path = path
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self.concurrency = concurrency
+        self.session_factory = session_factory
+        # telegram_id -> события по порядку, ждущие записи
+        self._pending: OrderedDict[int, list[dict[str, Any]]] = OrderedDict()
+        # seq -> событие, ещё не записанное в БД (в том числе пишущееся сейчас) — содержимое spool
+        self._unapplied: dict[int, dict[str, Any]] = {}
+        self._spool = None
+        # Пока spool переписывается в потоке, новые строки копятся здесь
+        self._compacting: list[str] | None = None
+        self._compact_lock = asyncio.Lock()
+        self._seq = 0
+        self._wakeup: asyncio.Event | None = None
+        self._worker: asyncio.Task | None = None
+        self._closing = False
+
+        self.applied = 0
+        self.skipped = 0
+        self.retries = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._unapplied)
+
+    # ---------- Запись события ----------
+
+    def record(self, op: str, telegram_id: int, **fields: Any) -> None:
+        """Добавить событие (без ожидания БД)."""
+        if op not in _APPLY:
+            raise ValueError(f"Неизвестное событие собеседования: {op}")
+        self._seq += 1
+        event = {"seq": self._seq, "op": op, "telegram_id": telegram_id, **fields}
+        self._append_to_spool(event)
+        self._unapplied[event["seq"]] = event
+        self._pending.setdefault(telegram_id, []).append(event)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _append_to_spool(self, event: dict) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        if self._compacting is not None:
+            self._compacting.append(line)
+            return
+        self._write_line(line)
+
+    def _write_line(self, line: str) -> None:
+        if self._spool is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._spool = open(self.path, "a", encoding="utf-8")
+        # flush: событие в page cache ОС — переживает падение процесса
+        self._spool.write(line)
+        self._spool.flush()
+
+    def _rewrite_spool(self, lines: list[str], fsync: bool) -> None:
+        tmp_path = self.path + ".tmp"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    async def _compact_spool(self, fsync: bool = False) -> None:
+        """Оставить в spool-файле только незаписанные события."""
+        async with self._compact_lock:
+            lines = [json.dumps(self._unapplied[seq], ensure_ascii=False) + "\n" for seq in sorted(self._unapplied)]
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+            self._compacting = []
+            try:
+                await asyncio.to_thread(self._rewrite_spool, lines, fsync)
+            except OSError as e:
+                # Старый файл не тронут: в нём все незаписанные события (и уже записанные — повторятся)
+                logger.error(f"Журнал собеседований: не удалось переписать {self.path}: {e}")
+            finally:
+                backlog, self._compacting = self._compacting, None
+                for line in backlog:
+                    self._write_line(line)
+
+    def _load_spool(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        loaded = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # оборванная последняя строка при падении
+                    logger.warning(f"Журнал собеседований: повреждённая строка пропущена: {line[:200]!r}")
+                    continue
+                self._pending.setdefault(event["telegram_id"], []).append(event)
+                self._unapplied[event["seq"]] = event
+                self._seq = max(self._seq, event["seq"])
+                loaded += 1
+        return loaded
+
+    # ---------- Запись в БД ----------
+
+    async def _apply_user(self, telegram_id: int, events: list[dict]) -> list[dict]:
+        """События одного кандидата по порядку; возвращает невыполненный остаток."""
+        async with self.session_factory() as session:
+            for i, event in enumerate(events):
+                try:
+                    await _APPLY[event["op"]](session, event)
+                except ValueError as e:
+                    self.skipped += 1
+                    logger.warning(f"Журнал собеседований: {event['op']} для {telegram_id} пропущено: {e}")
+                except Exception as e:
+                    await session.rollback()
+                    self.retries += 1
+                    logger.error(f"Журнал собеседований: ошибка записи {event['op']} для {telegram_id}: {e}")
+                    return events[i:]
+                else:
+                    self.applied += 1
+                self._unapplied.pop(event["seq"], None)
+        return []
+
+    async def flush(self) -> bool:
+        """Записать всё накопленное. False — что-то осталось (ошибка БД)."""
+        batch, self._pending = self._pending, OrderedDict()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def apply(telegram_id: int, events: list[dict]) -> tuple[int, list[dict]]:
+            async with semaphore:
+                try:
+                    return telegram_id, await self._apply_user(telegram_id, events)
+                except Exception as e:
+                    # Не удалось открыть/закрыть сессию — повторяем то, что не записано
+                    self.retries += 1
+                    logger.error(f"Журнал собеседований: ошибка сессии БД для {telegram_id}: {e}")
+                    return telegram_id, [event for event in events if event["seq"] in self._unapplied]
+
+        if not batch:
+            return True
+        results = await asyncio.gather(*(apply(tid, events) for tid, events in batch.items()))
+        for telegram_id, remainder in results:
+            if remainder:
+                # Новые события кандидата пришли во время записи — они после остатка
+                self._pending[telegram_id] = remainder + self._pending.get(telegram_id, [])
+        await self._compact_spool()
+        return not any(remainder for _, remainder in results)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._closing:
+                await asyncio.sleep(self.delay)  # копим события пачкой
+            written = await self.flush()
+            if self._closing:
+                if not written or not self._pending:
+                    return
+                self._wakeup.set()  # при остановке дописываем всё, что успело прийти
+            elif not written:
+                await asyncio.sleep(self.retry_delay)
+                self._wakeup.set()
+
+    # ---------- Жизненный цикл ----------
+
+    def start(self) -> None:
+        """Дописать события из spool-файла и запустить фоновую запись."""
+        if self._worker is not None:
+            return
+        loaded = self._load_spool()
+        if loaded:
+            logger.info(f"Журнал собеседований: {loaded} незаписанных событий из {self.path}")
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        if self._pending:
+            self._wakeup.set()
+
+    async def close(self) -> None:
+        """Дописать очередь в БД; что не успело — остаётся в spool-файле."""
+        if self._worker is None:
+            return
+        # Текущую запись не прерываем (wait, а не wait_for — он отменил бы задачу
+        # посреди пачки): иначе события кандидата разойдутся по порядку
+        self._closing = True
+        self._wakeup.set()
+        done, _ = await asyncio.wait({self._worker}, timeout=INTERVIEW_JOURNAL_CLOSE_TIMEOUT)
+        if done:
+            error = self._worker.exception()
+            if error is not None:
+                logger.error(f"Журнал собеседований: фоновая запись упала: {error!r}")
+            self._worker = None
+            self._closing = False
+        # Иначе задача дописывает пачку дальше; ссылку на неё держим в _worker
+        if self._unapplied:
+            logger.error(f"Журнал собеседований: при остановке не записано событий: {self.pending}")
+        await self._compact_spool(fsync=True)
+
+
+journal = InterviewJournal()
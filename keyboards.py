@@ -0,0 +1,224 @@
+"""Реестр reply-клавиатур бота.
+
+Одни и те же меню были объявлены в нескольких модулях (меню HR — в
+``cv_scan``, ``quick_search``, ``hr_info``; меню охраны труда — в четырёх
+обработчиках; главное меню — в ``/start`` и в каждом ``back_menu``) и
+собирались заново на каждый ответ: несколько pydantic-объектов с валидацией
+плюс сериализация в JSON при отправке.
+
+Здесь каждая клавиатура собирается один раз при импорте. Объекты aiogram
+неизменяемые (``frozen``), поэтому один экземпляр безопасно отдавать во все
+ответы. JSON клавиатуры тоже считается один раз — ``KeyboardSession``
+подставляет его в запрос вместо повторной сериализации.
+
+    await message.answer("Меню", reply_markup=keyboards.HR_MENU)
+
+Клавиатуры, собранные в обработчике "на лету", работают как раньше — для них
+сессия ведёт себя как обычная ``AiohttpSession``.
+"""
+
+import json
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
+
+# имя -> клавиатура (для бенчмарков и отладки)
+KEYBOARDS: dict[str, ReplyKeyboardMarkup] = {}
+# id(клавиатуры) -> (клавиатура, JSON); клавиатура держит ссылку, чтобы id не переиспользовался
+_serialized: dict[int, tuple[ReplyKeyboardMarkup, str]] = {}
+
+
+def _drop_none(value: Any) -> Any:
+    """Как ``BaseSession.prepare_value``: поля со значением None не отправляются."""
+    if isinstance(value, dict):
+        return {k: _drop_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_drop_none(v) for v in value if v is not None]
+    return value
+
+
+def register(name: str, markup: ReplyKeyboardMarkup) -> ReplyKeyboardMarkup:
+    """Запоминает клавиатуру и её JSON; возвращает ту же клавиатуру."""
+    if name in KEYBOARDS:
+        raise ValueError(f"Клавиатура {name!r} уже зарегистрирована")
+    KEYBOARDS[name] = markup
+    _serialized[id(markup)] = (markup, json.dumps(_drop_none(markup.model_dump(warnings=False))))
+    return markup
+
+
+def serialized(markup: Any) -> str | None:
+    """Готовый JSON зарегистрированной клавиатуры (None — не из реестра)."""
+    entry = _serialized.get(id(markup))
+    if entry is None or entry[0] is not markup:
+        return None
+    return entry[1]
+
+
+def reply(name: str, *rows: list[str | KeyboardButton], placeholder: str | None = None) -> ReplyKeyboardMarkup:
+    """Клавиатура из рядов кнопок (текст или ``KeyboardButton``), сразу в реестре."""
+    return register(name, ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text=button) if isinstance(button, str) else button for button in row]
+            for row in rows
+        ],
+        resize_keyboard=True,
+        input_field_placeholder=placeholder,
+    ))
+
+
+class KeyboardSession(AiohttpSession):
+    """``AiohttpSession``, которая берёт JSON клавиатур из реестра."""
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod):
+        cached = serialized(getattr(method, "reply_markup", None))
+        # Свой json_dumps у сессии — сериализуем как обычно, чтобы не разойтись с ним
+        if cached is None or self.json_dumps is not json.dumps:
+            return super().build_form_data(bot, method)
+        form = super().build_form_data(bot, method.model_copy(update={"reply_markup": None}))
+        form.add_field("reply_markup", cached)
+        return form
+
+
+# ==================== Общие ====================
+
+MAIN_MENU = reply(
+    "main_menu",
+    ["🤝 HR и найм", "👷‍♂️ Охрана труда"],
+    ["🛠 IT HelpDesk", "🧠 База Знаний"],
+    ["💰 AI-Менеджер"],
+)
+CANCEL = reply("cancel", ["❌ Отмена"])
+BACK_TO_MENU = reply("back_to_menu", ["🔙 Назад в меню"])
+CONTACT_MANAGER = reply("contact_manager", ["👤 Связаться с менеджером"])
+
+# ==================== HR ====================
+
+HR_MENU = reply(
+    "hr_menu",
+    ["🎭 Пройти собеседование"],
+    ["📄 Анализ резюме (CV Scan)"],
+    ["🔥 Быстрый подбор"],
+    ["⚙️ Информация для HR"],
+    ["🔙 Назад в меню"],
+)
+HR_INFO_DEMO = reply("hr_info_demo", ["📊 Показать демо-отчет"], ["🔙 Назад в меню"])
+HR_INFO_PDF = reply("hr_info_pdf", ["📥 Скачать детальный PDF (Demo)"], ["🔙 Назад в меню"])
+INTERVIEW = reply("interview", ["❌ Отменить собеседование"])
+INTERVIEW_MENU = reply("interview_menu", ["🎭 Пройти собеседование"], ["◀️ Назад"])
+
+# ==================== Охрана труда ====================
+
+SAFETY_MENU = reply(
+    "safety_menu",
+    ["📸 Получить допуск"],
+    ["📝 Оформить работы"],
+    ["🆘 Сообщить о нарушении"],
+    ["🧠 Бот-Инструктор"],
+    ["🔙 Назад"],
+)
+INSTRUCTOR_TOPICS = reply(
+    "instructor_topics",
+    ["🦺 СИЗ и их применение"],
+    ["🔥 Пожарная безопасность"],
+    ["⚡ Электробезопасность"],
+    ["⬆️ Работа на высоте"],
+    ["🏗 Работа с оборудованием"],
+    ["🚨 Действия при ЧС"],
+    ["💬 Свой вопрос"],
+    ["❌ Отмена"],
+)
+INSTRUCTOR_CONVERSATION = reply(
+    "instructor_conversation",
+    ["📚 Выбрать другую тему"],
+    ["✅ Завершить инструктаж"],
+)
+VIOLATION_TYPES = reply(
+    "violation_types",
+    ["⚠️ Нарушение ТБ"],
+    ["🦺 Нет каски/жилета"],
+    ["🔥 Пожарная опасность"],
+    ["⚡ Электрика"],
+    ["🏗 Оборудование"],
+    ["❌ Отмена"],
+)
+VIOLATION_SKIP = reply("violation_skip", ["⏭ Пропустить"], ["❌ Отмена"])
+WORK_PERMIT_MODE = reply(
+    "work_permit_mode",
+    ["🎙 Голосовой наряд-допуск"],
+    ["📋 Стандартное оформление"],
+    ["🔙 Отмена"],
+)
+WORK_PERMIT_CANCEL = reply("work_permit_cancel", ["🔙 Отмена"])
+WORK_TYPES = reply(
+    "work_types",
+    ["🔧 Ремонтные работы"],
+    ["⚡ Электротехнические работы"],
+    ["🔥 Огневые работы"],
+    ["⬆️ Высотные работы"],
+    ["🏗 Строительные работы"],
+    ["❌ Отмена"],
+)
+
+# ==================== IT HelpDesk ====================
+
+IT_MENU = reply(
+    "it_menu",
+    ["🔍 AI-Глаз"],
+    ["⚡ Мгновенное действие"],
+    ["📋 Умный Тикет"],
+    ["❓ Как подключить"],
+    ["🔙 Назад"],
+)
+# Меню после AI-Глаза — со своими подписями кнопок
+AI_EYE_IT_MENU = reply(
+    "ai_eye_it_menu",
+    ["🎫 Умный тикет"],
+    ["⚡ Мгновенные действия"],
+    ["🔍 AI-Глаз"],
+    ["🔌 Как подключиться"],
+    ["🔙 Назад в меню"],
+)
+INSTANT_ACTIONS = reply(
+    "instant_actions",
+    ["🔑 Сбросить пароль"],
+    ["🔓 Разблокировать (Unlock)"],
+    ["🌐 Рестарт VPN-сессии"],
+    ["🔙 Назад в меню"],
+    placeholder="Выберите скрипт автоматизации...",
+)
+HELPDESK_ENTRY = reply("helpdesk_entry", ["🛠 IT HelpDesk"])
+CONNECT_EXIT = reply("connect_exit", ["🔙 Завершить тест"])
+
+# ==================== База знаний ====================
+
+KB_MENU = reply(
+    "kb_menu",
+    ["🔎 Найти ответ"],
+    ["🚀 Курс молодого бойца"],
+    ["📂 Библиотека"],
+    ["🔙 Назад в меню"],
+)
+KB_SEARCH_EXIT = reply(
+    "kb_search_exit",
+    ["🔎 Найти ответ"],
+    ["🚀 Курс молодого бойца"],
+    ["📂 Библиотека"],
+)
+
+# ==================== AI-Менеджер ====================
+
+AI_MANAGER_MENU = reply("ai_manager_menu", ["💰 Расчет стоимости"], ["🔙 Назад в меню"])
+SALES_BUDGET = reply(
+    "sales_budget",
+    ["до 50 000 руб", "50-150 тыс. руб"],
+    ["150-300 тыс. руб", "Бюджет не ограничен"],
+    ["❌ Отмена"],
+)
+SALES_CONTACT = reply(
+    "sales_contact",
+    [KeyboardButton(text="📱 Отправить мой контакт", request_contact=True)],
+    ["❌ Отмена"],
+)
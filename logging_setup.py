@@ -0,0 +1,229 @@
+"""Неблокирующее структурированное логирование бота.
+
+Раньше вызовы n8n печатали через ``print`` полный payload и полный ответ
+(большие ответы LLM) прямо из обработчиков — синхронная запись в stdout
+на каждом вызове блокировала event loop и забивала диск.
+
+``setup_logging()`` (вызывается в начале ``main.py``) настраивает root-логгер:
+
+- обработчик логгера только кладёт запись в ограниченную очередь
+  (``LOG_QUEUE_SIZE``); при переполнении запись отбрасывается и
+  считается в ``dropped``, event loop никогда не ждёт диск;
+- форматирование и запись делает фоновый поток ``QueueListener``:
+  JSON-строка на запись (``LOG_FORMAT=json``) или обычный текст (``text``);
+- поля из ``extra={...}`` (``url``, ``payload``, ``body``, ``status`` ...)
+  попадают в JSON отдельными ключами; длинные строки обрезаются до
+  ``LOG_MAX_FIELD`` символов;
+- токен бота (в т.ч. внутри ``file_url`` фото-контроля) и значения ключей
+  вида ``token``/``secret``/``password`` заменяются на ``***``;
+- выборка по категориям: ``LOG_SAMPLE="n8n=0.1,access=0.01"`` — доля
+  записей категории (``extra={"category": ...}``), которые пишутся;
+  WARNING и выше пишутся всегда;
+- ``LOG_FILE`` — писать ещё и в файл с ротацией по размеру
+  (``LOG_MAX_BYTES``, ``LOG_BACKUP_COUNT``), старые файлы сжимаются gzip.
+"""
+
+import os
+import re
+import sys
+import copy
+import gzip
+import json
+import queue
+import random
+import shutil
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_FILE = os.getenv("LOG_FILE")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_FIELD = int(os.getenv("LOG_MAX_FIELD", "2000"))
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+
+_SECRET_KEYS = re.compile(r"token|secret|password|authorization|api_key", re.IGNORECASE)
+# Токен Telegram: <bot_id>:<35 символов>; в URL файлов — /bot<token>/
+_BOT_TOKEN = re.compile(r"\d{6,12}:[A-Za-z0-9_-]{30,}")
+
+# Атрибуты LogRecord, которые не являются пользовательскими extra-полями
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "category"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _parse_sample(spec: str) -> dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def redact(text: str) -> str:
+    """Убрать токены бота из строки."""
+    token = os.getenv("BOT_TOKEN")
+    if token and token in text:
+        text = text.replace(token, "***")
+    return _BOT_TOKEN.sub("***", text)
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return f"{text[:limit]}…(+{len(text) - limit} симв.)"
+    return text
+
+
+def _clean(value: Any, limit: int, depth: int = 0) -> Any:
+    """Подготовить extra-поле к записи: редактирование, обрезка, JSON-совместимость."""
+    if isinstance(value, str):
+        return _truncate(redact(value), limit)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if depth >= 4:
+        return _truncate(redact(repr(value)), limit)
+    if isinstance(value, dict):
+        return {
+            str(k): "***" if _SECRET_KEYS.search(str(k)) else _clean(v, limit, depth + 1)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple, set)):
+        return [_clean(v, limit, depth + 1) for v in value]
+    return _truncate(redact(str(value)), limit)
+
+
+def _extra_fields(record: logging.LogRecord) -> dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись."""
+
+    def __init__(self, max_field: int = LOG_MAX_FIELD):
+        super().__init__()
+        self.max_field = max_field
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": _truncate(redact(record.getMessage()), self.max_field),
+        }
+        category = getattr(record, "category", None)
+        if category:
+            entry["category"] = category
+        for key, value in _extra_fields(record).items():
+            entry[key] = _clean(value, self.max_field)
+        if record.exc_info:
+            entry["exc"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Читаемый формат для локального запуска: extra-поля — ``key=value`` в конце строки."""
+
+    def __init__(self, max_field: int = LOG_MAX_FIELD):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.max_field = max_field
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = redact(super().format(record))
+        extra = " ".join(
+            f"{key}={json.dumps(_clean(value, self.max_field), ensure_ascii=False, default=str)}"
+            for key, value in _extra_fields(record).items()
+        )
+        return f"{line} {extra}" if extra else line
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю ``rate`` записей категории; WARNING и выше — всегда."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(getattr(record, "category", None) or record.name)
+        return rate is None or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не форматирует запись в потоке event loop и не ждёт очередь."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Форматирование (JSON, traceback, редактирование) — в фоновом потоке;
+        # здесь только фиксируем текст сообщения, пока аргументы не изменились
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _file_handler(path: str) -> logging.Handler:
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    handler.namer = lambda name: f"{name}.gz"
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging() -> None:
+    """Настроить root-логгер (повторный вызов ничего не делает)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else TextFormatter()
+    outputs: list[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        outputs.append(_file_handler(LOG_FILE))
+    for output in outputs:
+        output.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(_parse_sample(LOG_SAMPLE)))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # Апдейты aiogram на INFO — по строке на каждое сообщение пользователя
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Дописать очередь и остановить фоновый поток (в конце main)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for output in _listener.handlers:
+            output.close()
+        _listener = None
@@ -1,27 +1,38 @@
 import asyncio
+import logging
 import os
 from datetime import timezone
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, types, F, BaseMiddleware
 from aiogram.filters import Command
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, FSInputFile, TelegramObject
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import TelegramObject
 from aiogram.fsm.context import FSMContext
 from typing import Callable, Dict, Any, Awaitable
 
 # Загружаем переменные окружения из .env
 load_dotenv()
+
+# Логи пишет фоновый поток: обработчики только кладут записи в очередь
+import logging_setup
+logging_setup.setup_logging()
+
 TOKEN = os.getenv('BOT_TOKEN')
 if not TOKEN:
     raise RuntimeError("BOT_TOKEN не найден в .env файле")
 
 # Импортируем состояния
 from states import BotStates
+import fsm_storage
+import keyboards
 
-bot = Bot(token=TOKEN)
-storage = MemoryStorage()
+# Клавиатуры из реестра уходят в запрос готовым JSON
+bot = Bot(token=TOKEN, session=keyboards.KeyboardSession())
+# Состояния FSM в БД: переживают перезапуск и общие для всех реплик бота
+storage = fsm_storage.create_storage()
 dp = Dispatcher(storage=storage)
 
+logger = logging.getLogger(__name__)
+
 
 # ==================== Middleware для проверки доступа ====================
 
@@ -56,52 +67,73 @@ class AccessCheckMiddleware(BaseMiddleware):
             
         telegram_id = message.from_user.id
         
-        # Проверяем доступ
+        # Проверяем доступ (решение кэшируется до access_until — БД не трогаем)
         try:
-            with get_session() as session:
-                has_access, access_until = check_user_access(
-                    session, telegram_id)
-                
-                # DEBUG логирование
-                print(f"[ACCESS CHECK] User {telegram_id}: "
-                      f"has_access={has_access}, "
-                      f"access_until={access_until}")
-                
-                if not has_access:
-                    # Доступ истек - показываем сообщение
-                    access_until_str = ""
-                    if access_until:
-                        from datetime import timedelta
-                        # MSK (настройте под свой пояс)
-                        local_time = access_until + timedelta(hours=3)
-                        access_until_str = local_time.strftime(
-                            "%d.%m.%Y в %H:%M")
-                    
-                    msg = (
-                        f"⏰ <b>Доступ к боту истек</b>\n\n"
-                        f"Ваш пробный период (24 часа) "
-                        f"закончился {access_until_str}.\n\n"
-                        f"📱 Для получения консультации об услугах - напиши мне сообщение: <a href='https://t.me/LevinMSK'>@LevinMSK</a>"
-                    )
-                    
-                    await message.answer(
-                        msg,
-                        parse_mode="HTML"
-                    )
-                    return  # Блокируем дальнейшую обработку
+            decision = access_cache.cache.get(telegram_id)
+            if decision is None:
+                async with get_session() as session:
+                    decision = await check_user_access(session, telegram_id)
+                access_cache.cache.set(telegram_id, *decision)
+            has_access, access_until = decision
+
+            # DEBUG логирование
+            logger.debug(
+                "[ACCESS CHECK]",
+                extra={
+                    "category": "access",
+                    "telegram_id": telegram_id,
+                    "has_access": has_access,
+                    "access_until": access_until,
+                },
+            )
+
+            if not has_access:
+                # Доступ истек - показываем сообщение
+                access_until_str = ""
+                if access_until:
+                    from datetime import timedelta
+                    # MSK (настройте под свой пояс)
+                    local_time = access_until + timedelta(hours=3)
+                    access_until_str = local_time.strftime(
+                        "%d.%m.%Y в %H:%M")
+
+                msg = (
+                    f"⏰ <b>Доступ к боту истек</b>\n\n"
+                    f"Ваш пробный период (24 часа) "
+                    f"закончился {access_until_str}.\n\n"
+                    f"📱 Для получения консультации об услугах - напиши мне сообщение: <a href='https://t.me/LevinMSK'>@LevinMSK</a>"
+                )
+
+                await message.answer(
+                    msg,
+                    parse_mode="HTML"
+                )
+                return  # Блокируем дальнейшую обработку
         except Exception as e:
-            print(f"❌ Access check error for user {telegram_id}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"❌ Access check error for user {telegram_id}: {e}")
             # В случае ошибки БД - пропускаем проверку
             pass
         
         return await handler(event, data)
 
 # Импорт моделей/БД утилит
-from models import init_db, get_session, ensure_user_started, check_user_access
+from models import DATABASE_URL, engine, init_db, close_db, get_session, check_user_access
+import access_cache
+import button_dispatch
+import interview_journal
+import media_registry
+import metrics
+import migrations
+import n8n_gateway
+import n8n_jobs
+import registration
+import semantic_cache
+import telegram_scheduler
+import update_executor
+import webhook_server
 # Импорт обработчиков
 from handlers import hr, labor_safety, it_helpdesk, knowledge_base, ai_manager
+from handlers.knowledge_base_handlers.search_answer import warm_up_company_rag
 
 
 @dp.message(Command('start'))
@@ -113,41 +145,17 @@ async def cmd_start(message: types.Message, state: FSMContext):
         if started_at and started_at.tzinfo is None:
             started_at = started_at.replace(tzinfo=timezone.utc)
 
-        with get_session() as session:
-            ensure_user_started(
-                session,
-                telegram_id=message.from_user.id,
-                started_at=started_at,
-            )
+        # Одновременные /start пишутся в users одним INSERT на пачку
+        await registration.batcher.register(message.from_user.id, started_at)
+        # Новый пользователь мог получить отказ до /start — решение устарело
+        access_cache.cache.invalidate(message.from_user.id)
     except Exception as e:
         # Логируем, но не падаем, чтобы пользователь получил ответ
-        print(f"DB error on /start: {e}")
-
-    # Создаем клавиатуру с кнопками
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [
-                KeyboardButton(text="🤝 HR и найм"),
-                KeyboardButton(text="👷‍♂️ Охрана труда"),
-            ],
-            [
-                KeyboardButton(text="🛠 IT HelpDesk"),
-                KeyboardButton(text="🧠 База Знаний"),
-            ],
-            [
-                KeyboardButton(text="💰 AI-Менеджер"),
-            ]
-        ],
-        resize_keyboard=True
-    )
+        logger.error(f"DB error on /start: {e}")
 
     # Отправляем видео кружочком (Video Note)
-    video_path = "src/1217.mp4"
-    if os.path.exists(video_path):
-        video = FSInputFile(video_path)
-        await message.answer_video_note(video)
-    else:
-        await message.answer("Видео не найдено", reply_markup=keyboard)
+    if not await media_registry.send(message, "src/1217.mp4"):
+        await message.answer("Видео не найдено", reply_markup=keyboards.MAIN_MENU)
 
 
     # Отправляем сообщение с инструкцией
@@ -167,7 +175,7 @@ async def cmd_start(message: types.Message, state: FSMContext):
 
 Нажмите на кнопку ниже, чтобы активировать нужного сотрудника ⤵️"""
 
-    await message.answer(instruction_text, parse_mode="HTML", reply_markup=keyboard)
+    await message.answer(instruction_text, parse_mode="HTML", reply_markup=keyboards.MAIN_MENU)
 
     # Устанавливаем состояние главного меню
     await state.set_state(BotStates.MAIN_MENU)
@@ -177,8 +185,9 @@ async def cmd_start(message: types.Message, state: FSMContext):
 async def check_access_status(message: types.Message, state: FSMContext):
     """Проверить статус доступа пользователя."""
     try:
-        with get_session() as session:
-            has_access, access_until = check_user_access(session, message.from_user.id)
+        async with get_session() as session:
+            has_access, access_until = await check_user_access(session, message.from_user.id)
+            access_cache.cache.set(message.from_user.id, has_access, access_until)
             
             if has_access and access_until:
                 from datetime import timedelta, datetime
@@ -199,17 +208,11 @@ async def check_access_status(message: types.Message, state: FSMContext):
                     parse_mode="HTML"
                 )
             else:
-                kb = ReplyKeyboardMarkup(
-                    keyboard=[[
-                        KeyboardButton(text="👤 Связаться с менеджером")
-                    ]],
-                    resize_keyboard=True
-                )
                 await message.answer(
                     "⏰ <b>Доступ истек</b>\n\n"
                     "Для продления доступа свяжитесь с менеджером.",
                     parse_mode="HTML",
-                    reply_markup=kb
+                    reply_markup=keyboards.CONTACT_MANAGER
                 )
     except Exception as e:
         await message.answer(f"Ошибка при проверке доступа: {e}")
@@ -222,31 +225,21 @@ async def contact_manager_expired(message: types.Message, state: FSMContext):
     
     await state.set_state(ManagerState.waiting_for_message)
 
-    kb = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отмена")]],
-        resize_keyboard=True
-    )
-
     await message.answer(
         "📞 <b>Связь с менеджером</b>\n\n"
         "Напишите Ваше сообщение. Вы можете отправить текст, файл или фото.\n"
         "Менеджер ответит Вам в ближайшее время.",
         parse_mode="HTML",
-        reply_markup=kb
+        reply_markup=keyboards.CANCEL
     )
 
 
-async def main():
-    # Создаем таблицы при запуске (если их еще нет)
-    try:
-        init_db()
-    except Exception as e:
-        print(f"DB init error: {e}")
-
+def register_routers(dp: Dispatcher) -> None:
+    """Проверка доступа и обработчики всех отделов (вызывается один раз)."""
     # Регистрируем middleware ПЕРЕД обработчиками!
     # (важно для правильной работы проверки доступа)
     dp.message.middleware(AccessCheckMiddleware())
-    
+
     # Регистрируем обработчики кнопок
     hr.register_handlers(dp)
     labor_safety.register_handlers(dp)
@@ -254,8 +247,76 @@ async def main():
     knowledge_base.register_handlers(dp)
     ai_manager.register_handlers(dp)
 
-    print("✅ Бот запущен. Middleware для проверки доступа активен.")
-    await dp.start_polling(bot)
+
+async def main():
+    # Создаем таблицы при запуске (если их еще нет)
+    try:
+        await init_db()
+    except Exception as e:
+        logger.error(f"DB init error: {e}")
+    # Индексы, которых нет в уже созданных таблицах
+    try:
+        await migrations.run_migrations()
+    except Exception as e:
+        logger.error(f"DB migrations error: {e}")
+    # Ответы собеседований пишутся в БД в фоне (и дописываются из spool после перезапуска)
+    interview_journal.journal.start()
+
+    # Удаление брошенных состояний FSM
+    if isinstance(storage, fsm_storage.DBStorage):
+        storage.start_cleanup()
+
+    # Все исходящие запросы к Telegram — через общий планировщик (лимиты, 429)
+    telegram_scheduler.install(bot)
+
+    # Обновления одного чата — по порядку, разных чатов — параллельно, с общим лимитом
+    update_executor.install(dp)
+
+    register_routers(dp)
+    # Кнопки (F.text == "...") — поиском по словарю, а не перебором всех фильтров
+    button_dispatch.install(dp)
+    # Латентность обработчиков/n8n/БД/Telegram и очереди — на /metrics
+    metrics.install(dp, bot, engine)
+
+    # Общий пул соединений к n8n (keep-alive) на всё время работы бота
+    await n8n_gateway.init_gateway()
+    # Callback-приёмник для долгих задач n8n (CV Scan, AI-Глаз)
+    await n8n_jobs.start_job_service(bot)
+    await metrics.start_server()
+    # Продления доступа из manage_access.py сбрасывают кэш решений (LISTEN/NOTIFY)
+    access_cache.start_listener(DATABASE_URL)
+    # Ответы на кнопки-подсказки базы знаний — в фоне, не задерживая старт
+    warmup_task = asyncio.create_task(warm_up_company_rag())
+    # file_id видео-кружков: загружаем один раз, дальше отправка по file_id
+    media_task = asyncio.create_task(media_registry.warm_up(bot))
+
+    logger.info("✅ Бот запущен. Middleware для проверки доступа активен.")
+    try:
+        if webhook_server.webhook_enabled():
+            await webhook_server.run_webhook(dp, bot)
+        else:
+            # Если раньше работал webhook, getUpdates без этого вернет конфликт
+            await bot.delete_webhook()
+            # Обновления ставит в очереди update_executor: polling ждёт, когда он перегружен
+            await dp.start_polling(bot, handle_as_tasks=False, close_bot_session=False)
+    finally:
+        # Даём доработать уже принятым обновлениям
+        await update_executor.executor.join(timeout=30)
+        warmup_task.cancel()
+        media_task.cancel()
+        await access_cache.stop_listener()
+        await n8n_jobs.stop_job_service()
+        await metrics.stop_server()
+        await n8n_gateway.close_gateway()
+        # Индексы похожих вопросов переживают перезапуск
+        semantic_cache.save_all()
+        # Записи FSM от обработчиков, доработавших после остановки приёма
+        await storage.close()
+        await registration.batcher.close()
+        await interview_journal.journal.close()
+        await close_db()
+        await bot.session.close()
+        logging_setup.shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -4,11 +4,18 @@
 """
 
 import os
+import sys
+import csv
+import json
+import argparse
 from datetime import datetime, timezone, timedelta
+from typing import Iterator, TextIO
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, select
+from sqlalchemy import BigInteger, any_, bindparam, create_engine, func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import sessionmaker
-from models import User
+from models import User, compute_access
+from access_cache import ACCESS_CHANNEL
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -21,6 +28,34 @@ if not DATABASE_URL:
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Доступ истекает через ACCESS_PERIOD после started_at (как в models.compute_access)
+ACCESS_PERIOD = timedelta(hours=24)
+# Сколько ID продлевается одним UPDATE
+EXTEND_CHUNK_SIZE = 1000
+# Payload pg_notify ограничен 8000 байтами
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+
+def notify_access_changed(session, telegram_ids: list[int]) -> None:
+    """Попросить запущенного бота сбросить кэш доступа этих пользователей.
+
+    pg_notify транзакционный — уведомление уйдет только вместе с commit.
+    На других БД ничего не делает (бот перечитает отказ через ACCESS_NEGATIVE_TTL).
+    """
+    if not telegram_ids or session.get_bind().dialect.name != "postgresql":
+        return
+    payloads, current = [], ""
+    for tid in map(str, telegram_ids):
+        if current and len(current) + 1 + len(tid) > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append(current)
+            current = ""
+        current = f"{current},{tid}" if current else tid
+    payloads.append(current)
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        [{"channel": ACCESS_CHANNEL, "payload": payload} for payload in payloads],
+    )
+
 
 def get_user_info(telegram_id: int) -> dict | None:
     """Получить информацию о пользователе."""
@@ -32,9 +67,8 @@ def get_user_info(telegram_id: int) -> dict | None:
         if not user:
             return None
         
-        access_until = user.started_at + timedelta(hours=24)
+        has_access, access_until = compute_access(user.started_at)
         now = datetime.now(timezone.utc)
-        has_access = now < access_until
         
         return {
             "telegram_id": user.telegram_id,
@@ -57,81 +91,213 @@ def extend_access(telegram_id: int, hours: int = 24) -> bool:
     Returns:
         True если успешно, False если пользователь не найден
     """
-    with SessionLocal() as session:
-        user = session.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        ).scalar_one_or_none()
-        
-        if not user:
-            return False
-        
-        user.started_at = datetime.now(timezone.utc)
-        session.commit()
-        return True
+    return bool(extend_access_multiple([telegram_id], hours)["success"])
+
+
+def _telegram_id_in(session, telegram_ids: list[int]):
+    """Условие "telegram_id из списка".
+
+    На PostgreSQL — ``telegram_id = ANY(:ids)`` с массивом: один и тот же текст
+    запроса для любой длины пачки. На других БД — обычный IN.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return User.telegram_id == any_(bindparam("ids", telegram_ids, type_=ARRAY(BigInteger)))
+    return User.telegram_id.in_(telegram_ids)
 
 
 def extend_access_multiple(telegram_ids: list[int], hours: int = 24) -> dict:
     """
     Продлить доступ нескольким пользователям.
     
+    Доступ действует hours часов с текущего момента (started_at сдвигается
+    так, чтобы started_at + 24ч = сейчас + hours). ID обновляются пачками по
+    EXTEND_CHUNK_SIZE: один ``UPDATE ... RETURNING telegram_id`` и commit на пачку.
+    
     Args:
         telegram_ids: Список Telegram ID
         hours: Количество часов доступа
     
     Returns:
         Словарь со статистикой: {"success": [], "failed": []}
+        (failed — ID, которых нет в базе)
     """
-    result = {"success": [], "failed": []}
+    telegram_ids = list(dict.fromkeys(telegram_ids))  # без повторов, порядок сохраняем
+    started_at = datetime.now(timezone.utc) + timedelta(hours=hours) - ACCESS_PERIOD
+    updated = set()
     
-    for tid in telegram_ids:
-        if extend_access(tid, hours):
-            result["success"].append(tid)
-        else:
-            result["failed"].append(tid)
+    with SessionLocal() as session:
+        for i in range(0, len(telegram_ids), EXTEND_CHUNK_SIZE):
+            chunk = telegram_ids[i:i + EXTEND_CHUNK_SIZE]
+            chunk_updated = session.execute(
+                update(User)
+                .where(_telegram_id_in(session, chunk))
+                .values(started_at=started_at)
+                .returning(User.telegram_id)
+            ).scalars().all()
+            notify_access_changed(session, chunk_updated)
+            session.commit()
+            updated.update(chunk_updated)
     
-    return result
+    return {
+        "success": [tid for tid in telegram_ids if tid in updated],
+        "failed": [tid for tid in telegram_ids if tid not in updated],
+    }
+
+
+def read_telegram_ids(lines) -> list[int]:
+    """Telegram ID из строк (через запятую, пробелы или по одному в строке).
+
+    Raises:
+        ValueError: если встретилось не число
+    """
+    return [int(part) for line in lines for part in line.replace(",", " ").split()]
+
+
+# ============================================================
+# СПИСКИ ПОЛЬЗОВАТЕЛЕЙ (фильтр и подсчёт — в SQL)
+# ============================================================
+#
+# Доступ истекает через ACCESS_PERIOD после started_at, поэтому условие
+# "активен" — это started_at > now - ACCESS_PERIOD: сравнение самой колонки
+# идёт по индексу ix_users_started_at, выражение started_at + 24h не нужно.
+# Списки идут по (started_at, id) — keyset-пагинация без OFFSET.
+
+PAGE_SIZE = 10
+EXPORT_BATCH_SIZE = 1000
+
+
+def _status_condition(status: str, now: datetime):
+    """Условие WHERE для status ('active' / 'expired')."""
+    border = now - ACCESS_PERIOD
+    if status == "active":
+        return User.started_at > border
+    if status == "expired":
+        return User.started_at <= border
+    raise ValueError(f"Неизвестный статус: {status}")
+
+
+def _user_row(telegram_id: int, user_id: int, started_at: datetime, now: datetime) -> dict:
+    has_access, access_until = compute_access(started_at)
+    return {
+        "id": user_id,
+        "telegram_id": telegram_id,
+        "started_at": access_until - ACCESS_PERIOD,  # с таймзоной и на SQLite
+        "access_until": access_until,
+        "time_left": access_until - now if has_access else None,
+        "expired_ago": now - access_until if not has_access else None,
+    }
+
+
+def _users_query(status: str, now: datetime, after: tuple[datetime, int] | None = None):
+    query = (
+        select(User.telegram_id, User.id, User.started_at)
+        .where(_status_condition(status, now))
+        .order_by(User.started_at, User.id)
+    )
+    if after is not None:
+        query = query.where(tuple_(User.started_at, User.id) > tuple_(*after))
+    return query
+
+
+def count_users() -> dict[str, int]:
+    """Сколько пользователей активно и с истекшим доступом (один агрегатный запрос)."""
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as session:
+        active, expired = session.execute(
+            select(
+                func.count().filter(_status_condition("active", now)),
+                func.count().filter(_status_condition("expired", now)),
+            )
+        ).one()
+    return {"active": active, "expired": expired}
+
+
+def get_users_page(
+    status: str,
+    limit: int = PAGE_SIZE,
+    after: tuple[datetime, int] | None = None,
+) -> tuple[list[dict], tuple[datetime, int] | None]:
+    """Страница пользователей со статусом status.
+
+    Args:
+        status: 'active' или 'expired'
+        limit: размер страницы
+        after: ключ последней строки предыдущей страницы (None — первая)
+
+    Returns:
+        (строки, ключ для следующей страницы или None, если это последняя)
+    """
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as session:
+        rows = session.execute(_users_query(status, now, after).limit(limit + 1)).all()
+    users = [_user_row(*row, now) for row in rows[:limit]]
+    next_key = (users[-1]["started_at"], users[-1]["id"]) if len(rows) > limit else None
+    return users, next_key
+
+
+def iter_users(status: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Все пользователи со статусом status, потоком (серверный курсор, yield_per)."""
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as session:
+        result = session.execute(_users_query(status, now).execution_options(yield_per=batch_size))
+        for row in result:
+            yield _user_row(*row, now)
 
 
 def get_active_users() -> list[dict]:
     """Получить список всех активных пользователей."""
-    with SessionLocal() as session:
-        users = session.execute(select(User)).scalars().all()
-        
-        active_users = []
-        now = datetime.now(timezone.utc)
-        
-        for user in users:
-            access_until = user.started_at + timedelta(hours=24)
-            if now < access_until:
-                active_users.append({
-                    "telegram_id": user.telegram_id,
-                    "started_at": user.started_at,
-                    "access_until": access_until,
-                    "time_left": access_until - now
-                })
-        
-        return active_users
+    return list(iter_users("active"))
 
 
 def get_expired_users() -> list[dict]:
     """Получить список всех пользователей с истекшим доступом."""
-    with SessionLocal() as session:
-        users = session.execute(select(User)).scalars().all()
-        
-        expired_users = []
-        now = datetime.now(timezone.utc)
-        
+    return list(iter_users("expired"))
+
+
+EXPORT_FIELDS = ["telegram_id", "started_at", "access_until"]
+
+
+def export_users(status: str, fmt: str, out: TextIO) -> int:
+    """Выгрузить пользователей в CSV или JSONL построчно (память не растёт). Возвращает число строк."""
+    writer = csv.writer(out) if fmt == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+    exported = 0
+    for user in iter_users(status):
+        values = [user["telegram_id"], user["started_at"].isoformat(), user["access_until"].isoformat()]
+        if writer:
+            writer.writerow(values)
+        else:
+            out.write(json.dumps(dict(zip(EXPORT_FIELDS, values))) + "\n")
+        exported += 1
+    return exported
+
+
+def _print_page(status: str) -> None:
+    """Постранично вывести пользователей (Enter — следующая страница)."""
+    after = None
+    while True:
+        users, after = get_users_page(status, PAGE_SIZE, after)
         for user in users:
-            access_until = user.started_at + timedelta(hours=24)
-            if now >= access_until:
-                expired_users.append({
-                    "telegram_id": user.telegram_id,
-                    "started_at": user.started_at,
-                    "access_until": access_until,
-                    "expired_ago": now - access_until
-                })
-        
-        return expired_users
+            if status == "active":
+                hours = int(user['time_left'].total_seconds() / 3600)
+                minutes = int(
+                    (user['time_left'].total_seconds() % 3600) / 60
+                )
+                print(
+                    f"   {user['telegram_id']}: "
+                    f"осталось {hours}ч {minutes}м"
+                )
+            else:
+                hours = int(user['expired_ago'].total_seconds() / 3600)
+                print(
+                    f"   {user['telegram_id']}: "
+                    f"истек {hours}ч назад"
+                )
+        if after is None:
+            return
+        if input("   Enter — ещё, q — хватит: ").strip().lower() == "q":
+            return
 
 
 def print_user_info(user_info: dict) -> None:
@@ -208,9 +374,7 @@ def main_menu():
             hours = int(hours) if hours else 24
             
             try:
-                telegram_ids = [
-                    int(tid.strip()) for tid in ids_str.split(",")
-                ]
+                telegram_ids = read_telegram_ids([ids_str])
                 result = extend_access_multiple(telegram_ids, hours)
                 
                 print(f"\n✅ Успешно продлено: {len(result['success'])} польз.")
@@ -224,35 +388,12 @@ def main_menu():
                 print("❌ Некорректные данные")
         
         elif choice == "4":
-            active = get_active_users()
-            print(f"\n✅ Активных пользователей: {len(active)}")
-            
-            for user in active[:10]:  # Показываем первых 10
-                hours = int(user['time_left'].total_seconds() / 3600)
-                minutes = int(
-                    (user['time_left'].total_seconds() % 3600) / 60
-                )
-                print(
-                    f"   {user['telegram_id']}: "
-                    f"осталось {hours}ч {minutes}м"
-                )
-            
-            if len(active) > 10:
-                print(f"   ... и еще {len(active) - 10} пользователей")
+            print(f"\n✅ Активных пользователей: {count_users()['active']}")
+            _print_page("active")
         
         elif choice == "5":
-            expired = get_expired_users()
-            print(f"\n❌ Пользователей с истекшим доступом: {len(expired)}")
-            
-            for user in expired[:10]:  # Показываем первых 10
-                hours = int(user['expired_ago'].total_seconds() / 3600)
-                print(
-                    f"   {user['telegram_id']}: "
-                    f"истек {hours}ч назад"
-                )
-            
-            if len(expired) > 10:
-                print(f"   ... и еще {len(expired) - 10} пользователей")
+            print(f"\n❌ Пользователей с истекшим доступом: {count_users()['expired']}")
+            _print_page("expired")
         
         elif choice == "6":
             print("\n👋 До свидания!")
@@ -262,7 +403,57 @@ def main_menu():
             print("\n❌ Некорректный выбор")
 
 
+def export_main(argv: list[str]) -> None:
+    """``python manage_access.py export --status active --format csv -o users.csv``"""
+    parser = argparse.ArgumentParser(prog="manage_access.py export", description="Выгрузка пользователей")
+    parser.add_argument("--status", choices=["active", "expired"], required=True)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("-o", "--output", help="файл (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            exported = export_users(args.status, args.format, out)
+        print(f"✅ Выгружено пользователей: {exported} -> {args.output}", file=sys.stderr)
+    else:
+        export_users(args.status, args.format, sys.stdout)
+
+
+def extend_main(argv: list[str]) -> None:
+    """``python manage_access.py extend --hours 48 123 456`` / ``--file ids.txt`` / ``--file -`` (stdin)"""
+    parser = argparse.ArgumentParser(prog="manage_access.py extend", description="Продление доступа")
+    parser.add_argument("telegram_ids", nargs="*", help="Telegram ID")
+    parser.add_argument("--file", help="файл с Telegram ID (- — stdin)")
+    parser.add_argument("--hours", type=int, default=24, help="часов доступа с текущего момента")
+    args = parser.parse_args(argv)
+
+    try:
+        telegram_ids = read_telegram_ids(args.telegram_ids)
+        if args.file == "-":
+            telegram_ids += read_telegram_ids(sys.stdin)
+        elif args.file:
+            with open(args.file, encoding="utf-8") as f:
+                telegram_ids += read_telegram_ids(f)
+    except ValueError as e:
+        parser.error(f"некорректный Telegram ID: {e}")
+    if not telegram_ids:
+        parser.error("не указаны Telegram ID")
+
+    result = extend_access_multiple(telegram_ids, args.hours)
+    print(f"✅ Продлено на {args.hours} ч: {len(result['success'])} польз.", file=sys.stderr)
+    print(f"❌ Не найдено: {len(result['failed'])} польз.", file=sys.stderr)
+    # Не найденные — в stdout по одному, чтобы их можно было передать дальше
+    for tid in result["failed"]:
+        print(tid)
+
+
+COMMANDS = {"export": export_main, "extend": extend_main}
+
+
 if __name__ == "__main__":
+    if sys.argv[1:2] and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        sys.exit(0)
     try:
         main_menu()
     except KeyboardInterrupt:
@@ -0,0 +1,180 @@
+"""Реестр file_id для локальных медиафайлов.
+
+Видео-кружки разделов (``/start``, HR, AI-Менеджер и т.д.) отправлялись
+как ``FSInputFile`` — каждое открытие меню заново загружало мегабайты
+в Telegram. Telegram возвращает ``file_id`` загруженного файла, и повторная
+отправка по нему — один маленький запрос.
+
+- ключ — sha256 содержимого файла + тип отправки, поэтому замена файла
+  в ``src/`` автоматически приводит к новой загрузке;
+- ``file_id`` хранятся в таблице ``media_files`` и переживают перезапуск;
+- ``warm_up`` при старте загружает все ``KNOWN_MEDIA``, которых еще нет
+  в реестре, в служебный чат ``MEDIA_WARMUP_CHAT_ID`` (если он задан) —
+  тогда даже первый пользователь получает видео по ``file_id``.
+
+    if not await media_registry.send(message, "src/1218.mp4"):
+        await message.answer("Видео не найдено")
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+
+from models import get_session, get_media_file_ids, save_media_file_id
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Чат (например, личка администратора или приватный канал), куда при старте
+# загружаются медиафайлы для получения file_id. Пусто — прогрев отключен.
+MEDIA_WARMUP_CHAT_ID = os.getenv("MEDIA_WARMUP_CHAT_ID")
+
+# Файлы, которые бот отправляет из обработчиков: путь от корня проекта -> тип
+KNOWN_MEDIA = {
+    "src/1217.mp4": "video_note",      # /start
+    "src/1218.mp4": "video_note",      # HR и найм
+    "src/safe.mp4": "video_note",      # Охрана труда
+    "src/1221.mp4": "video_note",      # IT HelpDesk
+    "src/2026_1.mp4": "video_note",    # База Знаний
+    "src/20260112.mp4": "video_note",  # AI-Менеджер
+}
+
+# тип -> (метод Bot, аргумент с файлом, поле Message с результатом)
+_KINDS = {
+    "video_note": ("send_video_note", "video_note", "video_note"),
+    "video": ("send_video", "video", "video"),
+    "photo": ("send_photo", "photo", "photo"),
+    "document": ("send_document", "document", "document"),
+}
+
+_file_ids: dict[tuple[str, str], str] = {}
+# путь -> (mtime, size, sha256): не перечитываем файл на каждую отправку
+_hashes: dict[str, tuple[float, int, str]] = {}
+_upload_locks: dict[tuple[str, str], asyncio.Lock] = {}
+_loaded = False
+
+
+def _resolve(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+def _content_hash(full_path: str) -> str:
+    stat = os.stat(full_path)
+    cached = _hashes.get(full_path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+    _hashes[full_path] = (stat.st_mtime, stat.st_size, content_hash)
+    return content_hash
+
+
+async def _load() -> None:
+    global _loaded
+    if _loaded:
+        return
+    try:
+        async with get_session() as session:
+            _file_ids.update(await get_media_file_ids(session))
+        _loaded = True
+    except Exception as e:
+        logger.error(f"Media registry: не удалось загрузить file_id из БД: {e}")
+
+
+def _extract_file_id(sent: types.Message, kind: str) -> str | None:
+    media = getattr(sent, _KINDS[kind][2], None)
+    if isinstance(media, list):
+        # photo — список размеров, берем самый большой
+        media = media[-1] if media else None
+    return getattr(media, "file_id", None)
+
+
+async def _remember(key: tuple[str, str], path: str, file_id: str) -> None:
+    _file_ids[key] = file_id
+    try:
+        async with get_session() as session:
+            await save_media_file_id(session, key[0], key[1], path, file_id)
+    except Exception as e:
+        # file_id остается в памяти до перезапуска
+        logger.error(f"Media registry: не удалось сохранить file_id {path}: {e}")
+
+
+async def _send(bot: Bot, chat_id: int | str, path: str, kind: str, **kwargs) -> types.Message | None:
+    full_path = _resolve(path)
+    if not os.path.exists(full_path):
+        return None
+
+    await _load()
+    method_name, file_arg, _ = _KINDS[kind]
+    method = getattr(bot, method_name)
+    key = (_content_hash(full_path), kind)
+
+    file_id = _file_ids.get(key)
+    if file_id:
+        try:
+            return await method(chat_id, **{file_arg: file_id}, **kwargs)
+        except TelegramBadRequest as e:
+            # file_id не действителен (например, сменился токен бота) — загружаем заново
+            logger.warning(f"Media registry: file_id для {path} отклонен ({e}), загружаем файл")
+            _file_ids.pop(key, None)
+
+    # Пока идет первая загрузка, остальные ждут ее file_id, а не грузят файл параллельно
+    lock = _upload_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        file_id = _file_ids.get(key)
+        if file_id:
+            return await method(chat_id, **{file_arg: file_id}, **kwargs)
+
+        sent = await method(chat_id, **{file_arg: FSInputFile(full_path)}, **kwargs)
+        file_id = _extract_file_id(sent, kind)
+        if file_id:
+            await _remember(key, path, file_id)
+        return sent
+
+
+async def send(message: types.Message, path: str, kind: str = "video_note", **kwargs) -> bool:
+    """Ответить медиафайлом (по file_id, если он уже известен).
+
+    Returns:
+        False, если файла нет на диске (обработчик сам решает, что показать)
+    """
+    sent = await _send(message.bot, message.chat.id, path, kind, **kwargs)
+    return sent is not None
+
+
+async def warm_up(bot: Bot) -> None:
+    """Загрузить в служебный чат все KNOWN_MEDIA без file_id (фоном при старте)."""
+    await _load()
+    if not MEDIA_WARMUP_CHAT_ID:
+        return
+
+    uploaded = 0
+    for path, kind in KNOWN_MEDIA.items():
+        full_path = _resolve(path)
+        if not os.path.exists(full_path):
+            logger.warning(f"Media registry: файл {path} не найден")
+            continue
+        if (_content_hash(full_path), kind) in _file_ids:
+            continue
+        try:
+            sent = await _send(bot, MEDIA_WARMUP_CHAT_ID, path, kind, disable_notification=True)
+            uploaded += 1
+            if sent is not None:
+                await sent.delete()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Media registry: прогрев {path} не удался: {e}")
+
+    if uploaded:
+        logger.info(f"Media registry: загружено при старте: {uploaded}")
@@ -0,0 +1,451 @@
+"""Метрики бота в текстовом формате Prometheus (``GET /metrics``).
+
+Без внешних зависимостей: счётчики, gauge и гистограммы с метками,
+которые обработчики и сервисы обновляют в памяти, и маленький aiohttp-сервер
+(``METRICS_HOST``:``METRICS_PORT``; ``METRICS_PORT=0`` — выключено). Сервер
+без авторизации, поэтому по умолчанию слушает только 127.0.0.1; открывать
+наружу (``METRICS_HOST=0.0.0.0``) — только в закрытой сети с Prometheus.
+
+Что собирается:
+
+- ``bot_handler_duration_seconds{department,handler}`` — время обработчиков
+  по отделам (hr, safety, it, kb, ai_manager, main) и их ошибки;
+- ``n8n_request_duration_seconds{webhook,status}`` — вызовы вебхуков n8n;
+- ``db_query_duration_seconds{operation}`` — запросы к БД;
+- ``telegram_api_duration_seconds{method}`` и ``telegram_api_429_total``;
+- ``bot_fsm_states{group,state}`` — сколько пользователей в каждом состоянии FSM;
+- ``bot_updates_*`` — обновления в работе / в очередях исполнителя.
+
+Значения "на момент опроса" (очереди) считаются функциями-коллекторами,
+зарегистрированными через ``Gauge(..., collect=...)``. Население FSM требует
+запроса к БД, поэтому оно пересчитывается в фоне раз в
+``METRICS_FSM_REFRESH`` секунд, а опрос отдаёт последнее значение.
+"""
+
+import os
+import time
+import asyncio
+import inspect
+import logging
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator
+
+from aiohttp import web
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100") or 0)
+METRICS_FSM_REFRESH = float(os.getenv("METRICS_FSM_REFRESH", "60"))  # сек
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = tuple[str, ...]
+Collector = Callable[[], "dict[LabelValues, float] | Awaitable[dict[LabelValues, float]]"]
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        _registry.append(self)
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    async def samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    async def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        collect: Collector | None = None,
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+        self._collect = collect
+        # Счётчики, которые ведёт сам источник (например, update_executor), отдаются как counter
+        self.kind = kind
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    async def samples(self) -> list[str]:
+        values = self._values
+        if self._collect is not None:
+            try:
+                values = self._collect()
+                if inspect.isawaitable(values):
+                    values = await values
+            except Exception as e:
+                logger.warning(f"Metrics: коллектор {self.name} упал: {e}")
+                return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # метки -> [счётчики по бакетам (не накопительные), сумма, количество]
+        self._values: dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[dict[str, Any]]:
+        """Замерить блок; метки можно дописать внутри (например, status)."""
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    async def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+async def render() -> str:
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    lines: list[str] = []
+    for metric in _registry:
+        samples = await metric.samples()
+        if samples:
+            lines.extend(metric.header())
+            lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+# ==================== Метрики бота ====================
+
+handler_duration = Histogram(
+    "bot_handler_duration_seconds", "Время выполнения обработчиков", ("department", "handler")
+)
+handler_errors = Counter(
+    "bot_handler_errors_total", "Исключения в обработчиках", ("department", "handler")
+)
+n8n_duration = Histogram(
+    "n8n_request_duration_seconds", "Вызовы вебхуков n8n", ("webhook", "status")
+)
+n8n_circuit_rejected = Counter(
+    "n8n_circuit_rejected_total", "Вызовы n8n, отклонённые circuit breaker'ом", ("webhook",)
+)
+db_duration = Histogram(
+    "db_query_duration_seconds", "Запросы к БД", ("operation",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+telegram_duration = Histogram(
+    "telegram_api_duration_seconds", "Запросы к Telegram Bot API", ("method",)
+)
+telegram_429 = Counter(
+    "telegram_api_429_total", "Ответы Telegram 429 Too Many Requests", ("method",)
+)
+
+
+def webhook_name(url: str) -> str:
+    """Метка вебхука: последний сегмент пути (``.../webhook/company-rag`` -> ``company-rag``)."""
+    return url.rstrip("/").rsplit("/", 1)[-1] or url
+
+
+# Модуль обработчика -> отдел
+_DEPARTMENTS = (
+    ("handlers.hr", "hr"),
+    ("handlers.labor_safety", "safety"),
+    ("handlers.safety_handlers", "safety"),
+    ("handlers.it_helpdesk", "it"),
+    ("handlers.knowledge_base", "kb"),
+    ("handlers.ai_manager", "ai_manager"),
+)
+
+
+def department_of(module: str) -> str:
+    for prefix, department in _DEPARTMENTS:
+        if module.startswith(prefix):
+            return department
+    return "main"
+
+
+# ==================== Источники ====================
+
+
+class HandlerMetrics(BaseMiddleware):
+    """Inner-middleware: время обработчика с меткой отдела (по модулю обработчика)."""
+
+    async def __call__(self, handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        labels = {
+            "department": department_of(getattr(callback, "__module__", "") or ""),
+            "handler": getattr(callback, "__name__", "unknown"),
+        }
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.inc(**labels)
+            raise
+        finally:
+            handler_duration.observe(time.perf_counter() - started, **labels)
+
+
+class TelegramApiMetrics(BaseRequestMiddleware):
+    """Request-middleware сессии бота: время запросов к Bot API и ответы 429.
+
+    Подключается после ``telegram_scheduler``, поэтому ожидание токенов
+    планировщика в замер не попадает — только сам запрос.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Response:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter:
+            telegram_429.inc(method=name)
+            raise
+        finally:
+            telegram_duration.observe(time.perf_counter() - started, method=name)
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def instrument_engine(engine) -> None:
+    """Замер запросов через события курсора SQLAlchemy (``engine`` — async или sync)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        db_duration.observe(time.perf_counter() - started, operation=_operation(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+class _BackgroundCollector:
+    """Коллектор, который считается в фоне раз в ``interval`` секунд.
+
+    Опрос ``/metrics`` отдаёт последнее посчитанное значение и не ждёт БД.
+    """
+
+    def __init__(self, collect: Collector, interval: float):
+        self.collect = collect
+        self.interval = interval
+        self.values: dict[LabelValues, float] = {}
+        _background.append(self)
+
+    def __call__(self) -> dict[LabelValues, float]:
+        return self.values
+
+    async def run(self) -> None:
+        while True:
+            try:
+                values = self.collect()
+                if inspect.isawaitable(values):
+                    values = await values
+                self.values = values
+            except Exception as e:
+                logger.warning(f"Metrics: фоновый коллектор упал: {e}")
+            await asyncio.sleep(self.interval)
+
+
+_background: list[_BackgroundCollector] = []
+_background_tasks: list[asyncio.Task] = []
+
+
+def _fsm_collector(storage) -> Collector:
+    """Население состояний FSM: ``{(группа, состояние): число}``."""
+
+    async def collect() -> dict[LabelValues, float]:
+        from aiogram.fsm.storage.memory import MemoryStorage
+
+        if isinstance(storage, MemoryStorage):
+            counts: dict[str, int] = {}
+            for record in storage.storage.values():
+                if record.state:
+                    counts[record.state] = counts.get(record.state, 0) + 1
+        else:
+            from models import get_session, count_fsm_states
+
+            async with get_session() as session:
+                counts = await count_fsm_states(session)
+        return {(state.split(":", 1)[0], state): count for state, count in counts.items()}
+
+    return collect
+
+
+def install(dp, bot: Bot, engine=None) -> None:
+    """Подключить сбор метрик к диспетчеру, сессии бота и движку БД (из main.py).
+
+    Вызывать после ``telegram_scheduler.install(bot)`` и ``update_executor.install(dp)``.
+    """
+    import update_executor
+    import webhook_server
+
+    handler_metrics = HandlerMetrics()
+    dp.message.middleware(handler_metrics)
+    dp.callback_query.middleware(handler_metrics)
+    bot.session.middleware(TelegramApiMetrics())
+    if engine is not None:
+        instrument_engine(engine)
+
+    Gauge("bot_fsm_states", "Пользователей в каждом состоянии FSM", ("group", "state"),
+          collect=_BackgroundCollector(_fsm_collector(dp.storage), METRICS_FSM_REFRESH))
+
+    def executor_value(field: str) -> Collector:
+        return lambda: {(): update_executor.executor.snapshot()[field]}
+
+    Gauge("bot_updates_in_flight", "Обновлений в работе (в очередях чатов и выполняются)",
+          collect=executor_value("in_flight"))
+    Gauge("bot_updates_waiting_admission", "Обновлений, ждущих места в исполнителе",
+          collect=executor_value("waiting_admission"))
+    Gauge("bot_active_chats", "Чатов с необработанными обновлениями",
+          collect=executor_value("active_chats"))
+    Gauge("bot_longest_chat_queue", "Самая длинная очередь одного чата",
+          collect=executor_value("longest_chat_queue"))
+    Gauge("bot_updates_total", "Обновлений обработано / с ошибкой / отброшено", ("result",), kind="counter",
+          collect=lambda: {
+              (result,): update_executor.executor.snapshot()[field]
+              for result, field in (("processed", "processed"), ("error", "errors"), ("dropped", "dropped"))
+          })
+    Gauge("bot_updates_dropped_by_chat", "Обновлений, отброшенных из-за флуда, по чатам", ("chat",), kind="counter",
+          collect=lambda: {(str(chat),): count for chat, count in update_executor.executor.dropped_by_chat.items()})
+    Gauge("bot_webhook_queue_size", "Обновлений в очереди webhook-сервера",
+          collect=lambda: {(): webhook_server._queue.qsize()} if webhook_server._queue is not None else {})
+
+
+# ==================== HTTP ====================
+
+_runner: web.AppRunner | None = None
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=await render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start_server() -> None:
+    """Поднять ``/metrics`` (вызывается из main.main())."""
+    global _runner
+    if not METRICS_PORT:
+        return
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, METRICS_HOST, METRICS_PORT).start()
+    _background_tasks.extend(asyncio.create_task(collector.run()) for collector in _background)
+    logger.info(f"Metrics: /metrics на {METRICS_HOST}:{METRICS_PORT}")
+
+
+async def stop_server() -> None:
+    global _runner
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,98 @@
+"""Изменения схемы для уже существующей БД.
+
+``init_db`` (``create_all``) создаёт только отсутствующие таблицы: новый индекс
+на старой таблице он не добавит. Здесь — индексы, которых может не быть на
+проде. Каждый шаг идемпотентный, запускается при старте бота и вручную перед
+деплоем (на большой таблице построение индекса лучше не ждать при старте):
+
+    python migrations.py
+
+На PostgreSQL индекс строится ``CREATE INDEX CONCURRENTLY`` — без блокировки
+записи в таблицу, поэтому вне транзакции (AUTOCOMMIT). Если прошлая попытка
+прервалась и оставила невалидный индекс, он удаляется и строится заново.
+На SQLite — обычный ``CREATE INDEX IF NOT EXISTS``.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+# имя индекса -> "таблица (колонки) [WHERE ...]" (совпадает с __table_args__ моделей)
+INDEXES = {
+    "ix_interview_sessions_active": (
+        "interview_sessions (telegram_id, started_at DESC) WHERE completed_at IS NULL AND stage >= 0"
+    ),
+    "ix_users_started_at": "users (started_at, id)",
+}
+
+
+async def _create_index_postgresql(engine: AsyncEngine, name: str, definition: str) -> bool:
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        # Реплики стартуют одновременно: индекс строит одна, остальные не трогают
+        # её ещё невалидный (строящийся) индекс
+        if not await conn.scalar(text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": name}):
+            logger.info(f"Миграции: индекс {name} строит другой процесс")
+            return False
+        try:
+            return await _build_index_postgresql(conn, name, definition)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": name})
+
+
+async def _build_index_postgresql(conn, name: str, definition: str) -> bool:
+    valid = await conn.scalar(
+        text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+        ),
+        {"name": name},
+    )
+    if valid:
+        return False
+    if valid is not None:
+        logger.warning(f"Миграции: индекс {name} невалиден (прерванное построение) — строим заново")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"))
+    return True
+
+
+async def _create_index_sqlite(engine: AsyncEngine, name: str, definition: str) -> bool:
+    async with engine.begin() as conn:
+        exists = await conn.scalar(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"), {"name": name}
+        )
+        if exists:
+            return False
+        await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}"))
+        return True
+
+
+async def run_migrations(engine: AsyncEngine = default_engine) -> list[str]:
+    """Создать недостающие индексы. Возвращает имена созданных."""
+    create = _create_index_postgresql if engine.dialect.name == "postgresql" else _create_index_sqlite
+    created = []
+    for name, definition in INDEXES.items():
+        if await create(engine, name, definition):
+            logger.info(f"Миграции: создан индекс {name}")
+            created.append(name)
+    return created
+
+
+async def _main() -> None:
+    try:
+        created = await run_migrations()
+    finally:
+        await default_engine.dispose()
+    print(f"✅ Создано индексов: {len(created)}" + (f" ({', '.join(created)})" if created else ""))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
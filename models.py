@@ -1,5 +1,5 @@
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 
 from dotenv import load_dotenv
 from sqlalchemy import (
@@ -7,17 +7,25 @@ from sqlalchemy import (
     Column,
     DateTime,
     Integer,
+    JSON,
     Text,
     SmallInteger,
     ForeignKey,
+    Index,
     String,
+    UniqueConstraint,
     func,
-    create_engine,
+    delete,
+    insert,
     select,
     update,
 )
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, relationship
 
 # Загружаем переменные окружения из .env
 load_dotenv()
@@ -26,18 +34,39 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL не найден в переменных окружения (.env)")
 
-# Создаем движок SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    future=True,
+
+def _async_database_url(url: str) -> str:
+    """Перевести DATABASE_URL на асинхронный драйвер.
+
+    postgresql:// и postgresql+psycopg2:// -> postgresql+asyncpg://,
+    sqlite:// -> sqlite+aiosqlite:// (локальный запуск).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg не понимает sslmode из libpq-строки
+        sslmode = query.pop("sslmode", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Создаем асинхронный движок SQLAlchemy: запросы к БД не блокируют event loop бота
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
     pool_pre_ping=True,
 )
 
 # Базовый класс моделей
 Base = declarative_base()
 
-# Фабрика сессий
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# Фабрика сессий (объекты остаются доступны после commit — без ленивых запросов)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 
 class User(Base):
@@ -52,6 +81,10 @@ class User(Base):
     # Связь с сессиями собеседований
     interview_sessions = relationship("InterviewSession", back_populates="user")
 
+    # Активные / истекшие (started_at > now - 24h) и их списки по (started_at, id)
+    # в manage_access.py
+    __table_args__ = (Index("ix_users_started_at", "started_at", "id"),)
+
     def __repr__(self) -> str:
         return f"<User id={self.id} telegram_id={self.telegram_id}>"
 
@@ -111,7 +144,7 @@ class InterviewSession(Base):
     voice_file_id_3 = Column(Text, nullable=True)
 
     # Рекомендация для HR-аналитика
-    hr_recommendation = Column(JSONB, nullable=True)
+    hr_recommendation = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
 
     started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
@@ -120,6 +153,18 @@ class InterviewSession(Base):
     # Связь с пользователем
     user = relationship("User", back_populates="interview_sessions")
 
+    # Активная сессия пользователя — по частичному индексу (завершённые и
+    # отменённые в него не попадают). На существующей БД его создаёт migrations.py
+    __table_args__ = (
+        Index(
+            "ix_interview_sessions_active",
+            "telegram_id",
+            started_at.desc(),
+            postgresql_where=(completed_at.is_(None)) & (stage >= 0),
+            sqlite_where=(completed_at.is_(None)) & (stage >= 0),
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<InterviewSession id={self.id} tg={self.telegram_id} stage={self.stage}>"
 
@@ -132,21 +177,102 @@ class InterviewSession(Base):
         return self.stage == 3 and self.completed_at is not None
 
 
+class N8nJob(Base):
+    """Асинхронная задача n8n (CV Scan, AI-Глаз и т.п.).
+
+    Бот создаёт запись, отправляет задачу в n8n вместе с callback_url и сразу
+    отвечает пользователю. n8n присылает результат на локальный callback,
+    и бот доставляет его в нужный чат.
+
+    status:
+    - pending: ждём результат от n8n
+    - done: результат получен и доставлен
+    - failed: n8n не принял задачу или вернул ошибку
+    - timeout: результат не пришёл до deadline_at
+    """
+
+    __tablename__ = "n8n_jobs"
+
+    id = Column(String(36), primary_key=True)  # uuid4
+    kind = Column(String(32), nullable=False)
+    telegram_id = Column(BigInteger, nullable=False, index=True)
+    chat_id = Column(BigInteger, nullable=False)
+    status = Column(String(16), nullable=False, default="pending", index=True)
+
+    request = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    result = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    deadline_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<N8nJob id={self.id} kind={self.kind} status={self.status}>"
+
+
+class MediaFile(Base):
+    """file_id Telegram для локального медиафайла (видео-кружки меню и т.п.).
+
+    Ключ — sha256 содержимого и тип отправки: измененный файл получает
+    новый хеш и загружается заново, старая запись просто не используется.
+    """
+
+    __tablename__ = "media_files"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    kind = Column(String(16), nullable=False)  # video_note, photo, video, document
+    path = Column(String(255), nullable=False)
+    file_id = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (UniqueConstraint("content_hash", "kind", name="uq_media_files_hash_kind"),)
+
+    def __repr__(self) -> str:
+        return f"<MediaFile {self.path} kind={self.kind}>"
+
+
+class FsmState(Base):
+    """Состояние FSM aiogram (fsm_storage.DBStorage).
+
+    key — сериализованный StorageKey (бот, чат, пользователь, тред, destiny).
+    version растёт при каждой записи: запись с устаревшей версией
+    отклоняется (оптимистичная блокировка между репликами бота).
+    """
+
+    __tablename__ = "fsm_states"
+
+    key = Column(String(255), primary_key=True)
+    state = Column(String(255), nullable=True)
+    data = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False, default=dict)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), index=True)
+
+    def __repr__(self) -> str:
+        return f"<FsmState {self.key} state={self.state} v{self.version}>"
+
+
 # ==================== Инициализация БД ====================
 
 
-def init_db() -> None:
+async def init_db() -> None:
     """Создает таблицы в базе, если их еще нет."""
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_db() -> None:
+    """Закрыть пул соединений (при остановке бота)."""
+    await engine.dispose()
 
 
-def get_session():
-    """Получить сессию SQLAlchemy."""
+def get_session() -> AsyncSession:
+    """Получить асинхронную сессию SQLAlchemy (``async with get_session() as session``)."""
     return SessionLocal()
 
 
 # ==================== Функции для пользователей ====================
-def save_cv_review(session, telegram_id, user_name, file_id, resume_text, ai_feedback, score=None):
+async def save_cv_review(session, telegram_id, user_name, file_id, resume_text, ai_feedback, score=None):
     """
     Сохраняет результат проверки резюме в БД.
     """
@@ -159,42 +285,117 @@ def save_cv_review(session, telegram_id, user_name, file_id, resume_text, ai_fee
         score=score
     )
     session.add(review)
-    session.commit()
+    await session.commit()
     return review
 
-def ensure_user_started(session, telegram_id: int, started_at: datetime | None = None) -> User:
-    """Создать пользователя если не существует."""
-    user = session.execute(select(User).where(User.telegram_id == telegram_id)).scalar_one_or_none()
-    if user:
-        return user
+def _insert_or_ignore(session, model):
+    """INSERT ... ON CONFLICT DO NOTHING для диалекта сессии (PostgreSQL или SQLite)."""
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    return insert(model).on_conflict_do_nothing(index_elements=["telegram_id"])
 
-    user = User(telegram_id=telegram_id)
+
+async def ensure_user_started(session, telegram_id: int, started_at: datetime | None = None) -> User:
+    """Создать пользователя если не существует.
+
+    Один запрос ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` вместо
+    SELECT + INSERT + refresh; повторный /start того же пользователя
+    (в том числе одновременный) не падает на уникальном telegram_id.
+    """
+    values = {"telegram_id": telegram_id}
     if started_at is not None:
-        user.started_at = started_at
+        values["started_at"] = started_at
 
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    user = (
+        await session.execute(_insert_or_ignore(session, User).values(**values).returning(User))
+    ).scalar_one_or_none()
+    await session.commit()
+    if user is None:
+        # Пользователь уже был — строку не трогаем, started_at остаётся первым
+        user = (
+            await session.execute(select(User).where(User.telegram_id == telegram_id))
+        ).scalar_one()
     return user
 
 
+async def register_users(session, users: dict[int, datetime | None]) -> set[int]:
+    """Зарегистрировать пачку пользователей одним INSERT.
+
+    Args:
+        session: SQLAlchemy сессия
+        users: telegram_id -> started_at (None — текущее время)
+
+    Returns:
+        telegram_id, которые были созданы этим запросом (остальные уже были)
+    """
+    if not users:
+        return set()
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"telegram_id": telegram_id, "started_at": started_at or now}
+        for telegram_id, started_at in users.items()
+    ]
+    result = await session.execute(
+        _insert_or_ignore(session, User).values(rows).returning(User.telegram_id)
+    )
+    created = set(result.scalars().all())
+    await session.commit()
+    return created
+
+
 # ==================== Функции для собеседований ====================
 
 
-def get_active_interview(session, telegram_id: int) -> InterviewSession | None:
+def _active(telegram_id: int):
+    """Условие активной сессии — совпадает с частичным индексом ix_interview_sessions_active."""
+    return (
+        (InterviewSession.telegram_id == telegram_id)
+        & InterviewSession.completed_at.is_(None)
+        & (InterviewSession.stage >= 0)
+    )
+
+
+async def get_active_interview(session, telegram_id: int) -> InterviewSession | None:
     """Получить активную сессию собеседования."""
-    return session.execute(
+    result = await session.execute(
         select(InterviewSession)
-        .where(InterviewSession.telegram_id == telegram_id)
-        .where(InterviewSession.completed_at.is_(None))
-        .where(InterviewSession.stage >= 0)
+        .where(_active(telegram_id))
         .order_by(InterviewSession.started_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _advance_interview(session, telegram_id: int, from_stage: int | None, **values) -> InterviewSession | None:
+    """Один ``UPDATE ... RETURNING`` активной сессии (и commit).
+
+    from_stage — этап, на котором сессия должна быть сейчас (None — любой
+    активный). Если сессию уже сдвинул другой апдейт (повторная доставка
+    ответа, вторая реплика бота), строка не обновится и вернётся None —
+    вместо чтения, изменения и записи поверх чужих данных.
+    """
+    condition = _active(telegram_id)
+    if from_stage is not None:
+        condition &= InterviewSession.stage == from_stage
+    interview = (
+        await session.execute(
+            update(InterviewSession)
+            .where(condition)
+            .values(**values)
+            .returning(InterviewSession)
+            .execution_options(populate_existing=True)
+        )
     ).scalar_one_or_none()
+    await session.commit()
+    return interview
 
 
-def start_interview(session, telegram_id: int, first_question: str) -> InterviewSession:
+async def start_interview(session, telegram_id: int, first_question: str) -> InterviewSession:
     """Начать новое собеседование с первым вопросом.
 
+    Старые активные сессии отменяются в том же запросе (на PostgreSQL —
+    один round trip вместе с INSERT).
+
     Args:
         session: SQLAlchemy сессия
         telegram_id: Telegram ID пользователя
@@ -203,30 +404,38 @@ def start_interview(session, telegram_id: int, first_question: str) -> Interview
     Returns:
         Новая сессия собеседования
     """
-    # Отменяем старые активные сессии
-    session.execute(
+    cancel_active = (
         update(InterviewSession)
-        .where(InterviewSession.telegram_id == telegram_id)
-        .where(InterviewSession.completed_at.is_(None))
+        .where(_active(telegram_id))
         .values(completed_at=func.now(), stage=-1)
     )
-
-    # Получаем user_id
-    user = session.execute(select(User).where(User.telegram_id == telegram_id)).scalar_one_or_none()
-
-    interview = InterviewSession(
-        user_id=user.id if user else None,
-        telegram_id=telegram_id,
-        stage=0,
-        q1=first_question,
+    # user_id — подзапросом в том же INSERT
+    new_interview = (
+        insert(InterviewSession)
+        .values(
+            user_id=select(User.id).where(User.telegram_id == telegram_id).scalar_subquery(),
+            telegram_id=telegram_id,
+            stage=0,
+            q1=first_question,
+        )
+        .returning(InterviewSession)
     )
-    session.add(interview)
-    session.commit()
-    session.refresh(interview)
+
+    if session.get_bind().dialect.name == "postgresql":
+        # Один запрос: отмена старых активных сессий — data-modifying CTE
+        # (WITH cancelled AS (UPDATE ...) INSERT ... RETURNING)
+        cancelled = cancel_active.returning(InterviewSession.id).cte("cancelled")
+        new_interview = new_interview.add_cte(cancelled)
+    else:
+        # SQLite не умеет UPDATE внутри WITH — отменяем отдельным запросом
+        await session.execute(cancel_active)
+
+    interview = (await session.execute(new_interview)).scalar_one()
+    await session.commit()
     return interview
 
 
-def save_answer_1(
+async def save_answer_1(
         session,
         telegram_id: int,
         answer: str,
@@ -234,21 +443,16 @@ def save_answer_1(
         voice_file_id: str | None = None
 ) -> InterviewSession:
     """Сохранить ответ 1, записать вопрос 2, перейти на stage 1."""
-    interview = get_active_interview(session, telegram_id)
+    interview = await _advance_interview(
+        session, telegram_id, 0,
+        a1=answer, voice_file_id_1=voice_file_id, q2=next_question, stage=1,
+    )
     if not interview:
-        raise ValueError("Нет активной сессии")
-
-    interview.a1 = answer
-    interview.voice_file_id_1 = voice_file_id
-    interview.q2 = next_question
-    interview.stage = 1
-
-    session.commit()
-    session.refresh(interview)
+        raise ValueError("Нет активной сессии на этапе 0")
     return interview
 
 
-def save_answer_2(
+async def save_answer_2(
         session,
         telegram_id: int,
         answer: str,
@@ -256,21 +460,16 @@ def save_answer_2(
         voice_file_id: str | None = None
 ) -> InterviewSession:
     """Сохранить ответ 2, записать вопрос 3, перейти на stage 2."""
-    interview = get_active_interview(session, telegram_id)
+    interview = await _advance_interview(
+        session, telegram_id, 1,
+        a2=answer, voice_file_id_2=voice_file_id, q3=next_question, stage=2,
+    )
     if not interview:
-        raise ValueError("Нет активной сессии")
-
-    interview.a2 = answer
-    interview.voice_file_id_2 = voice_file_id
-    interview.q3 = next_question
-    interview.stage = 2
-
-    session.commit()
-    session.refresh(interview)
+        raise ValueError("Нет активной сессии на этапе 1")
     return interview
 
 
-def save_answer_3_and_complete(
+async def save_answer_3_and_complete(
         session,
         telegram_id: int,
         answer: str,
@@ -278,64 +477,226 @@ def save_answer_3_and_complete(
         voice_file_id: str | None = None
 ) -> InterviewSession:
     """Сохранить ответ 3, записать рекомендацию HR, завершить собеседование."""
-    interview = get_active_interview(session, telegram_id)
+    interview = await _advance_interview(
+        session, telegram_id, 2,
+        a3=answer, voice_file_id_3=voice_file_id, hr_recommendation=hr_recommendation,
+        stage=3, completed_at=func.now(),
+    )
     if not interview:
-        raise ValueError("Нет активной сессии")
-
-    interview.a3 = answer
-    interview.voice_file_id_3 = voice_file_id
-    interview.hr_recommendation = hr_recommendation
-    interview.stage = 3
-    interview.completed_at = datetime.now()
-
-    session.commit()
-    session.refresh(interview)
+        raise ValueError("Нет активной сессии на этапе 2")
     return interview
 
 
-def cancel_interview(session, telegram_id: int) -> InterviewSession | None:
+async def cancel_interview(session, telegram_id: int) -> InterviewSession | None:
     """Отменить активное собеседование."""
-    interview = get_active_interview(session, telegram_id)
-    if not interview:
+    return await _advance_interview(session, telegram_id, None, stage=-1, completed_at=func.now())
+
+
+async def get_interview_history(session, telegram_id: int, limit: int = 10) -> list[InterviewSession]:
+    """Получить историю собеседований пользователя."""
+    result = await session.execute(
+        select(InterviewSession)
+        .where(InterviewSession.telegram_id == telegram_id)
+        .where(InterviewSession.stage == 3)  # только завершённые
+        .order_by(InterviewSession.completed_at.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def get_all_completed_interviews(session, limit: int = 50) -> list[InterviewSession]:
+    """Получить все завершённые собеседования (для HR-панели)."""
+    result = await session.execute(
+        select(InterviewSession)
+        .where(InterviewSession.stage == 3)
+        .order_by(InterviewSession.completed_at.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+# ==================== Асинхронные задачи n8n ====================
+
+
+async def create_job(
+        session,
+        job_id: str,
+        kind: str,
+        telegram_id: int,
+        chat_id: int,
+        request: dict,
+        timeout_seconds: float,
+) -> N8nJob:
+    """Создать задачу в статусе pending с дедлайном через timeout_seconds."""
+    job = N8nJob(
+        id=job_id,
+        kind=kind,
+        telegram_id=telegram_id,
+        chat_id=chat_id,
+        status="pending",
+        request=request,
+        deadline_at=datetime.now(timezone.utc) + timedelta(seconds=timeout_seconds),
+    )
+    session.add(job)
+    await session.commit()
+    return job
+
+
+async def finish_job(session, job_id: str, status: str, result: dict | None = None) -> N8nJob | None:
+    """Перевести pending-задачу в финальный статус.
+
+    Returns:
+        Задача, если она была pending; None, если задачи нет или она уже
+        завершена (повторный callback от n8n не доставляется дважды).
+    """
+    job = (
+        await session.execute(
+            select(N8nJob)
+            .where(N8nJob.id == job_id)
+            .where(N8nJob.status == "pending")
+            .with_for_update()
+        )
+    ).scalar_one_or_none()
+    if not job:
         return None
 
-    interview.stage = -1
-    interview.completed_at = datetime.now()
+    job.status = status
+    job.result = result
+    await session.commit()
+    await session.refresh(job)
+    return job
 
-    session.commit()
-    session.refresh(interview)
-    return interview
 
+async def expire_jobs(session) -> list[N8nJob]:
+    """Пометить timeout все pending-задачи с истекшим дедлайном."""
+    result = await session.execute(
+        select(N8nJob)
+        .where(N8nJob.status == "pending")
+        .where(N8nJob.deadline_at < datetime.now(timezone.utc))
+        .with_for_update(skip_locked=True)
+    )
+    jobs = list(result.scalars().all())
+    for job in jobs:
+        job.status = "timeout"
+    await session.commit()
+    return jobs
+
+
+async def delete_finished_jobs(session, older_than: timedelta) -> int:
+    """Удалить завершённые задачи старше older_than. Возвращает число удалённых."""
+    result = await session.execute(
+        delete(N8nJob)
+        .where(N8nJob.status != "pending")
+        .where(N8nJob.updated_at < datetime.now(timezone.utc) - older_than)
+    )
+    await session.commit()
+    return result.rowcount
 
-def get_interview_history(session, telegram_id: int, limit: int = 10) -> list[InterviewSession]:
-    """Получить историю собеседований пользователя."""
-    return list(
-        session.execute(
-            select(InterviewSession)
-            .where(InterviewSession.telegram_id == telegram_id)
-            .where(InterviewSession.stage == 3)  # только завершённые
-            .order_by(InterviewSession.completed_at.desc())
-            .limit(limit)
-        ).scalars().all()
+
+# ==================== Медиафайлы ====================
+
+
+async def get_media_file_ids(session) -> dict[tuple[str, str], str]:
+    """Все сохраненные file_id: {(content_hash, kind): file_id}."""
+    result = await session.execute(select(MediaFile.content_hash, MediaFile.kind, MediaFile.file_id))
+    return {(content_hash, kind): file_id for content_hash, kind, file_id in result.all()}
+
+
+async def save_media_file_id(session, content_hash: str, kind: str, path: str, file_id: str) -> None:
+    """Запомнить (или заменить) file_id для содержимого файла."""
+    media = (
+        await session.execute(
+            select(MediaFile)
+            .where(MediaFile.content_hash == content_hash)
+            .where(MediaFile.kind == kind)
+        )
+    ).scalar_one_or_none()
+    if media is None:
+        session.add(MediaFile(content_hash=content_hash, kind=kind, path=path, file_id=file_id))
+    else:
+        media.path = path
+        media.file_id = file_id
+    await session.commit()
+
+
+# ==================== Состояния FSM ====================
+
+
+async def get_fsm_state(session, key: str) -> FsmState | None:
+    """Прочитать состояние FSM по ключу."""
+    return await session.get(FsmState, key, populate_existing=True)
+
+
+async def save_fsm_state(session, key: str, state: str | None, data: dict, expected_version: int) -> int | None:
+    """Записать состояние, если в БД всё ещё expected_version (0 — записи нет).
+
+    Пустое состояние (нет state и data) удаляет запись.
+
+    Returns:
+        Новая версия (0 — запись удалена) или None, если запись успели
+        изменить (конфликт версий)
+    """
+    if expected_version == 0:
+        if state is None and not data:
+            return 0
+        session.add(FsmState(key=key, state=state, data=data, version=1))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            return None
+        return 1
+
+    condition = (FsmState.key == key) & (FsmState.version == expected_version)
+    if state is None and not data:
+        result = await session.execute(delete(FsmState).where(condition))
+        new_version = 0
+    else:
+        result = await session.execute(
+            update(FsmState)
+            .where(condition)
+            .values(state=state, data=data, version=expected_version + 1, updated_at=func.now())
+        )
+        new_version = expected_version + 1
+    await session.commit()
+    return new_version if result.rowcount == 1 else None
+
+
+async def delete_expired_fsm_states(session, older_than: timedelta) -> int:
+    """Удалить состояния, которые не менялись дольше older_than (брошенные диалоги)."""
+    result = await session.execute(
+        delete(FsmState).where(FsmState.updated_at < datetime.now(timezone.utc) - older_than)
     )
+    await session.commit()
+    return result.rowcount
 
 
-def get_all_completed_interviews(session, limit: int = 50) -> list[InterviewSession]:
-    """Получить все завершённые собеседования (для HR-панели)."""
-    return list(
-        session.execute(
-            select(InterviewSession)
-            .where(InterviewSession.stage == 3)
-            .order_by(InterviewSession.completed_at.desc())
-            .limit(limit)
-        ).scalars().all()
+async def count_fsm_states(session) -> dict[str, int]:
+    """Сколько записей FSM в каждом состоянии (для метрик)."""
+    result = await session.execute(
+        select(FsmState.state, func.count()).where(FsmState.state.is_not(None)).group_by(FsmState.state)
     )
+    return {state: count for state, count in result.all()}
 
 
 # ==================== Проверка доступа ====================
 
 
-def check_user_access(session, telegram_id: int) -> tuple[bool, datetime | None]:
+def compute_access(started_at: datetime | None) -> tuple[bool, datetime | None]:
+    """Доступ на 24 часа с момента started_at (без обращения к БД).
+
+    Naive-дата (SQLite не хранит таймзону) считается UTC.
+    """
+    if started_at is None:
+        return False, None
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+
+    access_until = started_at + timedelta(hours=24)
+    return datetime.now(timezone.utc) < access_until, access_until
+
+
+async def check_user_access(session, telegram_id: int) -> tuple[bool, datetime | None]:
     """Проверить, имеет ли пользователь доступ к боту (24 часа с момента started_at).
     
     Args:
@@ -345,18 +706,11 @@ def check_user_access(session, telegram_id: int) -> tuple[bool, datetime | None]
     Returns:
         tuple: (имеет_доступ: bool, дата_окончания_доступа: datetime | None)
     """
-    from datetime import timedelta
-    
-    user = session.execute(
-        select(User).where(User.telegram_id == telegram_id)
+    user = (
+        await session.execute(select(User).where(User.telegram_id == telegram_id))
     ).scalar_one_or_none()
     
     if not user:
         return False, None
     
-    # Доступ на 24 часа с момента started_at
-    access_until = user.started_at + timedelta(hours=24)
-    now = datetime.now(timezone.utc)
-    
-    has_access = now < access_until
-    return has_access, access_until
\ No newline at end of file
+    return compute_access(user.started_at)
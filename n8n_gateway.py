@@ -0,0 +1,417 @@
+"""Общий HTTP-шлюз для вызовов n8n.
+
+Все обработчики ходят в n8n через один долгоживущий ``httpx.AsyncClient``
+с пулом keep-alive соединений (и опционально HTTP/2), вместо того чтобы
+на каждый запрос заново платить за DNS + TCP + TLS до levinbiz.app.n8n.cloud.
+
+Клиент создаётся в ``main.main()`` через ``init_gateway()`` и закрывается
+через ``close_gateway()`` при остановке бота.
+
+Для каждого вебхука ведётся circuit breaker (closed/open/half-open), общий
+для всех пользователей: пока workflow в n8n недоступен или не зарегистрирован,
+вызовы сразу получают ``CircuitOpenError``, а фоновый проб периодически
+проверяет, не появился ли вебхук снова.
+
+``stream()`` читает ответ вебхука по мере генерации (NDJSON n8n,
+Server-Sent Events или просто chunked-текст) и отдаёт куски ответа LLM.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator
+
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==================== Конфигурация ====================
+
+N8N_DEFAULT_TIMEOUT = 60.0  # Whisper + LLM могут работать долго
+N8N_CONNECT_TIMEOUT = 10.0
+N8N_MAX_CONNECTIONS = int(os.getenv("N8N_MAX_CONNECTIONS", "100"))
+N8N_MAX_KEEPALIVE = int(os.getenv("N8N_MAX_KEEPALIVE", "20"))
+N8N_KEEPALIVE_EXPIRY = float(os.getenv("N8N_KEEPALIVE_EXPIRY", "60"))
+N8N_HTTP2 = os.getenv("N8N_HTTP2", "0") == "1"
+# n8n Cloud: исторически все вызовы шли с verify=False
+N8N_VERIFY_SSL = os.getenv("N8N_VERIFY_SSL", "0") == "1"
+
+# Circuit breaker
+N8N_FAILURE_THRESHOLD = int(os.getenv("N8N_FAILURE_THRESHOLD", "5"))  # подряд 5xx/сетевых ошибок
+N8N_CIRCUIT_RESET = float(os.getenv("N8N_CIRCUIT_RESET", "30"))  # сек до пробного запроса
+N8N_PROBE_INTERVAL = float(os.getenv("N8N_PROBE_INTERVAL", "5"))  # сек между пробами
+N8N_PROBE_TIMEOUT = 5.0
+
+REASON_NOT_REGISTERED = "webhook не зарегистрирован"
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 требует пакет h2 (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    http2 = N8N_HTTP2 and _http2_available()
+    if N8N_HTTP2 and not http2:
+        logger.warning("N8N_HTTP2=1, но пакет h2 не установлен — используем HTTP/1.1")
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(N8N_DEFAULT_TIMEOUT, connect=N8N_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=N8N_MAX_CONNECTIONS,
+            max_keepalive_connections=N8N_MAX_KEEPALIVE,
+            keepalive_expiry=N8N_KEEPALIVE_EXPIRY,
+        ),
+        http2=http2,
+        verify=N8N_VERIFY_SSL,
+    )
+
+
+# ==================== Circuit breaker ====================
+
+
+class CircuitOpenError(Exception):
+    """Вебхук временно недоступен — вызов отклонён без обращения к n8n."""
+
+    def __init__(self, url: str, reason: str):
+        self.url = url
+        self.reason = reason
+        super().__init__(f"n8n webhook {url} недоступен: {reason}")
+
+
+def is_webhook_not_registered(response: httpx.Response) -> bool:
+    """n8n отвечает 404 'The requested webhook ... is not registered'."""
+    if response.status_code != 404:
+        return False
+    text = response.text.lower()
+    return "not registered" in text or "requested webhook" in text
+
+
+class CircuitBreaker:
+    """Состояние одного вебхука, общее для всех пользователей бота.
+
+    - closed: запросы идут как обычно, считаем подряд идущие сбои;
+    - open: запросы сразу отклоняются, фоновый проб проверяет вебхук;
+    - half-open: пропускаем ровно один пробный запрос, остальные отклоняем.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, url: str):
+        self.url = url
+        self.state = self.CLOSED
+        self.failures = 0
+        self.reason = ""
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._probe_task: asyncio.Task | None = None
+
+    def before_call(self) -> None:
+        """Проверить, можно ли сейчас звать вебхук; иначе CircuitOpenError."""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= N8N_CIRCUIT_RESET:
+            # Страховка на случай, если проб не может ничего сказать о вебхуке
+            self.state = self.HALF_OPEN
+
+        if self.state == self.OPEN:
+            raise CircuitOpenError(self.url, self.reason)
+
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.url, self.reason)
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"n8n circuit CLOSED: {self.url}")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.reason = ""
+        self._trial_in_flight = False
+        self._stop_probe()
+
+    def record_failure(self, reason: str, trip: bool = False) -> None:
+        """Учесть сбой; ``trip=True`` открывает цепь сразу (вебхук не зарегистрирован)."""
+        self.failures += 1
+        self._trial_in_flight = False
+        if trip or self.state == self.HALF_OPEN or self.failures >= N8N_FAILURE_THRESHOLD:
+            self._open(reason)
+
+    def _open(self, reason: str) -> None:
+        if self.state != self.OPEN:
+            logger.warning(f"n8n circuit OPEN: {self.url} ({reason})")
+        self.state = self.OPEN
+        self.reason = reason
+        self.opened_at = time.monotonic()
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    def _stop_probe(self) -> None:
+        if self._probe_task is not None and not self._probe_task.done():
+            if self._probe_task is not asyncio.current_task():
+                self._probe_task.cancel()
+        self._probe_task = None
+
+    async def _probe_loop(self) -> None:
+        """Фоновая проверка: появился ли вебхук снова (без запуска workflow).
+
+        Вебхуки n8n принимают только POST, поэтому пробуем GET: для
+        зарегистрированного вебхука n8n отвечает подсказкой
+        "Did you mean to make a POST request?", для незарегистрированного —
+        "The requested webhook ... is not registered".
+        """
+        while self.state == self.OPEN:
+            await asyncio.sleep(N8N_PROBE_INTERVAL)
+            try:
+                response = await get_client().get(self.url, timeout=N8N_PROBE_TIMEOUT)
+            except httpx.HTTPError:
+                continue
+
+            text = response.text.lower()
+            registered = response.status_code < 400 or "did you mean" in text
+            if registered and self.state == self.OPEN:
+                logger.info(f"n8n circuit HALF-OPEN: {self.url} (проб успешен)")
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+        self._probe_task = None
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Circuit breaker для конкретного вебхука (создаётся при первом вызове)."""
+    breaker = _breakers.get(url)
+    if breaker is None:
+        breaker = _breakers[url] = CircuitBreaker(url)
+    return breaker
+
+
+# ==================== Жизненный цикл ====================
+
+
+async def init_gateway() -> None:
+    """Создать общий клиент (вызывается один раз при старте бота)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info("n8n gateway: пул соединений создан")
+
+
+async def close_gateway() -> None:
+    """Закрыть общий клиент и все keep-alive соединения."""
+    global _client
+    for breaker in _breakers.values():
+        breaker._stop_probe()
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("n8n gateway: пул соединений закрыт")
+    _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Получить общий клиент.
+
+    Если ``init_gateway()`` ещё не вызывался (скрипты, отладка из консоли),
+    клиент создаётся лениво, чтобы обработчики не падали.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+# ==================== Запросы ====================
+
+
+async def post(
+    url: str,
+    payload: dict[str, Any],
+    timeout: float = N8N_DEFAULT_TIMEOUT,
+    follow_redirects: bool = False,
+) -> httpx.Response:
+    """POST JSON в вебхук n8n через общий пул соединений.
+
+    Args:
+        url: URL вебхука n8n
+        payload: JSON-тело запроса
+        timeout: Таймаут чтения ответа для этого вызова
+        follow_redirects: Следовать ли редиректам
+
+    Returns:
+        Ответ httpx (статус не проверяется — это делает вызывающий код)
+
+    Raises:
+        CircuitOpenError: вебхук сейчас считается недоступным
+        httpx.TransportError: сетевая ошибка или таймаут
+    """
+    breaker = get_breaker(url)
+    webhook = metrics.webhook_name(url)
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        metrics.n8n_circuit_rejected.inc(webhook=webhook)
+        raise
+
+    client = get_client()
+    with metrics.n8n_duration.time(webhook=webhook, status="cancelled") as labels:
+        try:
+            response = await client.post(
+                url,
+                json=payload,
+                timeout=httpx.Timeout(timeout, connect=N8N_CONNECT_TIMEOUT),
+                follow_redirects=follow_redirects,
+            )
+        except httpx.TransportError as e:
+            labels["status"] = type(e).__name__
+            breaker.record_failure(f"{type(e).__name__}")
+            raise
+        except BaseException:
+            # Отмена задачи и т.п. — не повод держать half-open закрытым навсегда
+            breaker._trial_in_flight = False
+            raise
+        labels["status"] = response.status_code
+
+    if is_webhook_not_registered(response):
+        breaker.record_failure(REASON_NOT_REGISTERED, trip=True)
+    elif response.status_code >= 500:
+        breaker.record_failure(f"HTTP {response.status_code}")
+    else:
+        breaker.record_success()
+    return response
+
+
+# ==================== Потоковые ответы ====================
+
+# Поля, в которых разные workflow отдают текст (целиком или кусками)
+_TEXT_KEYS = ("content", "delta", "text", "token", "answer", "response", "output")
+
+
+def _event_text(event: Any) -> str:
+    """Текст из одного события потока (строка или JSON-объект)."""
+    if isinstance(event, str):
+        return event
+    if not isinstance(event, dict):
+        return ""
+
+    event_type = event.get("type")
+    if event_type == "error":
+        raise RuntimeError(f"n8n stream error: {event.get('content') or event}")
+    if event_type in ("begin", "end"):
+        return ""
+
+    for key in _TEXT_KEYS:
+        value = event.get(key)
+        if isinstance(value, str):
+            return value
+    return ""
+
+
+def _parse_line(line: str, sse: bool) -> str:
+    if sse:
+        if not line.startswith("data:"):
+            return ""  # event:, id:, комментарии
+        line = line[5:].strip()
+        if line == "[DONE]":
+            return ""
+    line = line.strip()
+    if not line:
+        return ""
+    try:
+        return _event_text(json.loads(line))
+    except json.JSONDecodeError:
+        # SSE с обычным текстом в data:
+        return line if sse else ""
+
+
+async def _iter_answer_chunks(response: httpx.Response) -> AsyncIterator[str]:
+    content_type = response.headers.get("content-type", "")
+
+    if "text/event-stream" in content_type or "ndjson" in content_type or "jsonl" in content_type:
+        sse = "text/event-stream" in content_type
+        async for line in response.aiter_lines():
+            text = _parse_line(line, sse)
+            if text:
+                yield text
+    elif "application/json" in content_type:
+        # Вебхук без потокового режима: весь ответ одним куском
+        body = await response.aread()
+        text = _event_text(json.loads(body) if body else {})
+        if text:
+            yield text
+    else:
+        async for text in response.aiter_text():
+            if text:
+                yield text
+
+
+async def stream(
+    url: str,
+    payload: dict[str, Any],
+    timeout: float = N8N_DEFAULT_TIMEOUT,
+) -> AsyncIterator[str]:
+    """POST в вебхук n8n и чтение ответа по кускам по мере генерации.
+
+    Таймаут действует на паузу между кусками, а не на весь ответ.
+
+    Yields:
+        Очередной кусок текста ответа
+
+    Raises:
+        CircuitOpenError: вебхук сейчас считается недоступным
+        httpx.HTTPStatusError: вебхук ответил ошибкой
+        httpx.TransportError: сетевая ошибка или таймаут
+    """
+    breaker = get_breaker(url)
+    webhook = metrics.webhook_name(url)
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        metrics.n8n_circuit_rejected.inc(webhook=webhook)
+        raise
+
+    client = get_client()
+    labels = {"webhook": webhook, "status": "cancelled"}
+    started = time.perf_counter()
+    try:
+        async with client.stream(
+            "POST",
+            url,
+            json=payload,
+            timeout=httpx.Timeout(timeout, connect=N8N_CONNECT_TIMEOUT),
+        ) as response:
+            labels["status"] = response.status_code
+            if response.status_code >= 400:
+                await response.aread()
+                if is_webhook_not_registered(response):
+                    breaker.record_failure(REASON_NOT_REGISTERED, trip=True)
+                elif response.status_code >= 500:
+                    breaker.record_failure(f"HTTP {response.status_code}")
+                else:
+                    breaker.record_success()
+                response.raise_for_status()
+
+            breaker.record_success()
+            async for chunk in _iter_answer_chunks(response):
+                yield chunk
+    except httpx.TransportError as e:
+        labels["status"] = type(e).__name__
+        breaker.record_failure(f"{type(e).__name__}")
+        raise
+    except BaseException:
+        breaker._trial_in_flight = False
+        raise
+    finally:
+        # Время всего ответа, включая генерацию (а не только до первого куска)
+        metrics.n8n_duration.observe(time.perf_counter() - started, **labels)
@@ -0,0 +1,245 @@
+"""Асинхронный режим задач n8n с callback-приёмником.
+
+Долгие workflow (CV Scan, AI-Глаз: LLM + Whisper) больше не держат
+HTTP-соединение и задачу обработчика по 60 секунд:
+
+1. Обработчик вызывает ``submit_job()`` — создаётся запись ``N8nJob``,
+   в n8n уходит payload с ``job_id`` и ``callback_url``; n8n сразу отвечает 200.
+2. Когда workflow готов, n8n делает POST результата на ``callback_url``.
+3. Локальный aiohttp-сервер принимает результат, помечает задачу done
+   и отправляет отформатированный ответ в нужный чат.
+
+Фоновый sweeper помечает зависшие задачи как timeout (и сообщает об этом
+пользователю) и удаляет старые завершённые записи.
+"""
+
+import os
+import hmac
+import uuid
+import asyncio
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any, Callable
+
+from aiogram import Bot
+from aiohttp import web
+
+import n8n_gateway
+from streaming import split_message
+from models import get_session, create_job, finish_job, expire_jobs, delete_finished_jobs
+
+logger = logging.getLogger(__name__)
+
+# ==================== Конфигурация ====================
+
+# Адрес, по которому n8n достучится до бота (например https://bot.example.com)
+JOB_CALLBACK_PUBLIC_URL = os.getenv("JOB_CALLBACK_PUBLIC_URL", "").rstrip("/")
+JOB_CALLBACK_HOST = os.getenv("JOB_CALLBACK_HOST", "0.0.0.0")
+JOB_CALLBACK_PORT = int(os.getenv("JOB_CALLBACK_PORT", "8081"))
+JOB_CALLBACK_SECRET = os.getenv("JOB_CALLBACK_SECRET") or os.getenv("BOT_TOKEN", "")
+
+JOB_SUBMIT_TIMEOUT = 15.0  # n8n должен только принять задачу и ответить 200
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "600"))  # сек на выполнение workflow
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "30"))
+JOB_RETENTION = timedelta(days=int(os.getenv("JOB_RETENTION_DAYS", "7")))
+
+CALLBACK_PATH = "/n8n/jobs/{job_id}"
+
+# kind -> функция, превращающая JSON результата в текст для пользователя
+ResultFormatter = Callable[[dict[str, Any]], str]
+_formatters: dict[str, ResultFormatter] = {}
+
+_bot: Bot | None = None
+_runner: web.AppRunner | None = None
+_sweeper: asyncio.Task | None = None
+_deliveries: set[asyncio.Task] = set()  # фоновые доставки результатов (ссылки, чтобы задачи не собрал GC)
+
+
+def jobs_enabled() -> bool:
+    """Асинхронный режим работает, только если n8n знает, куда слать результат."""
+    return bool(JOB_CALLBACK_PUBLIC_URL)
+
+
+def register_formatter(kind: str, formatter: ResultFormatter) -> None:
+    """Зарегистрировать форматирование результата для типа задачи."""
+    _formatters[kind] = formatter
+
+
+def _callback_token(job_id: str) -> str:
+    """Подпись callback_url: без неё нельзя подделать результат чужой задачи."""
+    return hmac.new(
+        JOB_CALLBACK_SECRET.encode(), job_id.encode(), hashlib.sha256
+    ).hexdigest()[:32]
+
+
+def _callback_url(job_id: str) -> str:
+    path = CALLBACK_PATH.format(job_id=job_id)
+    return f"{JOB_CALLBACK_PUBLIC_URL}{path}?token={_callback_token(job_id)}"
+
+
+# ==================== Отправка задач ====================
+
+
+async def submit_job(
+    kind: str,
+    url: str,
+    payload: dict[str, Any],
+    telegram_id: int,
+    chat_id: int,
+) -> str:
+    """Создать задачу и передать её в n8n, не дожидаясь результата.
+
+    Args:
+        kind: Тип задачи (по нему выбирается форматирование результата)
+        url: Вебхук n8n
+        payload: Данные для workflow
+        telegram_id: Telegram ID пользователя
+        chat_id: Чат, куда доставить результат
+
+    Returns:
+        job_id созданной задачи
+
+    Raises:
+        Exception: n8n не принял задачу (задача помечается failed)
+    """
+    job_id = str(uuid.uuid4())
+    async with get_session() as session:
+        await create_job(session, job_id, kind, telegram_id, chat_id, payload, JOB_TIMEOUT)
+
+    body = {
+        **payload,
+        "job_id": job_id,
+        "callback_url": _callback_url(job_id),
+    }
+    try:
+        response = await n8n_gateway.post(url, body, timeout=JOB_SUBMIT_TIMEOUT)
+        response.raise_for_status()
+    except Exception as e:
+        async with get_session() as session:
+            await finish_job(session, job_id, "failed", {"error": f"{type(e).__name__}: {e}"})
+        raise
+
+    logger.info(f"n8n job {job_id} ({kind}) принят n8n")
+    return job_id
+
+
+# ==================== Callback-приёмник ====================
+
+
+def _format_result(kind: str, result: dict[str, Any]) -> str:
+    formatter = _formatters.get(kind)
+    if formatter:
+        return formatter(result)
+    return (
+        result.get("text")
+        or result.get("answer")
+        or result.get("result")
+        or "✅ Задача выполнена."
+    )
+
+
+async def _deliver(chat_id: int, text: str) -> None:
+    if _bot is None:
+        return
+    try:
+        # Результат workflow может быть длиннее лимита сообщения Telegram (4096)
+        for chunk in split_message(text):
+            await _bot.send_message(chat_id, chunk)
+    except Exception as e:
+        logger.error(f"Не удалось доставить результат в чат {chat_id}: {e}")
+
+
+async def _handle_callback(request: web.Request) -> web.Response:
+    job_id = request.match_info["job_id"]
+    token = request.query.get("token") or request.headers.get("X-Job-Token", "")
+    if not hmac.compare_digest(token, _callback_token(job_id)):
+        return web.json_response({"error": "invalid token"}, status=403)
+
+    try:
+        result = await request.json()
+    except Exception:
+        result = {"text": await request.text()}
+    if not isinstance(result, dict):
+        result = {"result": result}
+
+    status = "failed" if result.get("error") else "done"
+    async with get_session() as session:
+        job = await finish_job(session, job_id, status, result)
+        if job is None:
+            # Неизвестная или уже завершённая задача (повторный callback)
+            return web.json_response({"ok": False, "reason": "unknown or finished job"}, status=404)
+        kind, chat_id = job.kind, job.chat_id
+
+    if status == "failed":
+        text = f"❌ Не удалось выполнить анализ: {result.get('error')}"
+    else:
+        text = _format_result(kind, result)
+
+    # Отвечаем n8n сразу, доставка в Telegram идёт в фоне
+    task = asyncio.create_task(_deliver(chat_id, text))
+    _deliveries.add(task)
+    task.add_done_callback(_deliveries.discard)
+    return web.json_response({"ok": True})
+
+
+# ==================== Таймауты и очистка ====================
+
+
+async def _sweep_once() -> None:
+    async with get_session() as session:
+        expired = [(job.id, job.chat_id) for job in await expire_jobs(session)]
+        removed = await delete_finished_jobs(session, JOB_RETENTION)
+
+    for job_id, chat_id in expired:
+        logger.warning(f"n8n job {job_id} timeout")
+        await _deliver(
+            chat_id,
+            "⏰ К сожалению, анализ занял слишком много времени и был прерван. "
+            "Попробуйте отправить запрос ещё раз.",
+        )
+    if removed:
+        logger.info(f"Удалено старых n8n jobs: {removed}")
+
+
+async def _sweep_loop() -> None:
+    while True:
+        try:
+            await _sweep_once()
+        except Exception as e:
+            logger.error(f"n8n jobs sweeper error: {e}")
+        await asyncio.sleep(JOB_SWEEP_INTERVAL)
+
+
+# ==================== Жизненный цикл ====================
+
+
+async def start_job_service(bot: Bot) -> None:
+    """Поднять callback-сервер и sweeper (вызывается из main.main())."""
+    global _bot, _runner, _sweeper
+    _bot = bot
+    if not jobs_enabled():
+        logger.info("n8n jobs: JOB_CALLBACK_PUBLIC_URL не задан — асинхронный режим выключен")
+        return
+
+    app = web.Application()
+    app.router.add_post(CALLBACK_PATH, _handle_callback)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, JOB_CALLBACK_HOST, JOB_CALLBACK_PORT).start()
+    _sweeper = asyncio.create_task(_sweep_loop())
+    logger.info(f"n8n jobs: callback-сервер слушает {JOB_CALLBACK_HOST}:{JOB_CALLBACK_PORT}")
+
+
+async def stop_job_service() -> None:
+    """Остановить callback-сервер и sweeper."""
+    global _runner, _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        _sweeper = None
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+    if _deliveries:
+        # Результаты уже приняты от n8n и помечены done — дождёмся их отправки
+        await asyncio.gather(*_deliveries, return_exceptions=True)
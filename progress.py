@@ -0,0 +1,126 @@
+"""Анимация "ИИ работает", которая не задерживает ответ.
+
+Раньше обработчики показывали шаги загрузки через фиксированные
+``asyncio.sleep`` — пользователь ждал сценарий, даже если n8n ответил
+за 300 мс. ``ProgressAnimator`` крутит шаги в фоновой задаче рядом с
+настоящей работой и останавливается, как только работа закончена:
+
+    async with ProgressAnimator(message, STEPS, delete=True):
+        result = await call_n8n(...)
+    await message.answer(format(result))
+
+- шаги меняются раз в ``PROGRESS_STEP_INTERVAL`` секунд (косметические
+  правки — планировщик Telegram может их склеить или пропустить);
+- ``PROGRESS_MIN_DISPLAY`` — необязательное минимальное время показа
+  (по умолчанию 0: задержка определяется только реальной работой);
+- статус, который потом удаляется (``delete=True``), отправляется только
+  если работа длится дольше ``PROGRESS_SHOW_AFTER`` — на быстрых ответах
+  пользователь не видит мелькающих сообщений.
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+from aiogram import types
+
+import telegram_scheduler
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_STEP_INTERVAL = float(os.getenv("PROGRESS_STEP_INTERVAL", "1.0"))
+PROGRESS_MIN_DISPLAY = float(os.getenv("PROGRESS_MIN_DISPLAY", "0"))
+PROGRESS_SHOW_AFTER = float(os.getenv("PROGRESS_SHOW_AFTER", "0.3"))
+
+
+class ProgressAnimator:
+    """Фоновая анимация статуса на время выполнения блока ``async with``.
+
+    Args:
+        message: Сообщение пользователя, на которое отвечаем
+        steps: Тексты шагов; первый отправляется сразу (или через
+            ``PROGRESS_SHOW_AFTER``), остальные — по таймеру; последний
+            шаг остаётся на экране, пока работа не закончится
+        final: Текст, которым заменить статус после работы (обычная правка)
+        delete: Удалить статус после работы
+        parse_mode: Разметка шагов
+        interval: Пауза между шагами
+        min_display: Минимальное время показа анимации
+    """
+
+    def __init__(
+        self,
+        message: types.Message,
+        steps: list[str],
+        final: str | None = None,
+        delete: bool = False,
+        parse_mode: str | None = "HTML",
+        interval: float | None = None,
+        min_display: float | None = None,
+    ):
+        self.message = message
+        self.steps = steps
+        self.final = final
+        self.delete = delete
+        self.parse_mode = parse_mode
+        self.interval = PROGRESS_STEP_INTERVAL if interval is None else interval
+        self.min_display = PROGRESS_MIN_DISPLAY if min_display is None else min_display
+        self.status: types.Message | None = None
+        self._started = 0.0
+        self._task: asyncio.Task | None = None
+        self._show: asyncio.Future | None = None
+
+    async def __aenter__(self) -> "ProgressAnimator":
+        self._started = time.monotonic()
+        lazy = self.delete and self.min_display <= 0
+        if not lazy:
+            self.status = await self.message.answer(self.steps[0], parse_mode=self.parse_mode)
+        self._task = asyncio.create_task(self._animate(lazy))
+        return self
+
+    async def _animate(self, lazy: bool) -> None:
+        steps = self.steps
+        if lazy:
+            await asyncio.sleep(PROGRESS_SHOW_AFTER)
+            # shield: если работа закончится посреди отправки, сообщение всё равно удалим
+            self._show = asyncio.ensure_future(self.message.answer(steps[0], parse_mode=self.parse_mode))
+            self.status = await asyncio.shield(self._show)
+        for step in steps[1:]:
+            await asyncio.sleep(self.interval)
+            try:
+                await telegram_scheduler.cosmetic_edit(self.status, step, parse_mode=self.parse_mode)
+            except Exception as e:
+                # Пользователь удалил чат/сообщение — анимация не важна
+                logger.debug(f"Progress: шаг не показан: {e}")
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            remaining = self.min_display - (time.monotonic() - self._started)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.debug(f"Progress: анимация прервана: {e}")
+
+        if self.status is None and self._show is not None:
+            try:
+                self.status = await self._show
+            except Exception:
+                pass
+
+        if self.status is None:
+            return
+        try:
+            if self.delete:
+                await self.status.delete()
+            elif self.final is not None and exc_type is None:
+                await self.status.edit_text(self.final, parse_mode=self.parse_mode)
+        except Exception as e:
+            logger.debug(f"Progress: не удалось обновить статус: {e}")
@@ -0,0 +1,138 @@
+"""Пакетная регистрация пользователей по /start.
+
+После рекламного поста приходят тысячи ``/start`` в минуту, и каждый делал
+отдельную транзакцию с ``users``. ``RegistrationBatcher`` собирает
+регистрации из одновременных ``/start`` за ``REGISTRATION_BATCH_DELAY``
+секунд и записывает их одним ``INSERT ... ON CONFLICT DO NOTHING`` на
+несколько строк (не больше ``REGISTRATION_BATCH_SIZE`` за запрос).
+
+``register`` ждёт, пока его пачка будет записана: сразу после ответа на
+``/start`` следующее сообщение проверяет доступ по БД, и строка должна уже
+быть там. Повторный ``/start`` того же пользователя, пока пачка не записана,
+ждёт ту же запись (в пачке остаётся самое раннее время старта).
+
+``REGISTRATION_BATCH_DELAY=0`` — без пакетов: один такой же запрос на каждый
+``/start``.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import get_session, register_users
+
+logger = logging.getLogger(__name__)
+
+REGISTRATION_BATCH_DELAY = float(os.getenv("REGISTRATION_BATCH_DELAY", "0.005"))
+REGISTRATION_BATCH_SIZE = int(os.getenv("REGISTRATION_BATCH_SIZE", "500"))
+
+
+def _retrieve_exception(future: asyncio.Future) -> None:
+    # Все, кто ждал пачку, могли быть отменены (future под shield) — тогда
+    # исключение никто не заберёт и asyncio напишет "Future exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+class _Pending:
+    __slots__ = ("started_at", "future")
+
+    def __init__(self, started_at: datetime | None, future: asyncio.Future):
+        self.started_at = started_at
+        self.future = future
+
+
+class RegistrationBatcher:
+    """Копит регистрации и пишет их в ``users`` пачками."""
+
+    def __init__(
+        self,
+        delay: float = REGISTRATION_BATCH_DELAY,
+        max_size: int = REGISTRATION_BATCH_SIZE,
+        session_factory: Callable[[], AsyncSession] = get_session,
+    ):
+        self.delay = delay
+        self.max_size = max_size
+        self.session_factory = session_factory
+        self._pending: dict[int, _Pending] = {}
+        self._timer: asyncio.Task | None = None
+        self._writes: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.registered = 0  # создано новых пользователей
+
+    async def register(self, telegram_id: int, started_at: datetime | None = None) -> bool:
+        """Зарегистрировать пользователя. True — создан сейчас, False — уже был."""
+        if self.delay <= 0:
+            async with self.session_factory() as session:
+                created = await register_users(session, {telegram_id: started_at})
+            self.registered += len(created)
+            return telegram_id in created
+
+        pending = self._pending.get(telegram_id)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(_retrieve_exception)
+            pending = _Pending(started_at, future)
+            self._pending[telegram_id] = pending
+            if len(self._pending) >= self.max_size:
+                self._write_in_background(self._take())
+            elif self._timer is None:
+                self._timer = asyncio.create_task(self._flush_later())
+        elif started_at is not None and (pending.started_at is None or started_at < pending.started_at):
+            pending.started_at = started_at
+        # shield: отмена одного обработчика не отменяет запись всей пачки
+        return await asyncio.shield(pending.future)
+
+    def _take(self) -> dict[int, _Pending]:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    def _write_in_background(self, batch: dict[int, _Pending]) -> None:
+        task = asyncio.create_task(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self._timer = None
+        if self._pending:
+            self._write_in_background(self._take())
+
+    async def _write(self, batch: dict[int, _Pending]) -> None:
+        try:
+            async with self.session_factory() as session:
+                created = await register_users(
+                    session, {telegram_id: p.started_at for telegram_id, p in batch.items()}
+                )
+        except Exception as e:
+            logger.error(f"Регистрация: не удалось записать пачку из {len(batch)}: {e}")
+            for pending in batch.values():
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.registered += len(created)
+        for telegram_id, pending in batch.items():
+            if not pending.future.done():
+                pending.future.set_result(telegram_id in created)
+
+    async def close(self) -> None:
+        """Записать то, что уже накоплено (при остановке бота)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            self._write_in_background(self._take())
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+
+batcher = RegistrationBatcher()
@@ -0,0 +1,320 @@
+"""Локальный индекс похожих вопросов для RAG-эндпоинтов.
+
+Пользователи задают один и тот же вопрос в разной форме
+("как подключить впн из дома" / "Как подключиться к VPN из дома?").
+Точный кэш (``answer_cache``) такие вопросы не склеивает, поэтому здесь
+хранится матрица TF-IDF по символьным n-граммам прошлых вопросов и ответы
+на них. Ответ на прошлый вопрос возвращается без вызова n8n, только если
+одновременно:
+
+- косинус >= ``SEMANTIC_CACHE_THRESHOLD``;
+- совпадают значимые слова: у каждого слова одного вопроса (кроме служебных)
+  есть слово другого с той же основой (первые ``STEM_LENGTH`` букв). Одни
+  n-граммы не отличают "VPN из дома" от "wifi из дома" — общих n-грамм у них
+  почти все.
+
+Кириллица перед сравнением транслитерируется ("впн" -> "vpn"), поэтому
+вопросы, где VPN написан русскими буквами, склеиваются.
+
+Слой по умолчанию выключен (``SEMANTIC_CACHE_ENABLED=1`` — включить):
+ошибка похожести означает чужой ответ пользователю.
+
+- n-граммы хэшируются в вектор фиксированной размерности (feature hashing),
+  поэтому словарь не растёт и не требует хранения;
+- IDF периодически пересчитывается по всем сохранённым вопросам;
+- при переполнении перезаписываются самые старые записи (кольцевой буфер);
+- индексы сохраняются в ``SEMANTIC_CACHE_DIR`` (``.npz``) при остановке бота
+  и загружаются при первом обращении.
+"""
+
+import os
+import re
+import zlib
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ==================== Конфигурация ====================
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.82"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "512"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "10000"))  # вопросов на индекс
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", "data/semantic_cache")
+
+NGRAM_SIZES = (2, 3, 4)
+MIN_QUERY_LENGTH = 4  # слишком короткие вопросы ("vpn?") не сравниваем
+REFIT_FRACTION = 0.2  # пересчитать IDF, когда добавлено 20% новых вопросов
+INDEX_VERSION = 2  # меняется вместе с нормализацией текста — старые .npz не загружаются
+TOP_CANDIDATES = 5  # сколько самых похожих вопросов проверять по словам
+STEM_LENGTH = 5  # "podkliuchit" / "podkliuchitsia" -> "podkl"
+
+# Служебные слова не несут смысла вопроса и не сравниваются
+STOP_WORDS = frozenset(
+    """
+    а и или но же ли бы не ни да нет то это этот эта эти тот как где когда куда
+    откуда зачем почему что чем кто кого кому какой какая какое какие который
+    в во на к ко с со из у о об от до по за при для без про через над под
+    я мне меня мой моя мои ты тебе вы вам вас ваш мы нам нас наш он она они его ее их
+    можно нужно надо ли есть быть будет мочь могу хочу подскажите скажите пожалуйста
+    the a an and or of to in on at for with from how what where when why who
+    is are do does can i my me you your
+    """.split()
+)
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f",
+    "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "",
+    "ы": "y", "ь": "", "э": "e", "ю": "iu", "я": "ia",
+})
+
+_CLEAN_RE = re.compile(r"[^\w\s]+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, без пунктуации, служебных слов, кириллица — латиницей."""
+    text = text.lower().replace("ё", "е")
+    text = _CLEAN_RE.sub(" ", text)
+    words = [word for word in text.split() if word not in STOP_WORDS]
+    return _SPACES_RE.sub(" ", " ".join(words).translate(_TRANSLIT)).strip()
+
+
+def content_stems(text: str) -> frozenset[str]:
+    """Основы значимых слов нормализованного вопроса."""
+    return frozenset(word[:STEM_LENGTH] for word in text.split())
+
+
+def term_frequencies(text: str, dim: int) -> np.ndarray:
+    """Сублинейные частоты хэшированных символьных n-грамм (по словам)."""
+    counts = np.zeros(dim, dtype=np.float32)
+    for word in text.split():
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                # crc32 стабилен между запусками (в отличие от hash()),
+                # иначе сохранённый индекс не совпадёт с новыми векторами
+                counts[zlib.crc32(padded[i:i + n].encode()) % dim] += 1.0
+    nonzero = counts > 0
+    counts[nonzero] = 1.0 + np.log(counts[nonzero])
+    return counts
+
+
+class SemanticIndex:
+    """Индекс вопросов одного эндпоинта (namespace) с ответами на них."""
+
+    def __init__(
+        self,
+        name: str,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        dim: int = SEMANTIC_CACHE_DIM,
+        max_size: int = SEMANTIC_CACHE_SIZE,
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.dim = dim
+        self.max_size = max_size
+
+        # Строки выделяются по мере роста (до max_size), а не сразу
+        self._tf = np.zeros((0, dim), dtype=np.float32)
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._questions: list[str] = []
+        self._answers: list[str] = []
+        self._df = np.zeros(dim, dtype=np.float32)
+        self._idf = np.ones(dim, dtype=np.float32)
+        self._count = 0  # заполненные строки
+        self._next = 0  # куда писать следующую запись (кольцевой буфер)
+        self._added_since_fit = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ---------- Векторизация ----------
+
+    def _weigh(self, tf: np.ndarray) -> np.ndarray:
+        vec = tf * self._idf
+        norm = np.linalg.norm(vec, axis=-1, keepdims=True)
+        return vec / np.maximum(norm, 1e-12)
+
+    def _refit(self) -> None:
+        """Пересчитать IDF и все векторы матрицы."""
+        n = self._count
+        self._idf = (np.log((1.0 + n) / (1.0 + self._df)) + 1.0).astype(np.float32)
+        if n:
+            self._vectors[:n] = self._weigh(self._tf[:n])
+        self._added_since_fit = 0
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = self._tf.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = min(self.max_size, max(rows, capacity * 2, 64))
+        for attr in ("_tf", "_vectors"):
+            old = getattr(self, attr)
+            grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+            grown[:capacity] = old
+            setattr(self, attr, grown)
+
+    # ---------- Поиск и добавление ----------
+
+    def lookup(self, question: str) -> tuple[str, float] | None:
+        """Найти ответ на самый похожий вопрос.
+
+        Returns:
+            (ответ, сходство) если сходство >= порога, иначе None
+        """
+        text = normalize_text(question)
+        if self._count == 0 or len(text) < MIN_QUERY_LENGTH:
+            self.misses += 1
+            return None
+
+        query = self._weigh(term_frequencies(text, self.dim))
+        scores = self._vectors[:self._count] @ query
+        top = min(TOP_CANDIDATES, self._count)
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        stems = content_stems(text)
+        for row in sorted(candidates, key=lambda i: -scores[i]):
+            score = float(scores[row])
+            if score < self.threshold:
+                break
+            # Похожи по буквам, но про разное ("wifi" / "vpn") — не подходит
+            if content_stems(self._questions[row]) == stems:
+                self.hits += 1
+                return self._answers[row], score
+
+        self.misses += 1
+        return None
+
+    def add(self, question: str, answer: str) -> None:
+        """Запомнить ответ n8n на вопрос."""
+        text = normalize_text(question)
+        if len(text) < MIN_QUERY_LENGTH or not answer:
+            return
+
+        tf = term_frequencies(text, self.dim)
+        row = self._next
+        if row < self._count:
+            # Перезаписываем самую старую запись
+            self._df -= self._tf[row] > 0
+            self._questions[row] = text
+            self._answers[row] = answer
+        else:
+            self._ensure_capacity(row + 1)
+            self._questions.append(text)
+            self._answers.append(answer)
+            self._count += 1
+
+        self._tf[row] = tf
+        self._df += tf > 0
+        self._next = (row + 1) % self.max_size
+        self._added_since_fit += 1
+
+        if self._added_since_fit >= max(16, REFIT_FRACTION * self._count):
+            self._refit()
+        else:
+            self._vectors[row] = self._weigh(tf)
+
+    # ---------- Сохранение ----------
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        n = self._count
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            tf=self._tf[:n],
+            questions=np.array(self._questions, dtype=str),
+            answers=np.array(self._answers, dtype=str),
+            next=np.array(self._next),
+            version=np.array(INDEX_VERSION),
+        )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """Загрузить индекс; файл другой версии или размерности игнорируется."""
+        if not os.path.exists(path):
+            return False
+        with np.load(path, allow_pickle=False) as data:
+            if "version" not in data or int(data["version"]) != INDEX_VERSION:
+                logger.warning(f"Semantic cache {self.name}: индекс старой версии сброшен")
+                return False
+            tf = data["tf"]
+            if tf.ndim != 2 or tf.shape[1] != self.dim:
+                logger.warning(f"Semantic cache {self.name}: размерность изменилась, индекс сброшен")
+                return False
+            tf = tf[: self.max_size]
+            questions = data["questions"].tolist()[: len(tf)]
+            answers = data["answers"].tolist()[: len(tf)]
+            next_row = int(data["next"])
+
+        n = len(tf)
+        self._tf = np.zeros((0, self.dim), dtype=np.float32)
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._ensure_capacity(n)
+        self._tf[:n] = tf
+        self._questions = questions
+        self._answers = answers
+        self._count = n
+        self._next = next_row % self.max_size if n >= self.max_size else n
+        self._df = (tf > 0).sum(axis=0).astype(np.float32)
+        self._refit()
+        return True
+
+
+# ==================== Реестр индексов ====================
+
+_indexes: dict[str, SemanticIndex] = {}
+
+
+def _index_path(name: str) -> str:
+    safe_name = re.sub(r"[^\w.-]+", "_", name)
+    return os.path.join(SEMANTIC_CACHE_DIR, f"{safe_name}.npz")
+
+
+def get_index(name: str) -> SemanticIndex:
+    """Индекс для namespace (например ``company_rag`` или ``instructor:ppe``)."""
+    index = _indexes.get(name)
+    if index is None:
+        index = _indexes[name] = SemanticIndex(name)
+        try:
+            if index.load(_index_path(name)):
+                logger.info(f"Semantic cache {name}: загружено {len(index)} вопросов")
+        except Exception as e:
+            logger.warning(f"Semantic cache {name}: не удалось загрузить индекс: {e}")
+    return index
+
+
+def lookup(name: str, question: str) -> str | None:
+    """Ответ на похожий вопрос из индекса ``name`` или None."""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    found = get_index(name).lookup(question)
+    if found is None:
+        return None
+    answer, score = found
+    logger.info(f"Semantic cache {name}: попадание (сходство {score:.2f})")
+    return answer
+
+
+def remember(name: str, question: str, answer: str) -> None:
+    """Сохранить ответ n8n в индекс ``name``."""
+    if SEMANTIC_CACHE_ENABLED:
+        get_index(name).add(question, answer)
+
+
+def save_all() -> None:
+    """Сохранить все индексы на диск (вызывается при остановке бота)."""
+    for name, index in _indexes.items():
+        if not len(index):
+            continue
+        try:
+            index.save(_index_path(name))
+        except Exception as e:
+            logger.error(f"Semantic cache {name}: не удалось сохранить индекс: {e}")
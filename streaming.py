@@ -0,0 +1,183 @@
+"""Потоковый вывод ответов LLM в одно сообщение Telegram.
+
+Ответ n8n читается по кускам (``n8n_gateway.stream``), а сообщение
+постепенно дописывается через ``edit_text``. Telegram ограничивает частоту
+правок, поэтому ``ThrottledEditor`` склеивает куски и правит сообщение
+не чаще раза в ``STREAM_EDIT_INTERVAL`` секунд — промежуточные версии
+текста просто пропускаются, последняя всегда доходит.
+
+Пока идёт генерация, текст отправляется без разметки (недописанный HTML
+или Markdown Telegram не примет), финальная правка — с ``parse_mode``.
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+import n8n_gateway
+import telegram_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Вебхук должен быть настроен на потоковый ответ (Respond to Webhook: streaming)
+N8N_STREAMING = os.getenv("N8N_STREAMING", "0") == "1"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))  # сек между правками
+STREAM_MIN_CHARS = 20  # первая правка — когда накопилось хоть что-то осмысленное
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+CURSOR = " ▌"
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def streaming_enabled() -> bool:
+    return N8N_STREAMING
+
+
+class ThrottledEditor:
+    """Правит одно сообщение не чаще, чем позволяет Telegram."""
+
+    def __init__(self, message: types.Message, prefix: str = "", interval: float = STREAM_EDIT_INTERVAL):
+        self.message = message
+        self.prefix = prefix
+        self.interval = interval
+        self.text = ""
+        self.edits = 0
+        self.first_edit_at: float | None = None
+        self._shown = ""
+        self._last_edit = 0.0
+        self._pending: asyncio.Task | None = None
+
+    def append(self, chunk: str) -> None:
+        """Добавить кусок ответа; правка будет запланирована с учётом лимита."""
+        self.text += chunk
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._edit_later())
+
+    async def _edit_later(self) -> None:
+        if len(self.text) < STREAM_MIN_CHARS and not self.edits:
+            return
+        delay = self._last_edit + self.interval - time.monotonic()
+        if delay > 0:
+            # Куски, пришедшие за это время, попадут в ту же правку
+            await asyncio.sleep(delay)
+        try:
+            # Черновик можно пропустить, если чат упёрся в лимит Telegram
+            with telegram_scheduler.cosmetic():
+                await self._edit(self._render(cursor=True))
+        except Exception as e:
+            logger.warning(f"Streaming: промежуточная правка не удалась: {e}")
+
+    def cancel(self) -> None:
+        """Отменить запланированную промежуточную правку."""
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+
+    def _render(self, cursor: bool) -> str:
+        # Черновик уходит без parse_mode — теги заголовка убираем
+        text = _TAG_RE.sub("", self.prefix) + self.text
+        suffix = CURSOR if cursor else ""
+        limit = TELEGRAM_MESSAGE_LIMIT - len(suffix)
+        if len(text) > limit:
+            text = text[: limit - 1] + "…"
+        return text + suffix
+
+    async def _edit(self, text: str, parse_mode: str | None = None) -> bool:
+        if text == self._shown and parse_mode is None:
+            return True
+        try:
+            await self.message.edit_text(text, parse_mode=parse_mode)
+        except TelegramRetryAfter as e:
+            # Промежуточную правку просто пропускаем — следующая принесёт больше текста
+            self._last_edit = time.monotonic() + e.retry_after
+            logger.warning(f"Streaming: Telegram просит подождать {e.retry_after} сек")
+            return False
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return True
+            raise
+        self._shown = text
+        self._last_edit = time.monotonic()
+        self.edits += 1
+        if self.first_edit_at is None:
+            self.first_edit_at = self._last_edit
+        return True
+
+    async def finish(self, parse_mode: str | None = None) -> None:
+        """Финальная правка: полный текст, без курсора, с разметкой."""
+        self.cancel()
+
+        delay = self._last_edit + self.interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        chunks = split_message(self.prefix + self.text)
+        try:
+            done = await self._edit(chunks[0], parse_mode=parse_mode)
+        except TelegramBadRequest:
+            # Модель выдала невалидную разметку — показываем как есть
+            done = await self._edit(_TAG_RE.sub("", chunks[0]))
+        if not done:
+            # Финальную версию терять нельзя: ждём, сколько просит Telegram
+            await asyncio.sleep(max(0.0, self._last_edit - time.monotonic()))
+            await self._edit(chunks[0], parse_mode=parse_mode)
+        for chunk in chunks[1:]:
+            await self.message.answer(chunk)
+
+
+def split_message(text: str) -> list[str]:
+    """Разбить длинный ответ на сообщения по границам абзацев/строк."""
+    chunks = []
+    while len(text) > TELEGRAM_MESSAGE_LIMIT:
+        cut = text.rfind("\n", 0, TELEGRAM_MESSAGE_LIMIT)
+        if cut <= 0:
+            cut = TELEGRAM_MESSAGE_LIMIT
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    chunks.append(text)
+    return chunks
+
+
+async def stream_answer(
+    message: types.Message,
+    url: str,
+    payload: dict[str, Any],
+    prefix: str = "",
+    parse_mode: str | None = None,
+    timeout: float = 60.0,
+) -> str:
+    """Стримить ответ вебхука в уже отправленное ботом сообщение ``message``.
+
+    Args:
+        message: Сообщение бота (статус), которое будет дописываться
+        url: Вебхук n8n
+        payload: Данные запроса (добавляется ``"stream": True``)
+        prefix: Заголовок перед текстом ответа
+        parse_mode: Разметка финальной версии сообщения
+        timeout: Максимальная пауза между кусками ответа
+
+    Returns:
+        Полный текст ответа (без prefix)
+
+    Raises:
+        Ошибки ``n8n_gateway.stream``; если ответ пустой — ValueError
+    """
+    editor = ThrottledEditor(message, prefix=prefix)
+    try:
+        async for chunk in n8n_gateway.stream(url, {**payload, "stream": True}, timeout=timeout):
+            editor.append(chunk)
+    except BaseException:
+        editor.cancel()
+        raise
+
+    if not editor.text.strip():
+        raise ValueError("n8n вернул пустой ответ")
+
+    await editor.finish(parse_mode=parse_mode)
+    return editor.text
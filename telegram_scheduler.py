@@ -0,0 +1,300 @@
+"""Общий планировщик исходящих запросов к Telegram Bot API.
+
+Обработчики шлют пачки ``answer``/``edit_text``/``delete`` (анимации
+"загрузки", видео-кружки, ответы из нескольких сообщений), и под нагрузкой
+Telegram начинает отвечать 429. Этот модуль — request-middleware сессии
+aiogram, через которую проходит каждый запрос с ``chat_id``:
+
+- в лимиты входят только сообщения — отправка (``send*``, ``copy``,
+  ``forward``) и правка (``edit*``); ``deleteMessage``, ``sendChatAction``
+  и прочие методы идут сразу (ждут только паузу после 429);
+- глобальный token bucket (сообщений в секунду на весь бот);
+- token bucket на каждый чат (личные чаты и группы — разные лимиты). В
+  личном чате Telegram терпит короткие всплески сверх ~1 сообщения в
+  секунду, поэтому запас bucket (``TG_CHAT_BURST``) большой и ответы
+  пользователю в него практически не упираются;
+- два класса приоритета: обычные запросы (ответы пользователю) берут токены
+  сразу, а косметические правки (шаги анимаций, черновики стриминга)
+  получают токены только из "запаса" глобального bucket и bucket чата —
+  иначе склеиваются (более новая правка того же сообщения отменяет старую)
+  или пропускаются;
+- ``retry_after`` из ответа 429 ставит на паузу все исходящие запросы бота,
+  обычный запрос после паузы повторяется.
+
+Косметические правки помечаются ``with telegram_scheduler.cosmetic():`` или
+через ``cosmetic_edit()``.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    EditMessageCaption,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    Response,
+    SendChatAction,
+    TelegramMethod,
+)
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# ==================== Конфигурация ====================
+
+# Лимиты Telegram: ~30 сообщений/сек на бота, ~1/сек в личный чат (короткие
+# всплески допускаются), ~20/мин в группу
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "25"))
+TG_GLOBAL_BURST = float(os.getenv("TG_GLOBAL_BURST", "30"))
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "1"))
+TG_CHAT_BURST = float(os.getenv("TG_CHAT_BURST", "20"))
+TG_GROUP_RATE = float(os.getenv("TG_GROUP_RATE", "0.33"))
+TG_GROUP_BURST = float(os.getenv("TG_GROUP_BURST", "3"))
+
+# Доля bucket (глобального и чата), которую косметика не трогает (резерв под ответы)
+COSMETIC_RESERVE = 0.3
+COSMETIC_MAX_WAIT = float(os.getenv("TG_COSMETIC_MAX_WAIT", "2.0"))
+MAX_RETRIES = 3
+MAX_CHAT_BUCKETS = 10_000
+
+# Только эти методы можно пропустить без последствий для логики обработчика
+_COSMETIC_METHODS = (EditMessageText, EditMessageCaption, EditMessageReplyMarkup)
+_MESSAGE_METHOD_PREFIXES = ("Send", "Copy", "Forward", "Edit")
+
+_cosmetic: ContextVar[bool] = ContextVar("telegram_cosmetic", default=False)
+
+
+def _is_message(method: TelegramMethod) -> bool:
+    """Отправка или правка сообщения — то, что Telegram считает в лимитах."""
+    return (
+        type(method).__name__.startswith(_MESSAGE_METHOD_PREFIXES)
+        and not isinstance(method, SendChatAction)
+    )
+
+
+@contextmanager
+def cosmetic():
+    """Пометить правки внутри блока как косметические (их можно склеить/пропустить)."""
+    token = _cosmetic.set(True)
+    try:
+        yield
+    finally:
+        _cosmetic.reset(token)
+
+
+async def cosmetic_edit(message: Message, text: str, **kwargs: Any) -> None:
+    """``message.edit_text`` для промежуточного шага анимации."""
+    with cosmetic():
+        await message.edit_text(text, **kwargs)
+
+
+# ==================== Token bucket ====================
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waiting = 0  # обычных запросов ждут токен этого bucket
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def delay(self, reserve: float = 0.0) -> float:
+        """Сколько ждать, пока в bucket будет токен сверх ``reserve``."""
+        missing = 1.0 + reserve - self.available()
+        return max(0.0, missing / self.rate)
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1.0
+
+    @property
+    def idle(self) -> bool:
+        return not self.waiting and self.available() >= self.capacity
+
+
+# ==================== Планировщик ====================
+
+
+class TelegramScheduler(BaseRequestMiddleware):
+    """Request-middleware: ``bot.session.middleware(TelegramScheduler())``."""
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(TG_GLOBAL_RATE, TG_GLOBAL_BURST)
+        self._chat_buckets: dict[Any, TokenBucket] = {}
+        self._paused_until = 0.0
+        # (chat_id, message_id) -> номер последней правки; старые косметические правки отменяются
+        self._edit_seq: dict[tuple, int] = {}
+        self._seq = 0
+
+        self.sent = 0
+        self.cosmetic_dropped = 0
+        self.cosmetic_merged = 0
+        self.retries = 0
+
+    # ---------- Buckets ----------
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                # Полные bucket'ы ничего не помнят — их можно выбросить
+                for key in [k for k, b in self._chat_buckets.items() if b.idle]:
+                    del self._chat_buckets[key]
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            bucket = self._chat_buckets[chat_id] = (
+                TokenBucket(TG_GROUP_RATE, TG_GROUP_BURST)
+                if is_group
+                else TokenBucket(TG_CHAT_RATE, TG_CHAT_BURST)
+            )
+        return bucket
+
+    def _delay(self, chat: TokenBucket, cosmetic_request: bool) -> float:
+        pause = self._paused_until - time.monotonic()
+        if cosmetic_request:
+            if chat.waiting:
+                # В этом чате ждёт настоящий ответ — косметика пропускает его вперёд
+                return max(pause, 1.0 / chat.rate)
+            wait = max(
+                chat.delay(chat.capacity * COSMETIC_RESERVE),
+                self.global_bucket.delay(self.global_bucket.capacity * COSMETIC_RESERVE),
+            )
+        else:
+            wait = max(chat.delay(), self.global_bucket.delay())
+        return max(pause, wait)
+
+    def _take(self, chat: TokenBucket) -> None:
+        chat.take()
+        self.global_bucket.take()
+
+    # ---------- Склейка правок ----------
+
+    def _edit_key(self, method: TelegramMethod) -> tuple | None:
+        message_id = getattr(method, "message_id", None)
+        if message_id is None:
+            return None
+        return (getattr(method, "chat_id", None), message_id)
+
+    def _register_edit(self, key: tuple | None) -> int:
+        self._seq += 1
+        if key is not None:
+            if len(self._edit_seq) >= MAX_CHAT_BUCKETS:
+                self._edit_seq.clear()
+            self._edit_seq[key] = self._seq
+        return self._seq
+
+    def _superseded(self, key: tuple | None, seq: int) -> bool:
+        return key is not None and self._edit_seq.get(key, seq) != seq
+
+    # ---------- Middleware ----------
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Response:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            # getUpdates, getMe, getFile и т.п. — не ограничиваем
+            return await make_request(bot, method)
+        if not _is_message(method):
+            # deleteMessage, sendChatAction и т.п. — не сообщения, в лимиты не входят
+            while (pause := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+            return await make_request(bot, method)
+
+        is_cosmetic = _cosmetic.get() and isinstance(method, _COSMETIC_METHODS)
+        key = self._edit_key(method)
+        seq = self._register_edit(key)
+        chat = self._chat_bucket(chat_id)
+
+        if is_cosmetic:
+            return await self._send_cosmetic(make_request, bot, method, chat, key, seq)
+        return await self._send(make_request, bot, method, chat)
+
+    async def _send(self, make_request, bot: Bot, method: TelegramMethod, chat: TokenBucket) -> Response:
+        for attempt in range(MAX_RETRIES + 1):
+            chat.waiting += 1
+            try:
+                while (delay := self._delay(chat, cosmetic_request=False)) > 0:
+                    await asyncio.sleep(delay)
+            finally:
+                chat.waiting -= 1
+            self._take(chat)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self._pause(e.retry_after)
+                if attempt == MAX_RETRIES:
+                    raise
+                self.retries += 1
+                continue
+            self.sent += 1
+            return response
+        raise RuntimeError("unreachable")
+
+    async def _send_cosmetic(
+        self,
+        make_request,
+        bot: Bot,
+        method: TelegramMethod,
+        chat: TokenBucket,
+        key: tuple | None,
+        seq: int,
+    ) -> Response:
+        deadline = time.monotonic() + COSMETIC_MAX_WAIT
+        while (delay := self._delay(chat, cosmetic_request=True)) > 0:
+            if time.monotonic() + delay > deadline:
+                self.cosmetic_dropped += 1
+                return self._skipped()
+            await asyncio.sleep(delay)
+            if self._superseded(key, seq):
+                # Пока ждали, это сообщение уже правят заново — наш текст устарел
+                self.cosmetic_merged += 1
+                return self._skipped()
+
+        self._take(chat)
+        try:
+            response = await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            self._pause(e.retry_after)
+            self.cosmetic_dropped += 1
+            return self._skipped()
+        self.sent += 1
+        return response
+
+    def _pause(self, retry_after: float) -> None:
+        until = time.monotonic() + retry_after
+        if until > self._paused_until:
+            logger.warning(f"Telegram 429: пауза исходящих запросов на {retry_after} сек")
+            self._paused_until = until
+
+    @staticmethod
+    def _skipped() -> Response:
+        return Response[bool](ok=True, result=True)
+
+
+scheduler = TelegramScheduler()
+
+
+def install(bot: Bot) -> None:
+    """Подключить планировщик к сессии бота (вызывается из main.py)."""
+    bot.session.middleware(scheduler)
@@ -0,0 +1,4 @@
+import os
+
+# models создаёт движок при импорте; тесты подменяют доступ к БД и в неё не ходят
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
@@ -0,0 +1,119 @@
+"""DBStorage: изменения не теряются при конфликтах версий, кэш не растёт без TTL.
+
+БД подменяется словарём (``FakeDB``), "другая реплика" — прямые записи в него.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+import fsm_storage
+from fsm_storage import DBStorage
+
+
+class FakeDB:
+    def __init__(self):
+        self.rows: dict[str, SimpleNamespace] = {}
+        self.conflicts_left = 0
+
+    def session(self):
+        db = self
+
+        class Session:
+            async def __aenter__(self):
+                return db
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Session()
+
+    async def get(self, session, key):
+        row = self.rows.get(key)
+        return SimpleNamespace(state=row.state, data=dict(row.data), version=row.version) if row else None
+
+    def replica_write(self, key, state, data):
+        row = self.rows.get(key)
+        version = row.version + 1 if row else 1
+        self.rows[key] = SimpleNamespace(state=state, data=dict(data), version=version)
+
+    async def save(self, session, key, state, data, expected_version):
+        if self.conflicts_left:
+            # Другая реплика успела записать этот ключ
+            self.conflicts_left -= 1
+            current = self.rows.get(key)
+            self.replica_write(key, current.state if current else None, current.data if current else {})
+            return None
+        row = self.rows.get(key)
+        if (row.version if row else 0) != expected_version:
+            return None
+        self.rows[key] = SimpleNamespace(state=state, data=dict(data), version=expected_version + 1)
+        return expected_version + 1
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB()
+    monkeypatch.setattr(fsm_storage, "get_session", fake.session)
+    monkeypatch.setattr(fsm_storage, "get_fsm_state", fake.get)
+    monkeypatch.setattr(fsm_storage, "save_fsm_state", fake.save)
+    monkeypatch.setattr(fsm_storage, "FSM_RETRY_DELAY", 0.01)
+    return fake
+
+
+def _key(user_id: int = 1) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+def test_ops_survive_exhausted_conflict_retries(db):
+    async def scenario():
+        storage = DBStorage(cache_ttl=0, write_delay=0.01)
+        db.replica_write(fsm_storage._key(_key()), "Other:state", {"from_replica": 1})
+        db.conflicts_left = fsm_storage.FSM_MAX_CONFLICT_RETRIES + 2
+
+        await storage.set_state(_key(), "Interview:answer_1")
+        await storage.update_data(_key(), {"question": "Вопрос 1"})
+        await storage.close()
+
+        assert db.conflicts_left == 0
+        row = db.rows[fsm_storage._key(_key())]
+        assert row.state == "Interview:answer_1"
+        assert row.data == {"from_replica": 1, "question": "Вопрос 1"}
+        assert await storage.get_state(_key()) == "Interview:answer_1"
+
+    asyncio.run(scenario())
+
+
+def test_no_cache_keeps_only_unsaved_entries(db):
+    async def scenario():
+        storage = DBStorage(cache_ttl=0, write_delay=0.01)
+        for user_id in range(100):
+            await storage.get_state(_key(user_id))
+        assert len(storage._entries) == 0
+
+        await storage.set_state(_key(7), "Sales:niche")
+        assert len(storage._entries) == 1
+        assert await storage.get_state(_key(7)) == "Sales:niche"  # несохранённое — из памяти
+
+        await storage.close()
+        assert len(storage._entries) == 0
+        assert db.rows[fsm_storage._key(_key(7))].state == "Sales:niche"
+
+    asyncio.run(scenario())
+
+
+def test_eviction_keeps_unsaved_entries(db):
+    async def scenario():
+        storage = DBStorage(cache_ttl=60, cache_size=3, write_delay=10)
+        await storage.set_state(_key(0), "Sales:niche")  # останется несохранённым
+        for user_id in range(1, 10):
+            await storage.get_state(_key(user_id))
+
+        assert len(storage._entries) == 3
+        assert fsm_storage._key(_key(0)) in storage._entries
+        await storage.close()
+        assert db.rows[fsm_storage._key(_key(0))].state == "Sales:niche"
+
+    asyncio.run(scenario())
@@ -0,0 +1,154 @@
+"""InterviewJournal: порядок событий кандидата, spool после перезапуска, компактизация.
+
+Функции ``models`` подменяются записью в список, БД не нужна.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+import interview_journal
+from interview_journal import InterviewJournal
+
+
+class FakeDB:
+    """Применённые события по порядку; ``fail`` — сколько раз подряд падать на операции."""
+
+    def __init__(self):
+        self.applied: list[tuple] = []
+        self.fail: dict[str, int] = {}
+        self.down = False
+
+    def session(self):
+        db = self
+
+        class Session:
+            async def __aenter__(self):
+                if db.down:
+                    raise ConnectionError("БД недоступна")
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def rollback(self):
+                pass
+
+        return Session()
+
+    def _op(self, name: str):
+        async def apply(session, telegram_id, *args, **kwargs):
+            if self.fail.get(name):
+                self.fail[name] -= 1
+                raise RuntimeError(f"{name}: ошибка БД")
+            self.applied.append((name, telegram_id, *args, *kwargs.values()))
+
+        return apply
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB()
+    for name in ("start_interview", "save_answer_1", "save_answer_2", "save_answer_3_and_complete", "cancel_interview"):
+        monkeypatch.setattr(interview_journal, name, fake._op(name))
+    return fake
+
+
+def _journal(tmp_path, db) -> InterviewJournal:
+    return InterviewJournal(
+        path=str(tmp_path / "spool.jsonl"),
+        delay=0.01,
+        retry_delay=0.01,
+        session_factory=db.session,
+    )
+
+
+def _record_interview(journal: InterviewJournal, telegram_id: int) -> None:
+    journal.record("start", telegram_id, question="Вопрос 1")
+    journal.record("answer", telegram_id, stage=1, answer="Ответ 1", question="Вопрос 2", voice_file_id=None)
+    journal.record("answer", telegram_id, stage=2, answer="Ответ 2", question="Вопрос 3", voice_file_id=None)
+
+
+async def _drained(journal: InterviewJournal, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while journal.pending and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def _spool_seqs(journal: InterviewJournal) -> list[int]:
+    with open(journal.path, encoding="utf-8") as f:
+        return [json.loads(line)["seq"] for line in f]
+
+
+def test_order_kept_across_failed_flush(tmp_path, db):
+    async def scenario():
+        db.fail["save_answer_1"] = 2
+        journal = _journal(tmp_path, db)
+        journal.start()
+        _record_interview(journal, 1)
+        journal.record("start", 2, question="Вопрос 1")
+        await _drained(journal)  # фон повторяет запись после ошибки
+        await journal.close()
+
+        first = [event[0] for event in db.applied if event[1] == 1]
+        assert first == ["start_interview", "save_answer_1", "save_answer_2"]
+        assert ("start_interview", 2, "Вопрос 1") in db.applied
+        assert journal.retries == 2
+        assert journal.pending == 0
+        assert _spool_seqs(journal) == []
+
+    asyncio.run(scenario())
+
+
+def test_spool_replayed_after_restart(tmp_path, db):
+    async def scenario():
+        db.down = True
+        journal = _journal(tmp_path, db)
+        journal.start()
+        _record_interview(journal, 1)
+        await journal.close()
+        assert db.applied == []
+        assert _spool_seqs(journal) == [1, 2, 3]
+
+        # Перезапуск бота: БД снова доступна
+        db.down = False
+        restarted = _journal(tmp_path, db)
+        restarted.start()
+        restarted.record("cancel", 1)
+        await restarted.close()
+
+        assert [event[0] for event in db.applied] == [
+            "start_interview", "save_answer_1", "save_answer_2", "cancel_interview",
+        ]
+        assert _spool_seqs(restarted) == []
+
+    asyncio.run(scenario())
+
+
+def test_record_during_compaction_is_kept(tmp_path, db, monkeypatch):
+    async def scenario():
+        journal = _journal(tmp_path, db)
+        journal.record("start", 1, question="Вопрос 1")
+        journal.record("start", 2, question="Вопрос 1")
+        journal._unapplied.pop(1)  # первое событие уже записано в БД
+
+        rewrite = journal._rewrite_spool
+
+        def slow_rewrite(lines, fsync):
+            time.sleep(0.2)
+            rewrite(lines, fsync)
+
+        monkeypatch.setattr(journal, "_rewrite_spool", slow_rewrite)
+        compaction = asyncio.create_task(journal._compact_spool())
+        await asyncio.sleep(0.05)  # файл переписывается в потоке
+        journal.record("start", 3, question="Вопрос 1")
+        journal.record("cancel", 2)
+        await compaction
+
+        assert _spool_seqs(journal) == [2, 3, 4]
+        reloaded = _journal(tmp_path, db)
+        assert reloaded._load_spool() == 3
+
+    asyncio.run(scenario())
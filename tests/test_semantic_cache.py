@@ -0,0 +1,48 @@
+"""Индекс похожих вопросов: склеивает перефразировки, но не вопросы про разное.
+
+    python -m pytest tests/test_semantic_cache.py
+"""
+
+import semantic_cache
+from semantic_cache import SemanticIndex
+
+VPN_QUESTION = "Как подключиться к VPN из дома?"
+VPN_ANSWER = "Установите клиент и войдите под доменной учётной записью."
+
+
+def _index() -> SemanticIndex:
+    index = SemanticIndex("test")
+    index.add(VPN_QUESTION, VPN_ANSWER)
+    index.add("Как сбросить пароль от почты?", "Через портал самообслуживания.")
+    index.add("Где взять справку 2-НДФЛ?", "В бухгалтерии.")
+    return index
+
+
+def test_other_subject_is_not_a_hit():
+    # Почти все n-граммы общие, но вопрос про wifi, а не про VPN
+    assert _index().lookup("Как подключиться к wifi из дома?") is None
+
+
+def test_paraphrase_with_cyrillic_vpn_is_a_hit():
+    found = _index().lookup("как подключить впн из дома")
+    assert found is not None
+    answer, score = found
+    assert answer == VPN_ANSWER
+    assert score >= semantic_cache.SEMANTIC_CACHE_THRESHOLD
+
+
+def test_same_subject_other_place_is_not_a_hit():
+    assert _index().lookup("как подключиться к vpn из офиса") is None
+
+
+def test_disabled_by_default():
+    assert semantic_cache.SEMANTIC_CACHE_ENABLED is False
+
+
+def test_save_and_load_keep_answers(tmp_path):
+    path = str(tmp_path / "index.npz")
+    _index().save(path)
+
+    loaded = SemanticIndex("test")
+    assert loaded.load(path)
+    assert loaded.lookup("как подключить впн из дома")[0] == VPN_ANSWER
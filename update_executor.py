@@ -0,0 +1,198 @@
+"""Исполнитель обновлений: по порядку внутри чата, параллельно между чатами.
+
+Раньше каждое обновление становилось отдельной задачей без ограничений:
+в пик тысячи обработчиков одновременно держали 60-секундный вызов n8n и
+соединение с БД, а быстрые сообщения одного пользователя могли
+обрабатываться не по порядку (например, два ответа на собеседовании
+в ``handle_text_answer``).
+
+``UpdateExecutor`` — outer-middleware ``dp.update`` (после встроенных
+middleware aiogram, так что FSM-контекст и ``event_chat`` уже известны):
+
+- у каждого чата своя очередь, обновления чата выполняются строго
+  последовательно, разные чаты — параллельно;
+- всего "в работе" (в очередях + выполняется) не больше
+  ``EXECUTOR_MAX_IN_FLIGHT`` обновлений; когда лимит исчерпан, приём
+  ждёт свободного места — polling перестаёт забирать getUpdates
+  (``handle_as_tasks=False``), webhook упирается в свою очередь и отвечает 503;
+- если один чат накопил больше ``EXECUTOR_MAX_PER_CHAT`` необработанных
+  обновлений (флуд), новые обновления этого чата отбрасываются, чтобы
+  он не занял все места. Отброшенное пишется в лог и в счётчик по чату,
+  пользователь один раз за эпизод флуда получает ``FLOOD_NOTICE``;
+- обработчик выполняется уже после возврата из ``feed_update``, поэтому
+  встроенный ``ErrorsMiddleware`` диспетчера его ошибок не видит —
+  исполнитель сам передаёт их в ``dp.errors`` (``ErrorEvent``).
+
+``snapshot()`` — текущая глубина очередей и счётчики.
+"""
+
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import ErrorEvent, TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MAX_IN_FLIGHT = int(os.getenv("EXECUTOR_MAX_IN_FLIGHT", "256"))
+EXECUTOR_MAX_PER_CHAT = int(os.getenv("EXECUTOR_MAX_PER_CHAT", "20"))
+MAX_DROPPED_CHATS = 1000  # сколько чатов помнить в счётчике отброшенных
+
+FLOOD_NOTICE = "⏳ Слишком много сообщений подряд — дождитесь ответа на предыдущие."
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class UpdateExecutor(BaseMiddleware):
+    """``dp.update.outer_middleware(executor)``."""
+
+    def __init__(self, max_in_flight: int = EXECUTOR_MAX_IN_FLIGHT, max_per_chat: int = EXECUTOR_MAX_PER_CHAT):
+        self.max_in_flight = max_in_flight
+        self.max_per_chat = max_per_chat
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._chats: dict[Any, deque] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._flood_notified: set[Any] = set()  # чаты, уже предупреждённые в этом эпизоде флуда
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        self.in_flight = 0
+        self.waiting = 0  # приём ждёт свободного места (backpressure)
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.dropped_by_chat: dict[Any, int] = {}
+
+    @staticmethod
+    def _chat_key(event: Update, data: dict[str, Any]) -> Any:
+        chat = data.get("event_chat")
+        if chat is not None:
+            return chat.id
+        user = data.get("event_from_user")
+        if user is not None:
+            return ("user", user.id)
+        # Обновления без чата и пользователя (опросы и т.п.) ни с чем не упорядочиваем
+        return ("update", event.update_id)
+
+    async def __call__(self, handler: Handler, event: Update, data: dict[str, Any]) -> Any:
+        key = self._chat_key(event, data)
+        queue = self._chats.get(key)
+        if queue is not None and len(queue) >= self.max_per_chat:
+            self._drop(key, event, data, len(queue))
+            return None
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self._idle.clear()
+        queue = self._chats.get(key)
+        if queue is None:
+            queue = self._chats[key] = deque()
+            task = asyncio.create_task(self._drain(key, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        queue.append((handler, event, data))
+        return None
+
+    def _drop(self, key: Any, event: Update, data: dict[str, Any], queued: int) -> None:
+        self.dropped += 1
+        if key in self.dropped_by_chat or len(self.dropped_by_chat) < MAX_DROPPED_CHATS:
+            self.dropped_by_chat[key] = self.dropped_by_chat.get(key, 0) + 1
+        logger.warning(
+            f"Executor: чат {key} флудит ({queued} в очереди), update {event.update_id} отброшен "
+            f"(всего отброшено в чате: {self.dropped_by_chat.get(key, '?')})"
+        )
+        chat = data.get("event_chat")
+        bot = data.get("bot")
+        if chat is None or bot is None or key in self._flood_notified:
+            return
+        self._flood_notified.add(key)
+        task = asyncio.create_task(self._notify_flood(bot, chat.id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _notify_flood(bot, chat_id: int) -> None:
+        try:
+            await bot.send_message(chat_id, FLOOD_NOTICE)
+        except Exception as e:
+            logger.warning(f"Executor: не удалось предупредить чат {chat_id} о флуде: {e}")
+
+    @staticmethod
+    async def _propagate_error(event: Update, data: dict[str, Any], error: Exception) -> None:
+        """Передать ошибку в ``dp.errors``, как это сделал бы ``ErrorsMiddleware``."""
+        dispatcher = data.get("dispatcher")
+        if dispatcher is not None:
+            try:
+                response = await dispatcher.propagate_event(
+                    update_type="error",
+                    event=ErrorEvent(update=event, exception=error),
+                    **data,
+                )
+            except Exception as e:
+                logger.exception(f"Executor: ошибка в обработчике ошибок для update {event.update_id}: {e}")
+                return
+            if response is not UNHANDLED:
+                return
+        logger.error(f"Executor: ошибка обработки update {event.update_id}: {error}", exc_info=error)
+
+    async def _drain(self, key: Any, queue: deque) -> None:
+        try:
+            while queue:
+                handler, event, data = queue[0]
+                try:
+                    await handler(event, data)
+                    self.processed += 1
+                except Exception as e:
+                    self.errors += 1
+                    await self._propagate_error(event, data, e)
+                finally:
+                    queue.popleft()
+                    self.in_flight -= 1
+                    self._slots.release()
+        finally:
+            # Пустую очередь удаляем сразу: следующий апдейт чата создаст новую
+            if self._chats.get(key) is queue:
+                del self._chats[key]
+            self._flood_notified.discard(key)
+            if not self.in_flight:
+                self._idle.set()
+
+    def snapshot(self) -> dict[str, int]:
+        """Глубина очередей и счётчики (для логов и метрик)."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "active_chats": len(self._chats),
+            "longest_chat_queue": max((len(q) for q in self._chats.values()), default=0),
+            "waiting_admission": self.waiting,
+            "processed": self.processed,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+    async def join(self, timeout: float | None = None) -> None:
+        """Дождаться обработки принятых обновлений (при остановке бота)."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Executor: не дождались {self.in_flight} обновлений, отменяем")
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+executor = UpdateExecutor()
+
+
+def install(dp) -> None:
+    """Подключить исполнитель к диспетчеру (вызывается из main.py)."""
+    dp.update.outer_middleware(executor)
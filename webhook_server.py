@@ -0,0 +1,169 @@
+"""Приём обновлений Telegram через webhook (альтернатива ``dp.start_polling``).
+
+Режим выбирается ``BOT_MODE=webhook`` (по умолчанию ``polling``).
+
+- Telegram присылает обновления POST-ом на ``WEBHOOK_BASE_URL + WEBHOOK_PATH``;
+  заголовок ``X-Telegram-Bot-Api-Secret-Token`` сверяется с ``WEBHOOK_SECRET``
+  (по умолчанию — производный от токена бота), чужие запросы получают 403;
+- обновление кладётся в ограниченную очередь (``WEBHOOK_QUEUE_SIZE``) и
+  Telegram сразу получает 200 — обработка не держит HTTP-запрос;
+- очередь разбирают ``WEBHOOK_WORKERS`` воркеров через ``dp.feed_update``;
+- если очередь полна — 503: Telegram повторит доставку позже, а бот не
+  копит в памяти неограниченный хвост.
+
+При остановке сервер перестаёт принимать запросы, очередь дорабатывается
+(не дольше ``WEBHOOK_DRAIN_TIMEOUT``), webhook в Telegram не снимается —
+обновления дождутся следующего запуска.
+"""
+
+import os
+import hmac
+import signal
+import asyncio
+import hashlib
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# ==================== Конфигурация ====================
+
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Публичный https-адрес бота (например https://bot.example.com)
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# Telegram допускает в secret_token только A-Z, a-z, 0-9, _ и -
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or hashlib.sha256(
+    ("webhook:" + os.getenv("BOT_TOKEN", "")).encode()
+).hexdigest()[:32]
+
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "64"))
+# Одновременных соединений Telegram к webhook (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+_dp: Dispatcher | None = None
+_bot: Bot | None = None
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+_runner: web.AppRunner | None = None
+
+stats = {"received": 0, "rejected": 0, "processed": 0, "errors": 0}
+
+
+def webhook_enabled() -> bool:
+    return BOT_MODE == "webhook"
+
+
+# ==================== Приём ====================
+
+
+async def _handle_update(request: web.Request) -> web.Response:
+    token = request.headers.get(SECRET_HEADER, "")
+    if not hmac.compare_digest(token, WEBHOOK_SECRET):
+        return web.Response(status=403)
+
+    try:
+        update = Update.model_validate(await request.json(), context={"bot": _bot})
+    except Exception as e:
+        logger.warning(f"Webhook: некорректное обновление: {e}")
+        return web.Response(status=400)
+
+    try:
+        _queue.put_nowait(update)
+    except asyncio.QueueFull:
+        # Telegram повторит доставку — лучше, чем копить очередь без границ
+        stats["rejected"] += 1
+        return web.Response(status=503, headers={"Retry-After": "1"})
+
+    stats["received"] += 1
+    return web.Response()
+
+
+async def _worker() -> None:
+    while True:
+        update = await _queue.get()
+        try:
+            await _dp.feed_update(_bot, update)
+            stats["processed"] += 1
+        except Exception as e:
+            stats["errors"] += 1
+            logger.exception(f"Webhook: ошибка обработки update {update.update_id}: {e}")
+        finally:
+            _queue.task_done()
+
+
+# ==================== Жизненный цикл ====================
+
+
+async def start_webhook(dp: Dispatcher, bot: Bot, register: bool = True) -> None:
+    """Поднять HTTP-сервер, воркеры и (если ``register``) вызвать setWebhook."""
+    global _dp, _bot, _queue, _runner
+    _dp, _bot = dp, bot
+    _queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    _workers[:] = [asyncio.create_task(_worker()) for _ in range(WEBHOOK_WORKERS)]
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, _handle_update)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    logger.info(f"Webhook: сервер слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    if register:
+        if not WEBHOOK_BASE_URL:
+            raise RuntimeError("BOT_MODE=webhook, но WEBHOOK_BASE_URL не задан")
+        await bot.set_webhook(
+            url=f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+
+
+async def stop_webhook() -> None:
+    """Перестать принимать обновления, доработать очередь и остановить воркеры."""
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+
+    if _queue is not None:
+        try:
+            await asyncio.wait_for(_queue.join(), WEBHOOK_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook: не обработано обновлений при остановке: {_queue.qsize()}")
+
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Работать в режиме webhook до SIGINT/SIGTERM (аналог ``dp.start_polling``)."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows
+
+    # Те же startup/shutdown-хуки, что вызывает start_polling
+    workflow_data = {**dp.workflow_data, "dispatcher": dp, "bots": [bot]}
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        await start_webhook(dp, bot)
+        await stop.wait()
+    finally:
+        await stop_webhook()
+        await dp.emit_shutdown(bot=bot, **workflow_data)